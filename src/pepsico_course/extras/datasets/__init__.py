@@ -0,0 +1,9 @@
+"""Custom data sets used in ``conf/base/catalog.yml``"""
+from .chunked_parquet_dataset import ChunkedParquetDataset
+from .lightgbm_binary_dataset import LightGBMBinaryDataset
+from .lightgbm_model_dataset import LightGBMModelDataset
+from .optional_dataset import OptionalDataset
+from .partitioned_parquet_dataset import PartitionedParquetDataset
+
+__all__ = ["ChunkedParquetDataset", "LightGBMBinaryDataset", "LightGBMModelDataset",
+           "OptionalDataset", "PartitionedParquetDataset"]
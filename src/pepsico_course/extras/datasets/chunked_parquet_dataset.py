@@ -0,0 +1,109 @@
+import logging
+from copy import deepcopy
+from pathlib import PurePosixPath
+from typing import Any, Dict
+
+import fsspec
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from kedro.io import AbstractDataset
+from kedro.io.core import get_filepath_str, get_protocol_and_path
+
+log = logging.getLogger(__name__)
+
+
+class ChunkedParquetDataset(AbstractDataset[pd.DataFrame, pd.DataFrame]):
+    """
+    Parquet directory written one chunk at a time, e.g. by a generator node
+    streaming a ``chunksize`` CSV: every save adds a ``part-<n>.parquet`` file (the
+    first save of the run removes the previous ones), so only one chunk is in
+    memory while writing. The schema of the first chunk is kept for all of them,
+    with every categorical stored as a ``dictionary<int32, string>`` so chunks
+    with different categories can be read back as a single categorical.
+
+    Example:
+    ::
+
+        shipments_raw:
+          type: pepsico_course.extras.datasets.ChunkedParquetDataset
+          filepath: data/01_raw/parquet/shipments
+    """
+
+    DEFAULT_SAVE_ARGS = {"compression": "zstd"}
+
+    def __init__(  # noqa: too-many-arguments
+        self,
+        filepath: str,
+        load_args: Dict[str, Any] = None,
+        save_args: Dict[str, Any] = None,
+        credentials: Dict[str, Any] = None,
+        fs_args: Dict[str, Any] = None,
+        metadata: Dict[str, Any] = None,
+    ):
+        protocol, path = get_protocol_and_path(filepath)
+        self._protocol = protocol
+        self._fs = fsspec.filesystem(protocol, **(credentials or {}), **(fs_args or {}))
+        self._filepath = PurePosixPath(path)
+
+        self._load_args = deepcopy(load_args or {})
+        self._save_args = {**self.DEFAULT_SAVE_ARGS, **(save_args or {})}
+        self._schema = None
+        self._n_chunks = 0
+        self.metadata = metadata
+
+    @property
+    def _path(self) -> str:
+        return get_filepath_str(self._filepath, self._protocol)
+
+    @staticmethod
+    def _chunk_schema(chunk: pd.DataFrame) -> pa.Schema:
+        schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+        for i, field in enumerate(schema):
+            if pa.types.is_dictionary(field.type):
+                text = pa.dictionary(pa.int32(), pa.string())
+                schema = schema.set(i, field.with_type(text))
+            elif pa.types.is_null(field.type):
+                # Only missing values in the first chunk, e.g. an optional text column
+                schema = schema.set(i, field.with_type(pa.string()))
+        return schema
+
+    def _load(self) -> pd.DataFrame:
+        table = pq.read_table(self._path, filesystem=self._fs, **self._load_args)
+        data = table.to_pandas()
+
+        # Categories are unified in order of appearance across the chunks
+        for column in data.select_dtypes("category").columns:
+            categories = data[column].cat.categories.sort_values()
+            data[column] = data[column].cat.reorder_categories(categories)
+        return data
+
+    def _save(self, data: pd.DataFrame) -> None:
+        if self._schema is None:
+            if self._fs.exists(self._path):
+                self._fs.rm(self._path, recursive=True)
+            self._fs.makedirs(self._path, exist_ok=True)
+            self._schema = self._chunk_schema(data)
+
+        table = pa.Table.from_pandas(data, schema=self._schema, preserve_index=False)
+        pq.write_table(
+            table,
+            f"{self._path}/part-{self._n_chunks:05d}.parquet",
+            filesystem=self._fs,
+            **self._save_args,
+        )
+        self._n_chunks += 1
+        self._fs.invalidate_cache(self._path)
+
+    def _exists(self) -> bool:
+        return self._fs.exists(self._path) and bool(
+            self._fs.glob(f"{self._path}/part-*.parquet")
+        )
+
+    def _describe(self) -> Dict[str, Any]:
+        return {
+            "filepath": self._filepath,
+            "protocol": self._protocol,
+            "load_args": self._load_args,
+            "save_args": self._save_args,
+        }
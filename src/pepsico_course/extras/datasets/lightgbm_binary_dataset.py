@@ -0,0 +1,51 @@
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+import lightgbm as lgb
+from kedro.io import AbstractDataset
+
+
+class LightGBMBinaryDataset(AbstractDataset[Dict[str, Any], Dict[str, Any]]):
+    """
+    Binned LightGBM training set, saved with ``lgb.Dataset.save_binary`` so it is
+    built (and binned) once and only read back afterwards. The data set takes a
+    ``{"dataset": lgb.Dataset, "hash": str, ...}`` dictionary: the ``dataset`` is
+    written to ``filepath`` and everything else to a JSON sidecar next to it, so
+    the hash of the feature table can be checked without reading the binary.
+
+    Example:
+    ::
+
+        lgb_train_dataset:
+          type: pepsico_course.extras.datasets.LightGBMBinaryDataset
+          filepath: data/05_model_input/lgb_train.bin
+    """
+
+    def __init__(self, filepath: str, metadata: Dict[str, Any] = None):
+        self._filepath = Path(filepath)
+        self._metadata_filepath = self._filepath.with_suffix(".json")
+        self.metadata = metadata
+
+    def _load(self) -> Dict[str, Any]:
+        info = json.loads(self._metadata_filepath.read_text())
+        dataset = lgb.Dataset(str(self._filepath), params=info.get("params"))
+        return {**info, "dataset": dataset}
+
+    def _save(self, data: Dict[str, Any]) -> None:
+        dataset = data["dataset"]
+        self._filepath.parent.mkdir(parents=True, exist_ok=True)
+        # A dataset loaded from this very file does not need to be written again
+        loaded_from = dataset.data if isinstance(dataset.data, str) else None
+        same_file = (loaded_from
+                     and Path(loaded_from).resolve() == self._filepath.resolve())
+        if not same_file:
+            dataset.construct().save_binary(str(self._filepath))
+        info = {key: value for key, value in data.items() if key != "dataset"}
+        self._metadata_filepath.write_text(json.dumps(info, indent=2, default=str))
+
+    def _exists(self) -> bool:
+        return self._filepath.exists() and self._metadata_filepath.exists()
+
+    def _describe(self) -> Dict[str, Any]:
+        return {"filepath": self._filepath}
@@ -0,0 +1,61 @@
+import json
+from copy import deepcopy
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict
+
+import lightgbm as lgb
+from kedro.io.core import AbstractVersionedDataset, Version, VersionNotFoundError
+
+
+class LightGBMModelDataset(AbstractVersionedDataset[Dict[str, Any], Dict[str, Any]]):
+    """
+    Trained LightGBM booster, saved with ``lgb.Booster.save_model`` (text format) so
+    it can be scored without retraining. The data set takes a
+    ``{"booster": lgb.Booster, "feature_name": [...], ...}`` dictionary: the
+    ``booster`` is written to ``filepath`` and everything else to a JSON sidecar next
+    to it, as in `LightGBMBinaryDataset`. With ``versioned: true`` every run keeps
+    its own model and the latest one is loaded, unless ``--load-version`` says
+    otherwise.
+
+    Example:
+    ::
+
+        lgb_model:
+          type: pepsico_course.extras.datasets.LightGBMModelDataset
+          filepath: data/06_models/lgb_model.txt
+          versioned: true
+    """
+
+    def __init__(self, filepath: str, version: Version = None,
+                 save_args: Dict[str, Any] = None, metadata: Dict[str, Any] = None):
+        super().__init__(filepath=PurePosixPath(filepath), version=version)
+        self._save_args = deepcopy(save_args) or {}
+        self.metadata = metadata
+
+    @staticmethod
+    def _metadata_path(path: PurePosixPath) -> Path:
+        return Path(path).with_suffix(".json")
+
+    def _load(self) -> Dict[str, Any]:
+        load_path = self._get_load_path()
+        info = json.loads(self._metadata_path(load_path).read_text())
+        return {**info, "booster": lgb.Booster(model_file=str(load_path))}
+
+    def _save(self, data: Dict[str, Any]) -> None:
+        save_path = Path(self._get_save_path())
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+        data["booster"].save_model(str(save_path), **self._save_args)
+        info = {key: value for key, value in data.items() if key != "booster"}
+        self._metadata_path(save_path).write_text(
+            json.dumps(info, indent=2, default=str))
+
+    def _exists(self) -> bool:
+        try:
+            load_path = self._get_load_path()
+        except VersionNotFoundError:
+            return False
+        return Path(load_path).exists() and self._metadata_path(load_path).exists()
+
+    def _describe(self) -> Dict[str, Any]:
+        return {"filepath": self._filepath, "version": self._version,
+                "save_args": self._save_args}
@@ -0,0 +1,46 @@
+from copy import deepcopy
+from typing import Any, Dict, Union
+
+import pandas as pd
+from kedro.io import AbstractDataset
+
+
+class OptionalDataset(AbstractDataset):
+    """
+    Wraps another data set and loads an empty ``pd.DataFrame`` while the wrapped one
+    does not exist yet. Used for the outputs of a previous run (warm-start
+    parameters, incremental state, ...) which are missing on the very first run.
+
+    Example:
+    ::
+
+        arima_params_previous:
+          type: pepsico_course.extras.datasets.OptionalDataset
+          dataset:
+            type: pandas.ParquetDataSet
+            filepath: data/06_models/arima_params.pq
+    """
+
+    def __init__(self, dataset: Union[str, Dict[str, Any]],
+                 metadata: Dict[str, Any] = None):
+        dataset = deepcopy(dataset) if isinstance(dataset, dict) else {"type": dataset}
+        self._dataset = AbstractDataset.from_config("_optional", dataset)
+        self.metadata = metadata
+
+    def _load(self) -> Any:
+        if self._dataset.exists():
+            return self._dataset.load()
+        return pd.DataFrame()
+
+    def _save(self, data: Any) -> None:
+        self._dataset.save(data)
+
+    def _exists(self) -> bool:
+        return True
+
+    def _release(self) -> None:
+        self._dataset.release()
+
+    def _describe(self) -> Dict[str, Any]:
+        # pylint: disable=protected-access
+        return {"dataset": self._dataset._describe()}
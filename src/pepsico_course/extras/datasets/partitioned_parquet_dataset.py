@@ -0,0 +1,261 @@
+import logging
+import zlib
+from copy import deepcopy
+from pathlib import PurePosixPath
+from typing import Any, Dict, List, Optional
+
+import fsspec
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from kedro.io import AbstractDataset
+from kedro.io.core import get_filepath_str, get_protocol_and_path
+
+log = logging.getLogger(__name__)
+
+
+class PartitionedParquetDataset(AbstractDataset[pd.DataFrame, pd.DataFrame]):
+    """
+    Hive-style partitioned Parquet directory, e.g.
+    ``category=snack/model_bucket=3/<guid>.parquet``. Besides the ``partition_cols``
+    the rows are spread over ``n_buckets`` buckets of a hash of ``bucket_by``
+    (usually ``model_id``), so a subset of DFUs only reads the buckets they live in.
+
+    Loads support column projection (``load_args.columns``) and filters, either
+    pyarrow filters in ``load_args.filters`` or the ``partition_filters``
+    parameters pushed down by ``pepsico_course.hooks.PartitionFilterHooks``.
+    A filter on a column the data set does not have is resolved through the
+    ``keys_from`` data set: the rows kept are the ones of its ``bucket_by`` values
+    under the same filters. While filters are set, saving only rewrites the
+    partitions of the subset and keeps the rows of the other DFUs.
+
+    Example:
+    ::
+
+        model_input:
+          type: pepsico_course.extras.datasets.PartitionedParquetDataset
+          filepath: data/05_model_input/model_input
+          bucket_by: model_id
+          keys_from: facts_data # has the `category` of every model_id
+          load_args:
+            sort_by: [model_id, time_var]
+    """
+
+    BUCKET_COLUMN = "model_bucket"
+    SCHEMA_FILE = "_common_metadata"
+    DEFAULT_SAVE_ARGS = {"compression": "snappy"}
+
+    def __init__(  # noqa: too-many-arguments
+        self,
+        filepath: str,
+        partition_cols: Optional[List[str]] = None,
+        bucket_by: Optional[str] = None,
+        n_buckets: int = 16,
+        keys_from: Optional[str] = None,
+        load_args: Dict[str, Any] = None,
+        save_args: Dict[str, Any] = None,
+        credentials: Dict[str, Any] = None,
+        fs_args: Dict[str, Any] = None,
+        metadata: Dict[str, Any] = None,
+    ):
+        protocol, path = get_protocol_and_path(filepath)
+        self._protocol = protocol
+        self._fs = fsspec.filesystem(protocol, **(credentials or {}), **(fs_args or {}))
+        self._filepath = PurePosixPath(path)
+
+        self._partition_cols = list(partition_cols or [])
+        self._bucket_by = bucket_by
+        self._n_buckets = n_buckets
+        self.keys_from = keys_from
+        self._keys: Optional["PartitionedParquetDataset"] = None
+        self._load_args = deepcopy(load_args or {})
+        self._save_args = {**self.DEFAULT_SAVE_ARGS, **(save_args or {})}
+        self._filters: Dict[str, List] = {}
+        self.metadata = metadata
+
+    @property
+    def _path(self) -> str:
+        return get_filepath_str(self._filepath, self._protocol)
+
+    @property
+    def _schema_path(self) -> str:
+        return f"{self._path}/{self.SCHEMA_FILE}"
+
+    def _schema(self) -> pa.Schema:
+        return pq.read_schema(self._schema_path, filesystem=self._fs)
+
+    def set_filters(self, filters: Dict[str, Optional[List]],
+                    keys: Optional["PartitionedParquetDataset"] = None) -> None:
+        """
+        Restricts every load (and save) to the rows whose columns take the given
+        values, `keys` is the `keys_from` data set (with the same filters)
+        """
+        self._filters = {
+            column: list(values) for column, values in filters.items() if values
+        }
+        self._keys = keys
+
+    def _bucket(self, values: pd.Series) -> np.ndarray:
+        """Stable hash bucket of each value, computed once per distinct value"""
+        codes, uniques = pd.factorize(values)
+        buckets = np.array(
+            [zlib.crc32(str(value).encode()) % self._n_buckets for value in uniques],
+            dtype="int32",
+        )
+        return np.where(codes >= 0, buckets[codes], -1)
+
+    @staticmethod
+    def _in_subset(data: pd.DataFrame, filters: Dict[str, List]) -> np.ndarray:
+        return np.logical_and.reduce(
+            [data[column].isin(values).to_numpy() for column, values in filters.items()]
+        )
+
+    def _column_filters(self, column: str, values: List) -> List:
+        filters = [(column, "in", values)]
+        if column == self._bucket_by:
+            buckets = sorted(set(self._bucket(pd.Series(values)).tolist()))
+            filters.append((self.BUCKET_COLUMN, "in", buckets))
+        return filters
+
+    def _values(self, column: str) -> List:
+        """Distinct values of `column` in the rows selected by the filters"""
+        schema = self._schema()
+        data = self._read(schema, self._pyarrow_filters(schema), [column])
+        return data[column].unique().tolist()
+
+    def _pyarrow_filters(self, schema: pa.Schema) -> Optional[List]:
+        """
+        Conjunction of the catalog filters and the `partition_filters`, the ones on
+        columns this data set does not have are resolved to `bucket_by` values
+        through the `keys_from` data set (or ignored without one)
+        """
+        filters = list(self._load_args.get("filters") or [])
+        missing = []
+        for column, values in self._filters.items():
+            if column in schema.names:
+                filters.extend(self._column_filters(column, values))
+            else:
+                missing.append(column)
+        if not missing:
+            return filters or None
+
+        name = self._filepath.name
+        if (
+            self._keys is not None
+            and self._bucket_by in schema.names
+            and self._keys.exists()
+        ):
+            keys = self._keys._values(self._bucket_by)  # noqa: protected-access
+            filters.extend(self._column_filters(self._bucket_by, keys))
+            log.info(
+                f"{name} has no column {missing}, filtered on the {len(keys)} "
+                f"{self._bucket_by}s of {self.keys_from} in the subset"
+            )
+        else:
+            log.info(f"{name} has no column {missing}, its filters are ignored")
+        return filters or None
+
+    def _read(
+        self,
+        schema: pa.Schema,
+        filters: Optional[List],
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        table = pq.read_table(
+            self._path,
+            columns=columns,
+            filters=filters,
+            filesystem=self._fs,
+            partitioning="hive",
+        )
+        data = table.to_pandas()
+
+        for column in data.columns.intersection(self._partition_cols):
+            # Partition values come back as dictionaries, restore the original type
+            field_type = schema.field(column).type
+            if not pa.types.is_dictionary(field_type):
+                data[column] = data[column].astype(field_type.to_pandas_dtype())
+        for column in data.select_dtypes("category").columns:
+            categories = data[column].cat.categories.sort_values()
+            data[column] = data[column].cat.reorder_categories(categories)
+
+        return data[[column for column in schema.names if column in data.columns]]
+
+    def _load(self) -> pd.DataFrame:
+        schema = self._schema()
+        data = self._read(
+            schema, self._pyarrow_filters(schema), self._load_args.get("columns")
+        )
+
+        if self._load_args.get("sort_by"):
+            data = data.sort_values(self._load_args["sort_by"]).reset_index(drop=True)
+        return data
+
+    def _save(self, data: pd.DataFrame) -> None:
+        partition_cols = list(self._partition_cols)
+        if self._bucket_by:
+            buckets = self._bucket(data[self._bucket_by])
+            data = data.assign(**{self.BUCKET_COLUMN: buckets})
+            partition_cols.append(self.BUCKET_COLUMN)
+
+        filters = {
+            column: values
+            for column, values in self._filters.items()
+            if column in data.columns
+        }
+        if filters:
+            data = data[self._in_subset(data, filters)]
+        if self._bucket_by:
+            # The data of a subset run replaces the rows of its own DFUs, even when the
+            # filters are on columns this data set does not have (e.g. `category`)
+            filters = {self._bucket_by: data[self._bucket_by].unique().tolist()}
+
+        if self._filters and filters and self._exists():
+            # Subset run: the rest of the touched partitions is kept as it was
+            schema = self._schema()
+            touched = [
+                (column, "in", data[column].unique().tolist())
+                for column in partition_cols
+            ]
+            existing = self._read(schema, touched or None)
+            if self._bucket_by:
+                existing[self.BUCKET_COLUMN] = self._bucket(existing[self._bucket_by])
+            kept = existing[~self._in_subset(existing, filters)]
+            data = pd.concat([kept, data[existing.columns]], ignore_index=True)
+            # Categoricals with different categories are concatenated as objects,
+            # but every file of the directory must keep the dictionary type
+            for column in kept.select_dtypes("category").columns:
+                data[column] = data[column].astype("category")
+        elif self._fs.exists(self._path):
+            self._fs.rm(self._path, recursive=True)
+
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        pq.write_to_dataset(
+            table,
+            self._path,
+            partition_cols=partition_cols,
+            filesystem=self._fs,
+            existing_data_behavior="delete_matching",
+            **self._save_args,
+        )
+        schema = table.schema
+        if self._bucket_by:
+            schema = schema.remove(schema.get_field_index(self.BUCKET_COLUMN))
+        pq.write_metadata(schema, self._schema_path, filesystem=self._fs)
+        self._fs.invalidate_cache(self._path)
+
+    def _exists(self) -> bool:
+        return self._fs.exists(self._schema_path)
+
+    def _describe(self) -> Dict[str, Any]:
+        return {
+            "filepath": self._filepath,
+            "protocol": self._protocol,
+            "partition_cols": self._partition_cols,
+            "bucket_by": self._bucket_by,
+            "n_buckets": self._n_buckets,
+            "keys_from": self.keys_from,
+            "load_args": self._load_args,
+            "filters": self._filters,
+        }
@@ -0,0 +1,376 @@
+"""Project hooks, registered in `settings.py`"""
+import cProfile
+import io
+import json
+import logging
+import pstats
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+import pandas as pd
+from kedro.framework.hooks import hook_impl
+from kedro.io import DataCatalog, MemoryDataset
+from kedro.pipeline import Pipeline
+from kedro.pipeline.node import Node
+
+import pepsico_course
+from pepsico_course.extras.datasets import PartitionedParquetDataset
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+log = logging.getLogger(__name__)
+
+
+class PartitionFilterHooks:
+    """
+    Pushes the `partition_filters` parameters down to every partitioned data set of
+    the catalog, e.g. ``kedro run --params "partition_filters.category=[snack]"``
+    only loads (and rewrites) the snack partitions. The data sets without a
+    `category` column get the snack DFUs of their `keys_from` data set
+
+    Only the partitioned data sets can merge the rows of a subset into the ones of
+    the other DFUs. A filtered run whose nodes downstream of them write any other
+    persisted data set (a model, a report, ...) would overwrite it with the results
+    of the subset alone, so it is refused before any node runs
+    """
+
+    def __init__(self):
+        self._filters: Dict[str, Any] = {}
+
+    @hook_impl
+    def after_catalog_created(self, catalog: DataCatalog,
+                              feed_dict: Dict[str, Any]) -> None:
+        parameters = feed_dict.get("parameters", {})
+        filters = {column: values for column, values in
+                   (parameters.get("partition_filters") or {}).items() if values}
+        self._filters = filters
+        if not filters:
+            return
+
+        for name in catalog.list():
+            dataset = catalog._get_dataset(name)  # noqa: protected-access
+            if isinstance(dataset, PartitionedParquetDataset):
+                keys = None
+                if dataset.keys_from:
+                    keys = catalog._get_dataset(dataset.keys_from)  # noqa: protected-access
+                dataset.set_filters(filters, keys)
+                log.info(f"Partition filters of '{name}': {filters}")
+
+    @hook_impl
+    def before_pipeline_run(self, pipeline: Pipeline, catalog: DataCatalog) -> None:
+        if not self._filters:
+            return
+
+        names = set(catalog.list())
+        datasets = {name: catalog._get_dataset(name)  # noqa: protected-access
+                    for name in pipeline.data_sets() if name in names}
+        partitioned = [name for name, dataset in datasets.items()
+                       if isinstance(dataset, PartitionedParquetDataset)]
+        if not partitioned:
+            return
+        downstream = pipeline.from_inputs(*partitioned)
+        mergeable = (PartitionedParquetDataset, MemoryDataset)
+        unmergeable = sorted(name for name in downstream.all_outputs()
+                             if name in datasets
+                             and not isinstance(datasets[name], mergeable))
+        if unmergeable:
+            raise ValueError(
+                f"The partition filters {self._filters} would overwrite {unmergeable} "
+                f"with the results of the subset alone. Run without "
+                f"`partition_filters`, or only up to the partitioned data sets (e.g. "
+                f"--to-outputs model_input)")
+
+
+def _n_rows(data: Any) -> Optional[int]:
+    """
+    Rows of a data frame or array, None for anything else (parameters, models, chunk
+    generators, ...)
+    """
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        return len(data)
+    shape = getattr(data, "shape", None)
+    return int(shape[0]) if shape else None
+
+
+def _reset_peak_rss() -> None:
+    """Resets the peak RSS of the process (Linux only), to measure it per node"""
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """
+    Peak RSS of the process since the last reset (since it started where it cannot
+    be reset)
+    """
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is not None:
+        # kilobytes on Linux, bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return None
+
+
+def _cpu_seconds() -> float:
+    """
+    CPU time of the process, all its threads, and of its finished child processes
+    (e.g. SARIMAX workers)
+    """
+    if resource is None:
+        return time.process_time()
+    usages = (resource.getrusage(resource.RUSAGE_SELF),
+              resource.getrusage(resource.RUSAGE_CHILDREN))
+    return sum(usage.ru_utime + usage.ru_stime for usage in usages)
+
+
+class ProfilingHooks:
+    """
+    Records, for every node of a run, its wall and CPU time, the time spent loading
+    its inputs and saving its outputs, its peak RSS and how much the RSS grew while
+    it ran (the estimate `MemoryAwareRunner` schedules with) and the rows it reads
+    and writes, plus the load / save times of every data set. The report of the run
+    is written to ``profiling.report_dir`` (parameters) as JSON and as a Parquet
+    table of the nodes, so runs of different releases can be compared
+
+    The nodes listed in ``profiling.profile_nodes`` also run under ``cProfile``,
+    their stats are saved next to the report (``.prof``, open with ``snakeviz`` or
+    ``pstats``). With ``profiler: pyinstrument`` they run under the pyinstrument
+    sampling profiler instead, if it is installed (HTML report)
+
+    The peak RSS is the one of the process and each node resets it when it starts.
+    A node still running when another one starts (``MemoryAwareRunner``) cannot
+    tell its own growth from the reset, its ``memory_added_mb`` is left empty and
+    only the peak RSS of the process while it ran is recorded
+
+    The compute time of generator nodes (e.g. the ingestion ones) includes their
+    chunks, which are computed while they are being saved. Nodes run by
+    ``ParallelRunner`` run in other processes and are not recorded
+    """
+
+    def __init__(self):
+        self._options: Dict[str, Any] = {}
+        self._nodes: Dict[str, Dict[str, Any]] = {}
+        self._datasets: Dict[str, Dict[str, Any]] = {}
+        self._clocks: Dict[str, Dict[str, float]] = {}
+        self._profilers: Dict[str, Any] = {}
+        # Nodes between their start and the end of their function, and the ones of
+        # them whose peak RSS was reset by another node
+        self._running: Set[str] = set()
+        self._overlapped: Set[str] = set()
+        self._lock = threading.Lock()
+        self._run_start = None
+
+    @property
+    def _enabled(self) -> bool:
+        return bool(self._options.get("enabled"))
+
+    @hook_impl
+    def after_catalog_created(self, feed_dict: Dict[str, Any]) -> None:
+        self._options = feed_dict.get("parameters", {}).get("profiling") or {}
+
+    @hook_impl
+    def before_pipeline_run(self, run_params: Dict[str, Any]) -> None:
+        self._nodes, self._datasets, self._clocks, self._profilers = {}, {}, {}, {}
+        self._running, self._overlapped = set(), set()
+        self._run_start = (datetime.now(), time.perf_counter())
+
+    def _start(self, node: Node) -> None:
+        with self._lock:
+            if node.name in self._nodes:
+                return
+            # The reset hides the peak of the running nodes from them, it is kept first
+            peak = _peak_rss_mb()
+            for name in self._running:
+                if peak is not None:
+                    record = self._nodes[name]
+                    record["peak_rss_mb"] = max(record["peak_rss_mb"] or 0, peak)
+                self._overlapped.add(name)
+            _reset_peak_rss()
+            self._running.add(node.name)
+            self._start_record(node)
+
+    def _start_record(self, node: Node) -> None:
+        self._nodes[node.name] = {"node": node.name, "wall_seconds": 0.0,
+                                  "cpu_seconds": 0.0, "load_seconds": 0.0,
+                                  "save_seconds": 0.0, "compute_seconds": 0.0,
+                                  "peak_rss_mb": None, "memory_added_mb": None,
+                                  "input_rows": 0, "output_rows": 0}
+        # Right after the reset the peak is the current RSS
+        self._clocks[node.name] = {"wall": time.perf_counter(), "cpu": _cpu_seconds(),
+                                   "rss": _peak_rss_mb()}
+
+    def _update(self, node: Node) -> None:
+        record, clock = self._nodes[node.name], self._clocks[node.name]
+        record["wall_seconds"] = time.perf_counter() - clock["wall"]
+        record["cpu_seconds"] = _cpu_seconds() - clock["cpu"]
+        record["compute_seconds"] = (record["wall_seconds"] - record["load_seconds"]
+                                     - record["save_seconds"])
+        peak = _peak_rss_mb()
+        if peak is not None:
+            record["peak_rss_mb"] = max(record["peak_rss_mb"] or 0, peak)
+            if node.name not in self._overlapped:
+                record["memory_added_mb"] = record["peak_rss_mb"] - clock["rss"]
+
+    def _dataset_io(self, dataset_name: str, node: Node, data: Any,
+                    io_type: str) -> None:
+        seconds = time.perf_counter() - self._clocks[node.name].pop(io_type)
+        rows = _n_rows(data)
+        record = self._nodes[node.name]
+        record[f"{io_type}_seconds"] += seconds
+        record["input_rows" if io_type == "load" else "output_rows"] += rows or 0
+
+        if dataset_name.startswith("params:") or dataset_name == "parameters":
+            return
+        dataset = self._datasets.setdefault(dataset_name, {
+            "dataset": dataset_name,
+            "loads": 0, "load_seconds": 0.0, "rows_loaded": None,
+            "saves": 0, "save_seconds": 0.0, "rows_saved": None})
+        dataset[f"{io_type}s"] += 1
+        dataset[f"{io_type}_seconds"] += seconds
+        if rows is not None and io_type == "load":
+            dataset["rows_loaded"] = rows
+        elif rows is not None:
+            # all the chunks of a generator node
+            dataset["rows_saved"] = (dataset["rows_saved"] or 0) + rows
+
+    @hook_impl
+    def before_dataset_loaded(self, dataset_name: str, node: Node) -> None:
+        if self._enabled:
+            self._start(node)
+            self._clocks[node.name]["load"] = time.perf_counter()
+
+    @hook_impl
+    def after_dataset_loaded(self, dataset_name: str, data: Any, node: Node) -> None:
+        if self._enabled:
+            self._dataset_io(dataset_name, node, data, "load")
+
+    @hook_impl
+    def before_node_run(self, node: Node) -> None:
+        if not self._enabled:
+            return
+        self._start(node)
+        if self._is_profiled(node.name):
+            self._profilers[node.name] = self._start_profiler()
+
+    @hook_impl
+    def after_node_run(self, node: Node) -> None:
+        if not self._enabled:
+            return
+        profiler = self._profilers.pop(node.name, None)
+        if profiler is not None:
+            self._save_profile(node.name, profiler)
+        with self._lock:
+            self._update(node)
+            self._running.discard(node.name)
+
+    @hook_impl
+    def before_dataset_saved(self, dataset_name: str, node: Node) -> None:
+        if self._enabled:
+            self._clocks[node.name]["save"] = time.perf_counter()
+
+    @hook_impl
+    def after_dataset_saved(self, dataset_name: str, data: Any, node: Node) -> None:
+        if self._enabled:
+            self._dataset_io(dataset_name, node, data, "save")
+            self._update(node)
+
+    @hook_impl
+    def on_node_error(self, error: Exception, node: Node) -> None:
+        if self._enabled and node.name in self._nodes:
+            self._profilers.pop(node.name, None)
+            with self._lock:
+                self._update(node)
+                self._running.discard(node.name)
+            self._nodes[node.name]["error"] = repr(error)
+
+    @hook_impl
+    def after_pipeline_run(self, run_params: Dict[str, Any]) -> None:
+        if self._enabled:
+            self._write_report(run_params)
+
+    @hook_impl
+    def on_pipeline_error(self, error: Exception, run_params: Dict[str, Any]) -> None:
+        if self._enabled:
+            self._write_report(run_params, error)
+
+    def _is_profiled(self, node_name: str) -> bool:
+        """
+        Nodes are listed with or without their namespace (`data_science.arima_node`
+        or `arima_node`)
+        """
+        nodes = set(self._options.get("profile_nodes") or [])
+        return node_name in nodes or node_name.split(".")[-1] in nodes
+
+    def _start_profiler(self):
+        if self._options.get("profiler", "cprofile") == "pyinstrument":
+            try:
+                from pyinstrument import Profiler  # noqa: import-outside-toplevel
+            except ImportError:
+                log.warning("pyinstrument is not installed, profiling with cProfile")
+            else:
+                profiler = Profiler()
+                profiler.start()
+                return profiler
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _report_dir(self) -> Path:
+        report_dir = Path(self._options.get("report_dir",
+                                            "data/08_reporting/profiling"))
+        report_dir.mkdir(parents=True, exist_ok=True)
+        return report_dir
+
+    def _save_profile(self, node_name: str, profiler: Any) -> None:
+        stem = self._report_dir() / f"{self._run_start[0]:%Y%m%dT%H%M%S}_{node_name}"
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            profiler.dump_stats(f"{stem}.prof")
+            stats = io.StringIO()
+            top = pstats.Stats(profiler, stream=stats).sort_stats("cumulative")
+            top.print_stats(15)
+            log.info(f"cProfile of {node_name}, saved to {stem}.prof:\n"
+                     f"{stats.getvalue()}")
+        else:
+            profiler.stop()
+            Path(f"{stem}.html").write_text(profiler.output_html())
+            log.info(f"Profile of {node_name} saved to {stem}.html")
+
+    def _write_report(self, run_params: Dict[str, Any],
+                      error: Exception = None) -> None:
+        started, start = self._run_start
+        nodes = pd.DataFrame(list(self._nodes.values()))
+        report = {
+            "session_id": run_params.get("session_id"),
+            "pipeline": run_params.get("pipeline_name") or "__default__",
+            "version": pepsico_course.__version__,
+            "started": started.isoformat(timespec="seconds"),
+            "wall_seconds": time.perf_counter() - start,
+            "error": repr(error) if error else None,
+            "nodes": list(self._nodes.values()),
+            "datasets": list(self._datasets.values()),
+        }
+
+        stem = self._report_dir() / f"{started:%Y%m%dT%H%M%S}_{report['pipeline']}"
+        Path(f"{stem}.json").write_text(json.dumps(report, indent=2, default=str))
+        if len(nodes):
+            nodes = nodes.assign(session_id=report["session_id"],
+                                 pipeline=report["pipeline"],
+                                 version=report["version"], started=started)
+            nodes.to_parquet(f"{stem}_nodes.parquet", index=False)
+
+            slowest = nodes.nlargest(5, "wall_seconds")
+            log.info(f"Run profile saved to {stem}.json, slowest nodes: " + ", ".join(
+                f"{row.node} {row.wall_seconds:.2f}s" for row in slowest.itertuples()))
@@ -0,0 +1,166 @@
+"""Dense (DFU x week) representation of the weekly series, shared by the stages"""
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+WEEK = pd.Timedelta(weeks=1)
+
+
+class Panel:
+    """
+    Weekly series of many DFUs as a (n_dfu, n_weeks) array on a common calendar
+
+    - `values`: float32 array when every value fits exactly in its 24 bits of
+      mantissa, float64 otherwise, NaN where there is no value
+    - `mask`: True on the cells that are rows of the long format. A row can hold a
+      NaN value, so the mask is kept apart from the values
+    - `keys`: one row per DFU with its key columns, in the order of the rows of `values`
+    - `weeks`: the calendar, one column of `values` per week
+
+    It is built once from the long DataFrame of the catalog (`from_long`) and the
+    kernels (gap filling, counts) work on every DFU at once, instead of a `groupby`
+    + `apply` per stage. `to_long` goes back to the long format, sorted by the keys
+    and the week
+    """
+
+    def __init__(self, values: np.ndarray, mask: np.ndarray, keys: pd.DataFrame,
+                 weeks: pd.DatetimeIndex, time_var: str = 'time_var',
+                 value_name: str = 'shipments', value_dtype=np.float64):
+        if values.shape != mask.shape or values.shape != (len(keys), len(weeks)):
+            raise ValueError(f'values {values.shape} and mask {mask.shape} should be '
+                             f'(n_dfu, n_weeks) = ({len(keys)}, {len(weeks)})')
+        self.values = values
+        self.mask = mask
+        self.keys = keys
+        self.weeks = weeks
+        self.time_var = time_var
+        self.value_name = value_name
+        self.value_dtype = value_dtype
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def __repr__(self) -> str:
+        return (f'Panel({self.shape[0]} DFUs x {self.shape[1]} weeks, '
+                f'{int(self.mask.sum())} rows, keys={list(self.keys.columns)})')
+
+    @classmethod
+    def from_long(cls, df: pd.DataFrame, keys: List[str], time_var: str = 'time_var',
+                  value: str = 'shipments') -> 'Panel':
+        """
+        Panel of the long DataFrame `df` (one row per DFU and week). The calendar goes
+        from the first to the last week of `df`, every date has to be a monday (on the
+        same time of the day) and a DFU cannot have two rows on the same week.
+        Rows with a missing key are left out, as in a `groupby`
+        """
+        times = pd.to_datetime(df[time_var])
+        group = df.groupby(keys, observed=True, sort=True)
+        dfu = group.ngroup().to_numpy()
+        dfu_keys = group.size().index.to_frame(index=False)
+        has_key = dfu >= 0
+
+        if not has_key.any():
+            no_weeks = pd.DatetimeIndex([], tz=getattr(times.dtype, 'tz', None))
+            return cls(np.empty((0, 0), dtype=np.float32), np.empty((0, 0), dtype=bool),
+                       dfu_keys, no_weeks, time_var, value, df[value].dtype)
+
+        times = times[has_key]
+        first = times.min()
+        offsets = (times - first).to_numpy()
+        if first.weekday() != 0 or (offsets % WEEK.to_timedelta64()).any():
+            raise ValueError(f'`{time_var}` is not on the mondays of a weekly calendar')
+        week = (offsets // WEEK.to_timedelta64()).astype(np.int64)
+
+        weeks = pd.date_range(first, periods=week.max() + 1, freq='7D', name=time_var)
+        rows, cols = dfu[has_key], week
+        if np.unique(rows * len(weeks) + cols).size < len(rows):
+            raise ValueError(f'Some DFUs have more than one row on the same '
+                             f'`{time_var}`')
+
+        source = df[value].to_numpy(dtype=np.float64)[has_key]
+        # float32 only when it does not round any value
+        exact = np.array_equal(source.astype(np.float32), source, equal_nan=True)
+        values = np.full((len(dfu_keys), len(weeks)), np.nan,
+                         dtype=np.float32 if exact else np.float64)
+        mask = np.zeros(values.shape, dtype=bool)
+        values[rows, cols] = source
+        mask[rows, cols] = True
+        return cls(values, mask, dfu_keys, weeks, time_var, value, df[value].dtype)
+
+    def to_long(self) -> pd.DataFrame:
+        """
+        Long DataFrame of the cells of the mask, sorted by the keys and the week,
+        with the value in its original dtype (float64 when an integer value has
+        NaN)
+        """
+        rows, cols = np.nonzero(self.mask)
+        df = self.keys.iloc[rows].reset_index(drop=True)
+        df[self.time_var] = self.weeks[cols]
+        values = self.values[rows, cols]
+        # Integer values with gaps become float, as in a merge
+        integer = (pd.api.types.is_integer_dtype(self.value_dtype)
+                   and not np.isnan(values).any())
+        df[self.value_name] = values.astype(self.value_dtype if integer else np.float64)
+        return df
+
+    def _replace(self, **attributes) -> 'Panel':
+        panel = Panel(self.values, self.mask, self.keys, self.weeks, self.time_var,
+                      self.value_name, self.value_dtype)
+        panel.__dict__.update(attributes)
+        return panel
+
+    def select(self, dfus: np.ndarray) -> 'Panel':
+        """Panel of some of the DFUs (boolean mask or positions)"""
+        return self._replace(values=self.values[dfus], mask=self.mask[dfus],
+                             keys=self.keys.iloc[dfus].reset_index(drop=True))
+
+    def span(self) -> np.ndarray:
+        """Cells between the first and the last row of each DFU"""
+        n_weeks = self.shape[1]
+        if 0 in self.shape:
+            return np.zeros(self.shape, dtype=bool)
+        has_rows = self.mask.any(axis=1)
+        first = self.mask.argmax(axis=1)
+        last = n_weeks - 1 - self.mask[:, ::-1].argmax(axis=1)
+        weeks = np.arange(n_weeks)
+        return has_rows[:, None] & (weeks >= first[:, None]) & (weeks <= last[:, None])
+
+    def fill_gaps(self, method: Optional[str] = None) -> 'Panel':
+        """
+        Every week between the first and the last row of each DFU becomes a row,
+        the value of the new ones taken from the previous row (`ffill` / `pad`), the
+        next one (`bfill` / `backfill`) or the nearest one (`nearest`, the next one
+        on ties, as `reindex` does). Without `method` the new rows are NaN
+        """
+        if 0 in self.shape:
+            return self
+        span = self.span()
+        weeks = np.arange(self.shape[1])
+        previous = np.maximum.accumulate(np.where(self.mask, weeks, -1), axis=1)
+        following = np.where(self.mask, weeks, self.shape[1])[:, ::-1]
+        following = np.minimum.accumulate(following, axis=1)[:, ::-1]
+
+        if method is None:
+            source = np.where(self.mask, weeks, -1)
+        elif method in ('ffill', 'pad'):
+            source = previous
+        elif method in ('bfill', 'backfill'):
+            source = following
+        elif method == 'nearest':
+            source = np.where(following - weeks <= weeks - previous, following,
+                              previous)
+        else:
+            raise ValueError(f'Unknown fill method {method}, expected ffill, bfill, '
+                             f'nearest or None')
+
+        dfus = np.arange(self.shape[0])[:, None]
+        values = np.where(span & (source >= 0) & (source < self.shape[1]),
+                          self.values[dfus, source.clip(0, self.shape[1] - 1)],
+                          np.nan).astype(self.values.dtype)
+        return self._replace(values=values, mask=span)
+
+    def count(self, value: float) -> np.ndarray:
+        """Rows of each DFU equal to `value`"""
+        return ((self.values == value) & self.mask).sum(axis=1)
@@ -12,5 +12,10 @@ def register_pipelines() -> dict[str, Pipeline]:
         A mapping from pipeline names to ``Pipeline`` objects.
     """
     pipelines = find_pipelines()
-    pipelines["__default__"] = sum(pipelines.values())
+    # `refresh` writes the same outputs as the full pipelines, `backtesting` is an
+    # evaluation of them, `scoring` reuses the models they saved and `tuning` searches
+    # their LightGBM parameters, they only run on their own
+    standalone = ("refresh", "backtesting", "scoring", "tuning")
+    pipelines["__default__"] = sum(pipe for name, pipe in pipelines.items()
+                                   if name not in standalone)
     return pipelines
@@ -0,0 +1,252 @@
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from typing import Callable, Dict, List, Tuple
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+
+from pepsico_course.pipelines.data_science.nodes.metrics.metrics import compute_metrics
+from pepsico_course.pipelines.data_science.nodes.modeling.modeling import _lgb_features
+
+log = logging.getLogger(__name__)
+
+MODELS = ['arima', 'lgbm']
+
+
+def make_folds(df: pd.DataFrame, horizon: int, time_var: str, n_origins: int,
+               step: int) -> List[Tuple]:
+    """
+    Rolling origins on the calendar shared by all the DFUs. The last origin is the
+    forecast start of the single split of `data_science` (`horizon` weeks before the
+    end), the previous ones go back `step` weeks at a time. Each fold is the pair
+    `(origin, end)`: trained on the weeks before `origin`, evaluated up to `end`
+    (excluded)
+
+    Returns:
+        List[Tuple]: Folds in chronological order
+    """
+    weeks = df[time_var].drop_duplicates().sort_values().reset_index(drop=True)
+    last = len(weeks) - horizon
+    first = max(last - n_origins * step, 0)
+    positions = sorted(range(last, first, -step))
+    end = weeks.iloc[-1] + pd.Timedelta(1, 'ns')
+    return [(weeks[position],
+             weeks[position + horizon] if position + horizon < len(weeks) else end)
+            for position in positions]
+
+
+def _fold_rows(times: pd.Series, origin, end) -> Tuple[np.ndarray, np.ndarray]:
+    return (times < origin).to_numpy(), ((times >= origin) & (times < end)).to_numpy()
+
+
+def _forecasts(model, origin, df, test_rows, time_var, target_var, primary_key, y_hat,
+               predictions) -> pd.DataFrame:
+    return pd.DataFrame({'model': model,
+                         'origin': origin,
+                         primary_key: df[primary_key].to_numpy()[test_rows].astype(str),
+                         time_var: df[time_var].to_numpy()[test_rows],
+                         target_var: df[target_var].to_numpy()[test_rows].astype(float),
+                         y_hat: predictions})
+
+
+def _arima_backtest(chunk: List[pd.DataFrame], folds, time_var, target_var, primary_key,
+                    y_hat, order, seasonal_order, trend, refit=False,
+                    min_train_size=1) -> Tuple[List[pd.DataFrame], List[Dict]]:
+    """
+    Backtests the SARIMAX of a chunk of DFUs. Each DFU is fitted once, at its first
+    origin, the next origins `append` the weeks in between to the fitted model:
+    with the same parameters (`refit=False`, only the Kalman filter runs again) or
+    re-estimated starting from the previous ones (`refit=True`)
+    """
+    forecasts, timings = [], []
+    for df in chunk:
+        df = df.sort_values(time_var).reset_index(drop=True)
+        y = df[target_var].to_numpy(dtype=float)
+        results, n_fitted = None, 0
+        for origin, end in folds:
+            is_train, is_test = _fold_rows(df[time_var], origin, end)
+            n_train, test_rows = int(is_train.sum()), np.flatnonzero(is_test)
+            if n_train < min_train_size or not len(test_rows):
+                continue
+
+            start = time.perf_counter()
+            if results is None:
+                results = sm.tsa.SARIMAX(y[:n_train], order=order,
+                                         seasonal_order=seasonal_order,
+                                         trend=trend).fit(disp=0)
+            elif n_train > n_fitted:
+                results = results.append(y[n_fitted:n_train], refit=refit,
+                                         fit_kwargs={'disp': 0} if refit else None)
+            n_fitted = n_train
+            fitted = time.perf_counter()
+            predictions = results.forecast(len(test_rows))
+
+            forecasts.append(_forecasts('arima', origin, df, test_rows, time_var,
+                                        target_var, primary_key, y_hat, predictions))
+            timings.append({'model': 'arima', 'origin': origin, 'n_series': 1,
+                            'n_train_rows': n_train, 'fit_seconds': fitted - start,
+                            'predict_seconds': time.perf_counter() - fitted})
+    return forecasts, timings
+
+
+def _lgb_backtest(df: pd.DataFrame, folds, time_var, target_var, primary_key, y_hat,
+                  params, dataset_params=None, warm_start=False,
+                  update_rounds=20) -> Tuple[List[pd.DataFrame], List[Dict]]:
+    """
+    Backtests the global LightGBM model on consecutive folds. The features are
+    converted to float32 once and the training sets of the later folds reuse the
+    bins of the first one (`reference`). With `warm_start` the model of a fold
+    continues training the previous one (`init_model`) for `update_rounds` rounds
+    """
+    features, categorical = _lgb_features(df, time_var, target_var, primary_key)
+    x = df[features].to_numpy(dtype=np.float32)
+    y = df[target_var].to_numpy(dtype=np.float32)
+    dataset_params = {'verbose': -1, **(dataset_params or {})}
+
+    forecasts, timings = [], []
+    reference, booster = None, None
+    for origin, end in folds:
+        is_train, is_test = _fold_rows(df[time_var], origin, end)
+        test_rows = np.flatnonzero(is_test)
+
+        start = time.perf_counter()
+        train_set = lgb.Dataset(x[is_train], y[is_train], feature_name=features,
+                                categorical_feature=categorical, params=dataset_params,
+                                reference=reference)
+        if booster is None or not warm_start:
+            booster = lgb.train(params, train_set, keep_training_booster=warm_start)
+        else:
+            booster = lgb.train(params, train_set, num_boost_round=update_rounds,
+                                init_model=booster, keep_training_booster=True)
+        reference = reference or train_set
+        fitted = time.perf_counter()
+        predictions = booster.predict(x[test_rows]) if len(test_rows) else []
+
+        forecasts.append(_forecasts('lgbm', origin, df, test_rows, time_var, target_var,
+                                    primary_key, y_hat, predictions))
+        timings.append({'model': 'lgbm', 'origin': origin,
+                        'n_series': df.loc[is_train, primary_key].nunique(),
+                        'n_train_rows': int(is_train.sum()),
+                        'fit_seconds': fitted - start,
+                        'predict_seconds': time.perf_counter() - fitted})
+    return forecasts, timings
+
+
+def _run_tasks(tasks: List[Tuple[float, str, Callable]], n_workers: int) -> List:
+    """
+    Runs `(cost, name, task)` tasks on a pool of `n_workers` processes, the most
+    expensive ones first so a long task does not start last and leave the other
+    workers idle. `cost` is a rough estimate (rows to fit)
+    """
+    tasks = sorted(tasks, key=lambda task: -task[0])
+    if n_workers <= 1:
+        return [task() for _, _, task in tasks]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        futures = {executor.submit(task): name for _, name, task in tasks}
+        for done, future in enumerate(as_completed(futures), start=1):
+            results.append(future.result())
+            log.info(f"Backtesting task {futures[future]} done ({done}/{len(tasks)})")
+    return results
+
+
+def backtest(df: pd.DataFrame,
+             horizon: int,
+             time_var: str,
+             target_var: str,
+             primary_key: str,
+             y_hat: str,
+             order: List[int],
+             seasonal_order: List[int],
+             trend: str,
+             lgbm_params: Dict,
+             lgb_dataset_options: Dict,
+             backtest_options: Dict) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Rolling-origin backtest of the SARIMAX and LightGBM models of `data_science`
+
+    The folds of both model families are scheduled on the same process pool: the
+    SARIMAX in chunks of `chunk_size` DFUs (all the origins of a DFU in the same
+    task, so the fitted model is carried from one origin to the next) and the
+    LightGBM model as one task, or one task per origin without `lgb_warm_start`
+
+    Args:
+        df (pd.DataFrame): Model input
+        backtest_options (Dict): `models`, `n_origins`, `step` (weeks between
+            origins), `n_workers` (-1 for all the cores), `chunk_size`,
+            `min_train_size`, `arima_refit`, `lgb_warm_start` and `lgb_update_rounds`
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: Forecasts of every fold (one row per
+        model, origin, DFU and week) and the fitting / prediction times of every fold
+    """
+
+    models = backtest_options.get('models', MODELS)
+    n_workers = backtest_options.get('n_workers', 1)
+    if n_workers is None or n_workers < 0:
+        n_workers = os.cpu_count() or 1
+    chunk_size = max(backtest_options.get('chunk_size', 10), 1)
+
+    folds = make_folds(df, horizon, time_var, backtest_options.get('n_origins', 4),
+                       backtest_options.get('step', 4))
+    log.info(f"Backtesting {', '.join(models)} on {len(folds)} origins: "
+             + ', '.join(str(origin.date()) for origin, _ in folds))
+
+    tasks = []
+    if 'arima' in models:
+        refit = backtest_options.get('arima_refit', False)
+        series = [group for _, group in
+                  df[[time_var, target_var, primary_key]].groupby(primary_key,
+                                                                  observed=True)]
+        fit = partial(_arima_backtest, folds=folds, time_var=time_var,
+                      target_var=target_var, primary_key=primary_key, y_hat=y_hat,
+                      order=order, seasonal_order=seasonal_order, trend=trend,
+                      refit=refit,
+                      min_train_size=backtest_options.get('min_train_size', 1))
+        for i in range(0, len(series), chunk_size):
+            chunk = series[i:i + chunk_size]
+            cost = sum(len(group) for group in chunk) * (len(folds) if refit else 1)
+            tasks.append((cost, f'arima[{i // chunk_size}]', partial(fit, chunk)))
+    if 'lgbm' in models:
+        warm_start = backtest_options.get('lgb_warm_start', True)
+        fit = partial(_lgb_backtest, df, time_var=time_var, target_var=target_var,
+                      primary_key=primary_key, y_hat=y_hat, params=lgbm_params,
+                      dataset_params=lgb_dataset_options, warm_start=warm_start,
+                      update_rounds=backtest_options.get('lgb_update_rounds', 20))
+        fold_groups = [folds] if warm_start else [[fold] for fold in folds]
+        for i, fold_group in enumerate(fold_groups):
+            tasks.append((len(df) * len(fold_group), f'lgbm[{i}]',
+                          partial(fit, fold_group)))
+
+    start = time.perf_counter()
+    results = _run_tasks(tasks, min(n_workers, len(tasks)))
+    log.info(f"Backtested {len(tasks)} tasks in {time.perf_counter() - start:.1f}s "
+             f"with {n_workers} workers")
+
+    forecasts = pd.concat([forecast for task_forecasts, _ in results
+                           for forecast in task_forecasts], ignore_index=True)
+    # Weeks ahead of the origin, within the forecast window of each DFU
+    forecasts = forecasts.sort_values(['model', 'origin', primary_key, time_var],
+                                      ignore_index=True)
+    dfu_origins = forecasts.groupby(['model', 'origin', primary_key])
+    forecasts['step'] = dfu_origins.cumcount() + 1
+    categories = ['model', primary_key]
+    forecasts[categories] = forecasts[categories].astype('category')
+
+    timings = pd.DataFrame([timing for _, task_timings in results
+                            for timing in task_timings])
+    timings = timings.groupby(['model', 'origin'], as_index=False).sum()
+
+    metrics = compute_metrics(forecasts, ['model', 'origin'], y=target_var,
+                              y_pred=y_hat)
+    for row in metrics.itertuples():
+        log.info(f"{row.model} from {row.origin.date()}: accuracy {row.accuracy:.3f}, "
+                 f"bias {row.bias:+.3f}")
+
+    return forecasts, timings
@@ -0,0 +1,48 @@
+from kedro.pipeline import Pipeline, node
+from kedro.pipeline.modular_pipeline import pipeline
+
+from .nodes.backtesting import backtest
+
+# Same models as `data_science`
+PARAMETERS = {
+    f"params:{name}": f"params:data_science.{name}"
+    for name in ["general_options.horizon", "general_options.time_var",
+                 "general_options.target_var", "general_options.primary_key",
+                 "general_options.y_hat", "arima_model_options.order",
+                 "arima_model_options.seasonal_order", "arima_model_options.trend",
+                 "lgb_model_options", "lgb_dataset_options"]
+}
+
+
+def create_pipeline(**kwargs) -> Pipeline:
+    """
+    Rolling-origin backtest of the `data_science` models on the model input. Not
+    part of `__default__`, run with ``kedro run --pipeline backtesting``
+    """
+
+    backtesting_pipeline = pipeline(
+        [
+            node(
+                func=backtest,
+                inputs=["model_input", "params:general_options.horizon",
+                        "params:general_options.time_var",
+                        "params:general_options.target_var",
+                        "params:general_options.primary_key",
+                        "params:general_options.y_hat",
+                        "params:arima_model_options.order",
+                        "params:arima_model_options.seasonal_order",
+                        "params:arima_model_options.trend", "params:lgb_model_options",
+                        "params:lgb_dataset_options", "params:backtest_options"],
+                outputs=["backtest_results", "backtest_timings"],
+                name="backtest_node",
+            ),
+        ]
+    )
+
+    return pipeline(
+        pipe=backtesting_pipeline,
+        namespace="backtesting",
+        inputs=["model_input"],
+        outputs=["backtest_results", "backtest_timings"],
+        parameters=PARAMETERS,
+    )
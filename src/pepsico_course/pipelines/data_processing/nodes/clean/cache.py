@@ -0,0 +1,93 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+class SeriesCache:
+    """
+    On-disk cache of numpy arrays, content-addressed by the input series and the
+    settings used to compute the output. Every entry is stored as one `.npy` file,
+    its modification time is used as last access time so once the cache grows over
+    `max_size_mb` the least recently used entries are evicted first
+    """
+
+    def __init__(self, path: str, max_size_mb: float = 256):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size_mb * 1024 ** 2
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    @staticmethod
+    def key(values: np.ndarray, settings: Dict) -> str:
+        """
+        Hash of the values of a series together with the settings of the computation
+
+        Args:
+            values (np.ndarray): Values of the input series
+            settings (Dict): Parameters which change the output for the same input
+
+        Returns:
+            str: Hexadecimal key of the entry
+        """
+
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        digest = hashlib.sha256(values.tobytes())
+        digest.update(json.dumps(settings, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def _file(self, key: str) -> Path:
+        return self.path / f'{key}.npy'
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Returns the cached array (refreshing its access time) or None if missing"""
+        file = self._file(key)
+        try:
+            values = np.load(file)
+        except (FileNotFoundError, ValueError, OSError):
+            self.misses += 1
+            return None
+        os.utime(file)
+        self.hits += 1
+        return values
+
+    def put(self, key: str, values: np.ndarray) -> None:
+        """
+        Stores an array, written to a temporary file first so readers never see it
+        half-written
+        """
+        file = self._file(key)
+        tmp_file = file.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_file, 'wb') as f:
+            np.save(f, values)
+        os.replace(tmp_file, file)
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used entries until the cache fits in
+        `max_size_mb`
+        """
+        entries = []
+        for file in self.path.glob('*.npy'):
+            stat = file.stat()
+            entries.append((stat.st_mtime, stat.st_size, file))
+
+        size = sum(entry[1] for entry in entries)
+        for _, file_size, file in sorted(entries):
+            if size <= self.max_size:
+                break
+            file.unlink(missing_ok=True)
+            size -= file_size
+            self.evicted += 1
+
+    def log_stats(self, name: str) -> None:
+        log.info(f'{name} cache: {self.hits} hits, {self.misses} misses, '
+                 f'{self.evicted} evicted')
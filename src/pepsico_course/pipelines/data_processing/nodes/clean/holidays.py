@@ -2,7 +2,7 @@ from typing import Dict
 import pandas as pd
 import logging
 
-from .utils import * 
+from .utils import apply_value_mappings, typing_time_dataset
 
 log = logging.getLogger(__name__) 
 
@@ -11,15 +11,6 @@ def _drop_duplicates(df: pd.DataFrame) -> pd.DataFrame:
     df = df.drop_duplicates()
     return df
 
-def _rename_holidays(df: pd.DataFrame, column: str) -> pd.DataFrame:
-    """Removes special characters for a provided column 
-    """
-    type_of_holiday = df[column].unique()
-    for element in type_of_holiday: 
-        df.loc[df[column] == element,column] = element.replace(" de ","").replace(" ","").replace("ñ","n").replace("'","")
-    
-    return df
-
 def clean_holidays(holidays: pd.DataFrame, parameters: Dict) -> pd.DataFrame:
     """Clean holidays raw data
 
@@ -34,6 +25,6 @@ def clean_holidays(holidays: pd.DataFrame, parameters: Dict) -> pd.DataFrame:
     log.info(f'Received parameters: {holidays_params}')
     holidays = typing_time_dataset(holidays, "DT")
     holidays = _drop_duplicates(holidays)
-    holidays = _rename_holidays(holidays, "HOL_NM")
+    holidays = apply_value_mappings(holidays, holidays_params['value_mappings'])
 
     return holidays
\ No newline at end of file
@@ -1,17 +1,38 @@
-from typing import Dict
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional
 import pandas as pd
 import numpy as np
 from statsmodels.tsa.seasonal import STL
 from scipy.stats import mstats
+from pepsico_course.panel import Panel
+from .cache import SeriesCache
 from .utils import create_model_id, normalize_columns
 import logging
 
 log = logging.getLogger(__name__)
 
 
-def _make_continuous(shipments: pd.DataFrame, fill_method: str) -> pd.DataFrame:
+DFU_KEYS = ['prod_code', 'customer', 'location', 'category']
+
+# STL settings of the outlier removal, also part of the winsorize cache key
+STL_PERIOD = 52
+STL_SEASONAL = 53
+
+# `reindex` fill methods expressed as `merge_asof` search directions
+_ASOF_DIRECTIONS = {
+    'pad': 'backward',
+    'ffill': 'backward',
+    'backfill': 'forward',
+    'bfill': 'forward',
+    'nearest': 'nearest',
+}
+
+
+def _make_continuous_legacy(shipments: pd.DataFrame, fill_method: str) -> pd.DataFrame:
     """
-    Make the dataframe continuous, re-indexing based on max_date and min_date
+    Make the dataframe continuous, re-indexing each DFU on its own `pd.date_range`
 
     Args:
         shipments (pd.DataFrame): DataFrame containing the demand 
@@ -21,9 +42,6 @@ def _make_continuous(shipments: pd.DataFrame, fill_method: str) -> pd.DataFrame:
         pd.DataFrame: DataFrame with the `time_var` continuous 
     """
 
-    shipments['time_var'] = pd.to_datetime(shipments['time_var'])
-    old_len = len(shipments)
-
     def _reindex(df: pd.DataFrame, method: str) -> pd.DataFrame:
         """Function that reindex the DataFrame
 
@@ -50,15 +68,161 @@ def _make_continuous(shipments: pd.DataFrame, fill_method: str) -> pd.DataFrame:
     shipments = (shipments
                  .sort_values('time_var')
                  .set_index('time_var')  # Setting the `time_var` needed for re-indexing
-                 .groupby(['prod_code', 'customer', 'location', 'category']) # Calculate at `item level`
+                 # Calculate at `item level`
+                 .groupby(['prod_code', 'customer', 'location', 'category'],
+                          observed=True)
                  ['shipments']
                  .apply(lambda x: _reindex(x, fill_method))
                 .reset_index()
                 .rename(columns={'level_4': 'time_var'})
                 )
 
+    return shipments
+
+
+def _weekly_grid(shipments: pd.DataFrame) -> pd.DataFrame:
+    """
+    Build the weekly (`W-MON`) grid of every DFU in a single pass. For each DFU the
+    grid covers the same dates as `pd.date_range(min_date, max_date, freq='W-MON')`
+
+    Args:
+        shipments (pd.DataFrame): DataFrame containing the demand
+
+    Returns:
+        pd.DataFrame: DataFrame with the DFU keys and the `time_var` of the grid
+    """
+
+    bounds = shipments.groupby(DFU_KEYS, observed=True)['time_var'].agg(['min', 'max'])
+
+    # First monday on or after the first date of the DFU (time of the day is kept)
+    start = bounds['min'] + pd.to_timedelta((-bounds['min'].dt.weekday) % 7, unit='D')
+    n_weeks = ((bounds['max'] - start) // pd.Timedelta(weeks=1) + 1).clip(lower=0)
+
+    # Position of each row inside its DFU: 0, 1, ..., n_weeks - 1
+    offsets = np.arange(n_weeks.sum()) - np.repeat((n_weeks.cumsum() - n_weeks).values,
+                                                   n_weeks.values)
+
+    grid = bounds.index.repeat(n_weeks).to_frame(index=False)
+    grid['time_var'] = (start.repeat(n_weeks).reset_index(drop=True)
+                        + pd.to_timedelta(offsets * 7, unit='D'))
+    return grid
+
+
+def _make_continuous_vectorized(shipments: pd.DataFrame,
+                                fill_method: str) -> pd.DataFrame:
+    """
+    Make the dataframe continuous computing the weekly grid of all the DFUs at once
+    and filling it with an `as-of` merge (exact merge when `fill_method` is None)
+
+    Args:
+        shipments (pd.DataFrame): DataFrame containing the demand
+        fill_method (str): Method for filling the missing datapoints
+
+    Returns:
+        pd.DataFrame: DataFrame with the `time_var` continuous
+    """
+
+    grid = _weekly_grid(shipments)
+    observed = shipments[DFU_KEYS + ['time_var', 'shipments']]
+
+    if fill_method is None:
+        filled = grid.merge(observed, on=DFU_KEYS + ['time_var'], how='left')
+        return filled.sort_values(DFU_KEYS + ['time_var']).reset_index(drop=True)
+
+    if fill_method not in _ASOF_DIRECTIONS:
+        raise ValueError(f'Unknown fill_method {fill_method}, '
+                         f'expected one of {list(_ASOF_DIRECTIONS)}')
+
+    grid = grid.sort_values('time_var')
+    observed = (observed
+                .assign(observed_time=observed['time_var'])
+                .sort_values('time_var')
+                )
+
+    def _asof(direction: str) -> pd.DataFrame:
+        return pd.merge_asof(grid, observed, on='time_var', by=DFU_KEYS,
+                             direction=direction)
+
+    if _ASOF_DIRECTIONS[fill_method] != 'nearest':
+        filled = _asof(_ASOF_DIRECTIONS[fill_method])
+    else:
+        # `merge_asof` breaks ties with the previous point while `reindex` takes the
+        # next one, so both sides are looked up and the tie is resolved here
+        backward = _asof('backward')
+        forward = _asof('forward')
+        backward_distance = backward['time_var'] - backward['observed_time']
+        forward_distance = forward['observed_time'] - forward['time_var']
+        take_forward = (forward_distance.notna()
+                        & ~(backward_distance < forward_distance))
+        filled = backward
+        filled['shipments'] = forward['shipments'].where(take_forward,
+                                                         backward['shipments'])
+
+    filled = filled.drop('observed_time', axis=1)
+    return filled.sort_values(DFU_KEYS + ['time_var']).reset_index(drop=True)
+
+
+_FILL_ENGINES = {
+    'legacy': _make_continuous_legacy,
+    'vectorized': _make_continuous_vectorized,
+}
+
+
+def _continuous_panel(shipments: pd.DataFrame, fill_method: str,
+                      n_zeros: int) -> pd.DataFrame:
+    """
+    `_make_continuous` and `_remove_continuous_zeros` on a `Panel` of the DFUs,
+    built once: the gaps are filled and the zeros counted for every DFU at once
+
+    Args:
+        shipments (pd.DataFrame): DataFrame containing the demand, on the mondays of a
+            weekly calendar
+        fill_method (str): Method for filling the missing datapoints
+        n_zeros (int): Number of zeros for which remove the TimeSeries
+
+    Returns:
+        pd.DataFrame: DataFrame with the `time_var` continuous and the TS with less
+        than `n_zeros` zeros
+    """
+
+    panel = Panel.from_long(shipments, DFU_KEYS, 'time_var', 'shipments')
+    filled = panel.fill_gaps(fill_method)
+    log.info(f'Added {filled.mask.sum() - panel.mask.sum()} new lines with the method '
+             f'{fill_method} (panel engine, {panel.shape[0]} DFUs x {panel.shape[1]} '
+             f'weeks)')
+
+    kept = filled.count(0) < n_zeros
+    log.info(f'Removed {(~kept).sum()} DFUs with too many zeros')
+    return filled.select(kept).to_long()
+
+
+def _make_continuous(shipments: pd.DataFrame, fill_method: str,
+                     engine: str = 'vectorized') -> pd.DataFrame:
+    """
+    Make the dataframe continuous, re-indexing based on max_date and min_date
+
+    Args:
+        shipments (pd.DataFrame): DataFrame containing the demand
+        fill_method (str): Method for filling the missing datapoints
+        engine (str): Gap-filling implementation, `legacy` (per DFU `reindex`)
+            or `vectorized` (single weekly grid for all the DFUs)
+
+    Returns:
+        pd.DataFrame: DataFrame with the `time_var` continuous
+    """
+
+    if engine not in _FILL_ENGINES:
+        raise ValueError(f'Unknown fill engine {engine}, '
+                         f'expected one of {list(_FILL_ENGINES)}')
+
+    shipments['time_var'] = pd.to_datetime(shipments['time_var'])
+    old_len = len(shipments)
+
+    shipments = _FILL_ENGINES[engine](shipments, fill_method)
+
     new_len = len(shipments)
-    log.info(f'Added {new_len-old_len} new lines with the method {fill_method}')
+    log.info(f'Added {new_len-old_len} new lines with the method {fill_method} '
+             f'({engine} engine)')
 
     return shipments
 
@@ -78,7 +242,8 @@ def _remove_continuous_zeros(shipments: pd.DataFrame, n_zeros: int) -> pd.DataFr
     old_n_dfu = len(shipments[['prod_code', 'customer', 'location']].drop_duplicates())
 
     shipments['n_zeros'] = (shipments
-                            .groupby(['prod_code', 'customer', 'location'])
+                            .groupby(['prod_code', 'customer', 'location'],
+                                     observed=True)
                             ['shipments']
                             .transform(lambda x: len(x[x==0]))
                             )
@@ -105,7 +270,8 @@ def _winsorize(df: pd.DataFrame, threshold: float) -> pd.DataFrame:
         pd.DataFrame: DataFrame containing the demand winsorized
     """
 
-    stl = STL(df, period=52, seasonal=53)  # Generate STL decomposition
+    # Generate STL decomposition
+    stl = STL(df, period=STL_PERIOD, seasonal=STL_SEASONAL)
     res = stl.fit()
     
     trend = res.trend 
@@ -127,25 +293,127 @@ def _winsorize(df: pd.DataFrame, threshold: float) -> pd.DataFrame:
     return observed_winsorize
 
 
-def _outlier_removal(shipments: pd.DataFrame, percentile: int) -> pd.DataFrame:
+def _winsorize_chunk(chunk: List[pd.Series], threshold: float) -> List[pd.Series]:
+    """
+    Winsorize a chunk of DFUs. Runs inside the worker processes of `_outlier_removal`
+
+    Args:
+        chunk (List[pd.Series]): Demand of each DFU, sorted by `time_var`
+        threshold (float): Threshold representing the percentiles (in float)
+
+    Returns:
+        List[pd.Series]: Demand winsorized, keeping the index of each input series
+    """
+
+    return [pd.Series(list(_winsorize(series, threshold)), index=series.index,
+                      dtype=float)
+            for series in chunk]
+
+
+def _resolve_n_workers(n_workers: Optional[int]) -> int:
+    """Number of worker processes, `None` or a negative value means one per core"""
+    if n_workers is None or n_workers < 0:
+        return os.cpu_count() or 1
+    return max(n_workers, 1)
+
+
+def _winsorize_all(series: List[pd.Series],
+                   threshold: float,
+                   n_workers: Optional[int],
+                   min_dfus_per_worker: int) -> List[pd.Series]:
+    """
+    Winsorize a list of DFUs, spreading them in chunks over a pool of `n_workers`
+    processes. When there are less than `min_dfus_per_worker` DFUs per worker the
+    pool start-up costs more than it saves and the DFUs are processed serially
+
+    Args:
+        series (List[pd.Series]): Demand of each DFU, sorted by `time_var`
+        threshold (float): Threshold representing the percentiles (in float)
+        n_workers (Optional[int]): Number of worker processes (`None` or -1 for all
+            the cores)
+        min_dfus_per_worker (int): Minimum number of DFUs per worker for running in
+            parallel
+
+    Returns:
+        List[pd.Series]: Demand winsorized, in the same order as `series`
+    """
+
+    n_workers = min(_resolve_n_workers(n_workers),
+                    len(series) // max(min_dfus_per_worker, 1))
+
+    if n_workers <= 1:
+        return _winsorize_chunk(series, threshold)
+
+    # A few chunks per worker so a slow chunk does not leave the others idle
+    chunks = [[series[i] for i in chunk]
+              for chunk in np.array_split(np.arange(len(series)), n_workers * 4)]
+    log.info(f'Winsorizing {len(series)} DFUs in {len(chunks)} chunks with '
+             f'{n_workers} workers')
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        results = executor.map(partial(_winsorize_chunk, threshold=threshold), chunks)
+        return [x for chunk in results for x in chunk]
+
+
+def _outlier_removal(shipments: pd.DataFrame,
+                     percentile: int,
+                     n_workers: Optional[int] = 1,
+                     min_dfus_per_worker: int = 50,
+                     cache_dir: Optional[str] = None,
+                     cache_max_mb: float = 256) -> pd.DataFrame:
     """
     Remove outlier from the demand using STL decomposition + Winsorization
 
+    When `cache_dir` is provided the winsorized series are cached on disk, keyed by
+    the demand of the DFU and the STL/percentile settings, so only the DFUs whose
+    history changed since the last run are decomposed again
+
     Args:
         shipments (pd.DataFrame): DataFrame containing the demand
         percentile (int): Threshold representing the percentiles (in float)
+        n_workers (Optional[int]): Number of worker processes (`None` or -1 for all
+            the cores)
+        min_dfus_per_worker (int): Minimum number of DFUs per worker for running in
+            parallel
+        cache_dir (Optional[str]): Directory of the winsorized series cache, None
+            disables it
+        cache_max_mb (float): Size of the cache above which the least recently used
+            entries are evicted
 
     Returns:
         pd.DataFrame: DataFrame containing the demand winsorized
     """
 
-    shipments['new_shipments'] = (shipments           
+    series = [x for _, x in (shipments
                              .sort_values(by='time_var')
-                             .groupby(['prod_code', 'customer', 'location'])
+                             .groupby(['prod_code', 'customer', 'location'],
+                                      observed=True)
                              ['shipments']
-                             .transform(lambda x: _winsorize(x, percentile))
-                    )
-    
+                             )]
+
+    if cache_dir is None:
+        winsorized = _winsorize_all(series, percentile, n_workers, min_dfus_per_worker)
+    else:
+        cache = SeriesCache(cache_dir, cache_max_mb)
+        settings = {'percentile': percentile, 'period': STL_PERIOD,
+                    'seasonal': STL_SEASONAL}
+        keys = [cache.key(x.values, settings) for x in series]
+        cached = [cache.get(key) for key in keys]
+
+        pending = [i for i, values in enumerate(cached) if values is None]
+        computed = _winsorize_all([series[i] for i in pending], percentile, n_workers,
+                                  min_dfus_per_worker)
+        for i, result in zip(pending, computed):
+            cache.put(keys[i], result.values)
+        cache.evict()
+        cache.log_stats('Winsorize')
+
+        winsorized = computed + [pd.Series(values, index=x.index)
+                                 for x, values in zip(series, cached)
+                                 if values is not None]
+
+    shipments['new_shipments'] = pd.concat(winsorized) if winsorized else np.nan
+
     changed = len(shipments[shipments['shipments'] != shipments['new_shipments']])
     log.info(f'Changed {changed}/{len(shipments)} points')
     shipments = shipments.drop('shipments', axis=1)
@@ -167,9 +435,20 @@ def clean_shipments(shipments: pd.DataFrame, parameters: Dict) -> pd.DataFrame:
     shipments_params = parameters['shipments']
     log.info(f'Received parameters: {shipments_params}')
 
-    shipments = _make_continuous(shipments, shipments_params['fill_method'])
-    shipments = _remove_continuous_zeros(shipments, shipments_params['n_zeros'])
-    shipments = _outlier_removal(shipments, shipments_params['percentile'])
+    fill_engine = shipments_params.get('fill_engine', 'vectorized')
+    if fill_engine == 'panel':
+        shipments = _continuous_panel(shipments, shipments_params['fill_method'],
+                                      shipments_params['n_zeros'])
+    else:
+        shipments = _make_continuous(shipments, shipments_params['fill_method'],
+                                     fill_engine)
+        shipments = _remove_continuous_zeros(shipments, shipments_params['n_zeros'])
+    shipments = _outlier_removal(shipments,
+                                 shipments_params['percentile'],
+                                 shipments_params.get('n_workers', 1),
+                                 shipments_params.get('min_dfus_per_worker', 50),
+                                 shipments_params.get('cache_dir'),
+                                 shipments_params.get('cache_max_mb', 256))
     shipments = normalize_columns(shipments, "customer")
     shipments = normalize_columns(shipments, "location")
     shipments = create_model_id(shipments)
@@ -1,10 +1,20 @@
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
 import pandas as pd
 
+log = logging.getLogger(__name__)
+
 def create_model_id(data: pd.DataFrame) -> pd.DataFrame:
     """
     Generate the column `model_id` by combining the columns:
     `prod_code`, `customer`, `location`
 
+    The id is built from the category codes of the three columns, so the strings
+    are only concatenated once per distinct combination. `model_id` is returned
+    as a `category` column
+
     Args:
         data (pd.DataFrame): DataFrame containing the demand
 
@@ -12,12 +22,28 @@ def create_model_id(data: pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame: DataFrame with the new column `model_id` created
     """
 
-    data['model_id'] = (data['prod_code'] + 
-                             '#' 
-                             + data['customer'] + 
-                             '#' 
-                             + data['location']
-                            )
+    keys = [data[column].astype('category').cat
+            for column in ['prod_code', 'customer', 'location']]
+
+    # Single integer per row combining the three codes (rows missing any of them get
+    # no id)
+    combined = np.zeros(len(data), dtype='int64')
+    for key in keys:
+        combined = combined * len(key.categories) + key.codes.to_numpy(dtype='int64')
+    valid = np.all([key.codes.to_numpy() >= 0 for key in keys], axis=0)
+
+    codes = np.full(len(data), -1)
+    codes[valid], uniques = pd.factorize(combined[valid], sort=True)
+
+    # Decode each distinct combination back to the codes of the three columns
+    labels = pd.Index([''] * len(uniques), dtype=object)
+    remainder = uniques
+    for i, key in enumerate(reversed(keys)):
+        remainder, key_codes = np.divmod(remainder, len(key.categories))
+        separator = '#' if i else ''
+        labels = key.categories.take(key_codes).astype(str) + separator + labels
+
+    data['model_id'] = pd.Categorical.from_codes(codes, categories=labels)
     return data
 
 def typing_time_dataset(df: pd.DataFrame, column: str) -> pd.DataFrame:
@@ -27,8 +53,68 @@ def typing_time_dataset(df: pd.DataFrame, column: str) -> pd.DataFrame:
     return df
 
 def normalize_columns(df: pd.DataFrame, column: str) -> pd.DataFrame:
-    """Normalize customers names"""
-    for customer in df[column].unique():
-        df.loc[df[column] == customer, column] = customer.upper()
+    """
+    Normalize customers names, upper-casing only the distinct values of a `category`
+    column
+    """
+    values = df[column].astype('category').cat
+    upper = values.categories.str.upper()
+    categories = pd.Index(upper.unique()).sort_values()
+
+    # Code of every old category in the new (upper-cased) categories
+    new_codes = categories.get_indexer(upper)
+    codes = values.codes.to_numpy()
+    df[column] = pd.Categorical.from_codes(np.where(codes >= 0, new_codes[codes], -1),
+                                           categories=categories)
+
+    return df
+
+
+def map_values(df: pd.DataFrame,
+               column: str,
+               values: Optional[Dict] = None,
+               replacements: Optional[List[List[str]]] = None) -> pd.DataFrame:
+    """
+    Rewrite the values of a column with exact-match `values` (a null target empties
+    the value) followed by substring `replacements`, applied in order. The rules
+    run over the distinct values only and are written back in a single `map`
 
-    return df
\ No newline at end of file
+    Args:
+        df (pd.DataFrame): The dataframe
+        column (str): Column to rewrite
+        values (Optional[Dict]): Mapping from old to new values
+        replacements (Optional[List[List[str]]]): Pairs of [old, new] substrings
+
+    Returns:
+        pd.DataFrame: A copy of the dataframe with the column rewritten
+    """
+
+    # `df` can be a slice of a larger frame (e.g. the rows kept by a filter)
+    df = df.copy()
+    counts = df[column].value_counts(dropna=False)
+    lookup = pd.Series(counts.index, index=counts.index, dtype=object)
+
+    for old, new in (values or {}).items():
+        matched = lookup.index == old
+        lookup[matched] = new
+        log.info(f"{column}: '{old}' -> '{new}' rewrote {counts[matched].sum()} rows")
+
+    for old, new in replacements or []:
+        is_text = lookup.map(lambda x: isinstance(x, str))
+        replaced = lookup[is_text].str.replace(old, new, regex=False)
+        changed = replaced.index[replaced != lookup[is_text]]
+        lookup[is_text] = replaced
+        log.info(f"{column}: '{old}' -> '{new}' rewrote {counts[changed].sum()} rows")
+
+    df[column] = df[column].map(lookup).replace({np.nan: None})
+
+    return df
+
+
+def apply_value_mappings(df: pd.DataFrame,
+                         value_mappings: Dict[str, Dict]) -> pd.DataFrame:
+    """Apply the `map_values` rules configured for each column (see `parameters.yml`)"""
+    for column, rules in (value_mappings or {}).items():
+        df = map_values(df, column, **rules)
+
+    return df
@@ -0,0 +1,64 @@
+import pandas as pd
+import numpy as np
+import logging
+
+log = logging.getLogger(__name__)
+
+
+def week_start(dates: pd.Series) -> pd.Series:
+    """Monday of the week of each date (the time of the day is kept)"""
+
+    return dates - pd.to_timedelta(dates.dt.weekday, unit='D')
+
+
+def _cyclical_encoding(values: pd.Series, period: int, name: str) -> pd.DataFrame:
+    """Encodes a periodic variable as the sine and cosine of its angle"""
+
+    angle = values.to_numpy(dtype='float64') / period * 2 * np.pi
+
+    return pd.DataFrame({f'sin_{name}': np.sin(angle).astype('float32'),
+                         f'cos_{name}': np.cos(angle).astype('float32')},
+                        index=values.index)
+
+
+def build_calendar(shipments_processed: pd.DataFrame,
+                   promotions_processed: pd.DataFrame,
+                   holidays_processed: pd.DataFrame) -> pd.DataFrame:
+    """
+    Weekly calendar dimension covering all the weeks of the shipments, promotions
+    and holidays. Calendar attributes are computed once per week here and joined
+    by the feature nodes, so their cost depends on the number of weeks only
+
+    Args:
+        shipments_processed (pd.DataFrame): Cleaned shipments (`time_var`)
+        promotions_processed (pd.DataFrame): Cleaned promotions (`time_var`)
+        holidays_processed (pd.DataFrame): Cleaned holidays (`DT`)
+
+    Returns:
+        pd.DataFrame: One row per week (`time_var`, monday) with its calendar attributes
+    """
+
+    dates = pd.concat([shipments_processed['time_var'],
+                       promotions_processed['time_var'],
+                       holidays_processed['DT']
+                       ])
+    first_week, last_week = week_start(pd.Series([dates.min(), dates.max()]))
+
+    calendar = pd.DataFrame({'time_var': pd.date_range(first_week, last_week,
+                                                       freq='W-MON')})
+    time_var = calendar['time_var'].dt
+    calendar['year'] = time_var.year.astype('int16')
+    calendar['month'] = time_var.month.astype('int8')
+    calendar['week'] = time_var.isocalendar().week.astype('int8')
+
+    # Encode month and week of the year as cyclical features
+    calendar = pd.concat([calendar,
+                          _cyclical_encoding(calendar['month'], 12, 'month'),
+                          _cyclical_encoding(calendar['week'], 52, 'week')
+                          ],
+                         axis=1
+                         )
+
+    log.info(f'Calendar with {len(calendar)} weeks from {first_week.date()} '
+             f'to {last_week.date()}')
+    return calendar
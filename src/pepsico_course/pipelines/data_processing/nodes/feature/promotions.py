@@ -1,74 +1,78 @@
 import logging
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 import numpy as np
 import pandas as pd
 
 log = logging.getLogger(__name__)
 
-def _generate_dicotomic_features(df:pd.DataFrame, column: str) -> pd.DataFrame:
-    for disscount in df[column].unique():
-        if disscount != np.nan:
-            df[str(disscount)] = df[column].apply(lambda x: 1 if x == disscount else 0) 
 
-    return df
+def _generate_dicotomic_features(values: pd.Series,
+                                 sparse_threshold: Optional[float] = None
+                                 ) -> pd.DataFrame:
+    """
+    Builds the int8 indicator columns of all the distinct (non null) values at once,
+    in order of appearance. Columns whose share of ones is below `sparse_threshold`
+    are returned as pandas sparse columns
+    """
+    codes, uniques = pd.factorize(values)
+    is_value = codes[:, None] == np.arange(len(uniques))
+    indicators = pd.DataFrame(is_value.astype('int8'),
+                              columns=[str(value) for value in uniques],
+                              index=values.index)
 
-def _generate_national_features(df: pd.DataFrame, 
-                                column: str, 
-                                new_column_name: str, 
-                                conditions: List[str]) -> pd.DataFrame:
-    df[new_column_name] = df[column].apply(lambda x: 1 if x in conditions else 0)
-    
-    return df
+    if sparse_threshold:
+        for column in indicators.columns[indicators.mean() < sparse_threshold]:
+            indicators[column] = pd.arrays.SparseArray(indicators[column], fill_value=0)
 
-def _aggregate_promo(df: pd.DataFrame, 
-                     column: str, 
-                     new_column_name: str, 
-                     prefix: str, 
-                     aggregated_value: str
-                     ) -> pd.DataFrame:
-    """Aggregate the promo type"""
-    df[new_column_name] = df[column]
-    for promo in df[column].unique():
-        if promo is not None and promo[0] == prefix:
-            df.loc[df[column] == promo, new_column_name] = aggregated_value
-    
-    return df
+    return indicators
+
+
+def _generate_national_features(values: pd.Series, new_column_name: str,
+                                conditions: List[str]) -> pd.Series:
+    return values.isin(conditions).astype('int8').rename(new_column_name)
+
+
+def _aggregate_promo(values: pd.Series, prefix: str,
+                     aggregated_value: str) -> pd.Series:
+    """Aggregate the promo types starting with `prefix` into `aggregated_value`"""
+    return values.mask(values.str.startswith(prefix, na=False), aggregated_value)
 
-def _drop_columns(df: pd.DataFrame, columns = List[str]) -> pd.DataFrame:
-    for column in columns:
-        df = df.drop(column, axis=1)
-    
-    return df
 
 def _clean_promo_output(df: pd.DataFrame) -> pd.DataFrame:
-    df = _drop_columns(df, ["None", "promo_type", "promo_type_aggregated"])
+    df = df.drop(columns=["promo_type"])
     df = df.dropna()
     df = df.reset_index(drop=True)
     return df
 
-def feature_promotions(promotions_processed: pd.DataFrame) -> pd.DataFrame:
-    promotions_processed = _generate_dicotomic_features(promotions_processed, "promo_type")
-    promotions_processed = _generate_national_features(promotions_processed, 
-                                                       "customer", 
-                                                       "is_national", 
-                                                       ["BM", "EROSKI", "MERCADONA"]
-                                                       )
-    
-    promotions_processed = _generate_national_features(promotions_processed, 
-                                                       "customer", 
-                                                       "is_basque", 
-                                                       ["BM", "EROSKI"]
-                                                       )
-    
-    promotions_processed = _aggregate_promo(promotions_processed, 
-                                            "promo_type", 
-                                            "promo_type_aggregated", 
-                                            "d", 
-                                            "discount")
-    
-    promotions_processed = _generate_dicotomic_features(promotions_processed, "promo_type_aggregated")
-    
+
+def feature_promotions(promotions_processed: pd.DataFrame,
+                       parameters: Dict) -> pd.DataFrame:
+    sparse_threshold = parameters['promotions'].get('sparse_threshold')
+    promo_type = promotions_processed["promo_type"]
+    customer = promotions_processed["customer"]
+
+    promo_types = _generate_dicotomic_features(promo_type, sparse_threshold)
+
+    # Aggregated promo types, only `discount` is new (the others are already in
+    # `promo_types`)
+    aggregated = _generate_dicotomic_features(
+        _aggregate_promo(promo_type, "d", "discount"), sparse_threshold)
+    aggregated = aggregated.drop(
+        columns=promo_types.columns.intersection(aggregated.columns))
+
+    is_national = _generate_national_features(customer, "is_national",
+                                              ["BM", "EROSKI", "MERCADONA"])
+    is_basque = _generate_national_features(customer, "is_basque", ["BM", "EROSKI"])
+    promotions_processed = pd.concat([promotions_processed,
+                                      promo_types,
+                                      is_national,
+                                      is_basque,
+                                      aggregated
+                                      ],
+                                     axis=1
+                                     )
+
     promotions_processed = _clean_promo_output(promotions_processed)
 
-    return promotions_processed
\ No newline at end of file
+    return promotions_processed
@@ -1,5 +1,4 @@
 import pandas as pd
-import numpy as np
 import logging
 
 log = logging.getLogger(__name__)
@@ -17,41 +16,40 @@ def _encode_categorical_columns(shipments_processed: pd.DataFrame) -> pd.DataFra
     return shipments_processed
 
 
-def _encode_time_variables(shipments_processed: pd.DataFrame) -> pd.DataFrame:
+def _encode_time_variables(shipments_processed: pd.DataFrame,
+                           calendar: pd.DataFrame) -> pd.DataFrame:
 
-
-    # Generated dummy variables
-
-    # Generate dummy variables for the Year
     shipments_processed = (shipments_processed
-                           .sort_values(by='time_var')
-                           .groupby(['prod_code', 'customer', 'location'])
-                           .apply(lambda x: pd.concat([x,
-                                                       pd.get_dummies(x['time_var'].dt.year,
-                                                                      drop_first=True,
-                                                                      prefix="year")
-                                                        ],
-                                                        axis=1
-                                                        )
-                                   )
-                             .reset_index(drop='True')
-                        )
-
-
-    # Encode month of the year as cyclical feature
-    shipments_processed['sin_month'] = shipments_processed.apply(lambda x: np.sin(x['time_var'].month / 12 * 2 * np.pi), axis=1)
-    shipments_processed['cos_month'] = shipments_processed.apply(lambda x: np.cos(x['time_var'].month / 12 * 2 * np.pi), axis=1)
-
-    # Encode week of the year as cyclical feature
-    shipments_processed['sin_week'] = shipments_processed.apply(lambda x: np.sin(x['time_var'].isocalendar().week / 52 * 2 * np.pi), axis=1)
-    shipments_processed['cos_week'] = shipments_processed.apply(lambda x: np.cos(x['time_var'].isocalendar().week / 52 * 2 * np.pi), axis=1)
+                           .sort_values(by=['prod_code', 'customer', 'location',
+                                            'time_var'])
+                           .reset_index(drop=True)
+                           )
+
+    # Calendar attributes of the weeks covered by the shipments
+    times = shipments_processed['time_var']
+    weeks = calendar[calendar['time_var'].between(times.min(), times.max())]
+
+    # Generate dummy variables for the Year (one global encoding, the first year is
+    # dropped) and encode month and week of the year as cyclical features
+    weekly_features = pd.concat([weeks['time_var'],
+                                 pd.get_dummies(weeks['year'], drop_first=True,
+                                                prefix="year", dtype='int8'),
+                                 weeks[['sin_month', 'cos_month',
+                                        'sin_week', 'cos_week']]
+                                 ],
+                                axis=1
+                                )
+
+    shipments_processed = shipments_processed.merge(weekly_features, on='time_var',
+                                                    how='left')
 
     return shipments_processed
 
 
-def feature_shipments(shipments_processed: pd.DataFrame) -> pd.DataFrame:
+def feature_shipments(shipments_processed: pd.DataFrame,
+                      calendar: pd.DataFrame) -> pd.DataFrame:
 
     shipments_processed = _encode_categorical_columns(shipments_processed)
-    shipments_processed = _encode_time_variables(shipments_processed)
+    shipments_processed = _encode_time_variables(shipments_processed, calendar)
 
-    return shipments_processed
\ No newline at end of file
+    return shipments_processed
@@ -0,0 +1,36 @@
+import logging
+from typing import Iterable, Iterator, Union
+
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+
+def ingest_csv(chunks: Union[pd.DataFrame, Iterable[pd.DataFrame]]
+               ) -> Iterator[pd.DataFrame]:
+    """
+    Streams a raw CSV into the typed Parquet raw layer, one chunk at a time
+
+    The CSV data set is loaded with `chunksize` and explicit `dtype` / `parse_dates`
+    (see `conf/base/catalog.yml`), so every chunk arrives already typed and is
+    saved as soon as it is parsed: the peak memory is bounded by the chunk size
+
+    Args:
+        chunks (Union[pd.DataFrame, Iterable[pd.DataFrame]]): Chunks of the raw CSV
+            (or the whole frame when it is loaded without `chunksize`)
+
+    Yields:
+        pd.DataFrame: The chunks, saved one by one by Kedro
+    """
+
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+
+    n_rows = 0
+    for i, chunk in enumerate(chunks):
+        n_rows += len(chunk)
+        memory_mb = chunk.memory_usage(deep=True).sum() / 1024 ** 2
+        log.info(f'Chunk {i}: {len(chunk)} rows, {memory_mb:.2f}MB')
+        yield chunk
+
+    log.info(f'Ingested {n_rows} rows')
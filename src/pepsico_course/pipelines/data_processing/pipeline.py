@@ -1,6 +1,8 @@
 from kedro.pipeline import Pipeline, node
 from kedro.pipeline.modular_pipeline import pipeline
 
+from .nodes.ingest import ingest_csv
+
 from .nodes.clean.shipments import clean_shipments
 from .nodes.clean.promotions import clean_promotions
 from .nodes.clean.holidays import clean_holidays
@@ -8,21 +10,29 @@ from .nodes.clean.holidays import clean_holidays
 from .nodes.feature.shipments import feature_shipments
 from .nodes.feature.promotions import feature_promotions
 from .nodes.feature.holidays import feature_holidays
+from .nodes.feature.calendar import build_calendar
 
 def create_pipeline(**kwargs) -> Pipeline:
 
 
     shipments_pipeline = pipeline(
         [
+            node(
+                func=ingest_csv,
+                inputs="shipments",
+                outputs="shipments_raw",
+                name="ingest_shipments_node",
+                tags="ingestion",
+            ),
             node(
                 func=clean_shipments,
-                inputs=["shipments", "params:processing_params"],
+                inputs=["shipments_raw", "params:processing_params"],
                 outputs="shipments_processed",
                 name="clean_shipments_node",
             ),
             node(
                 func=feature_shipments,
-                inputs=["shipments_processed"],
+                inputs=["shipments_processed", "calendar"],
                 outputs="shipments_featured",
                 name="feature_shipments_node",
             ),
@@ -31,15 +41,22 @@ def create_pipeline(**kwargs) -> Pipeline:
 
     promotions_pipeline = pipeline(
         [
+            node(
+                func=ingest_csv,
+                inputs="promotions",
+                outputs="promotions_raw",
+                name="ingest_promotions_node",
+                tags="ingestion",
+            ),
             node(
                 func=clean_promotions,
-                inputs=["promotions", "params:processing_params"],
+                inputs=["promotions_raw", "params:processing_params"],
                 outputs="promotions_processed",
                 name="clean_promotions_node",
             ),
             node(
                 func=feature_promotions,
-                inputs=["promotions_processed"],
+                inputs=["promotions_processed", "params:processing_params"],
                 outputs="promotions_featured",
                 name="feature_promotions_node",
             ),
@@ -48,24 +65,46 @@ def create_pipeline(**kwargs) -> Pipeline:
 
     holidays_pipeline = pipeline(
         [
+            node(
+                func=ingest_csv,
+                inputs="holidays",
+                outputs="holidays_raw",
+                name="ingest_holidays_node",
+                tags="ingestion",
+            ),
             node(
                 func=clean_holidays,
-                inputs=["holidays", "params:processing_params"],
+                inputs=["holidays_raw", "params:processing_params"],
                 outputs="holidays_processed",
                 name="clean_holidays_node",
             ), 
             node(
                 func=feature_holidays,
-                inputs=["holidays_processed"],
+                inputs=["holidays_processed", "calendar"],
                 outputs="holidays_featured",
                 name="feature_holidays_node",
             ),
         ]
     )
 
+    calendar_pipeline = pipeline(
+        [
+            node(
+                func=build_calendar,
+                inputs=["shipments_processed", "promotions_processed",
+                        "holidays_processed"],
+                outputs="calendar",
+                name="build_calendar_node",
+            ),
+        ]
+    )
+
     return pipeline(
-        pipe=shipments_pipeline + promotions_pipeline + holidays_pipeline,
+        pipe=(shipments_pipeline + promotions_pipeline + holidays_pipeline
+              + calendar_pipeline),
         namespace="data_processing",
         inputs=["shipments", "promotions", "holidays"],
-        outputs=["shipments_featured", "promotions_featured", "holidays_featured"],
+        outputs=["shipments_raw", "promotions_raw", "holidays_raw",
+                 "shipments_featured", "promotions_featured", "holidays_featured",
+                 "calendar"],
     )
\ No newline at end of file
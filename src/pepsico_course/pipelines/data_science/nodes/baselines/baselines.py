@@ -0,0 +1,262 @@
+import logging
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pepsico_course.pipelines.data_science.nodes.metrics.metrics import (
+    metrics_from_sums,
+)
+
+log = logging.getLogger(__name__)
+
+METHODS = ['seasonal_naive', 'moving_average', 'croston', 'tsb']
+# Syntetos-Boylan thresholds of the demand classes
+ADI_THRESHOLD, CV2_THRESHOLD = 1.32, 0.49
+
+
+def _panel(df: pd.DataFrame, time_var: str, target_var: str, primary_key: str,
+           min_weeks: int = 0) -> Tuple[pd.Index, np.ndarray, np.ndarray]:
+    """
+    Demand of every `primary_key` as the rows of a (n_dfu, n_weeks) array, aligned
+    on their last week (shorter series are padded with NaN on the left), so the
+    last `horizon` columns are the forecast window of every DFU, as in
+    `time_series_approach`. Also returns the position in `df` of each cell (-1 for
+    padding)
+    """
+    keys = df[primary_key].astype(str).to_numpy()
+    order = np.lexsort((df[time_var].to_numpy(), keys))
+    ids, codes, counts = np.unique(keys[order], return_inverse=True, return_counts=True)
+
+    n_weeks = max(counts.max() if len(counts) else 0, min_weeks)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]]) if len(counts) else counts
+    columns = n_weeks - counts[codes] + np.arange(len(order)) - starts[codes]
+
+    demand = np.full((len(ids), n_weeks), np.nan)
+    demand[codes, columns] = df[target_var].to_numpy(dtype=float)[order]
+    rows = np.full((len(ids), n_weeks), -1)
+    rows[codes, columns] = order
+    return pd.Index(ids, name=primary_key), demand, rows
+
+
+def seasonal_naive(demand: np.ndarray, horizon: int,
+                   season_length: int = 52) -> np.ndarray:
+    """
+    Demand of the same week of the last season (NaN without a full season of
+    history)
+    """
+    n_weeks = demand.shape[1]
+    if n_weeks < season_length:
+        return np.full((len(demand), horizon), np.nan)
+    return demand[:, n_weeks - season_length + np.arange(horizon) % season_length]
+
+
+def moving_average(demand: np.ndarray, horizon: int, window: int = 8) -> np.ndarray:
+    """Mean demand of the last `window` weeks with data"""
+    last = demand[:, -window:]
+    observed = (~np.isnan(last)).sum(axis=1)
+    mean = np.divide(np.nansum(last, axis=1), observed,
+                     out=np.full(len(demand), np.nan), where=observed > 0)
+    return np.repeat(mean[:, None], horizon, axis=1)
+
+
+def croston(demand: np.ndarray, horizon: int, alpha: float = 0.1,
+            beta: float = None) -> np.ndarray:
+    """
+    Croston's method for intermittent demand: exponential smoothing of the non-zero
+    demand sizes and of the intervals between them, the forecast is size / interval.
+    With `beta` it is the TSB variant, which smooths the probability of a demand
+    every week instead of the intervals, so the forecast decays on obsolete items
+
+    All the DFUs are updated at once, one week at a time
+    """
+    n_dfus, n_weeks = demand.shape
+    size, interval, probability = (np.full(n_dfus, np.nan) for _ in range(3))
+    weeks_since_demand = np.ones(n_dfus)
+
+    for week in range(n_weeks):
+        values = demand[:, week]
+        observed = ~np.isnan(values)
+        has_demand = observed & (values > 0)
+        first_demand = has_demand & np.isnan(size)
+
+        size = np.where(first_demand, values,
+                        np.where(has_demand, size + alpha * (values - size), size))
+        if beta is None:
+            smoothed = interval + alpha * (weeks_since_demand - interval)
+            interval = np.where(first_demand, weeks_since_demand,
+                                np.where(has_demand, smoothed, interval))
+            weeks_since_demand = np.where(has_demand, 1, weeks_since_demand + observed)
+        else:
+            smoothed = probability + beta * (has_demand - probability)
+            probability = np.where(observed & np.isnan(probability), has_demand,
+                                   np.where(observed, smoothed, probability))
+
+    forecast = size / interval if beta is None else size * probability
+    # Never any demand: nothing to forecast
+    forecast = np.where(np.isnan(size) & ~np.isnan(demand).all(axis=1), 0, forecast)
+    return np.repeat(forecast[:, None], horizon, axis=1)
+
+
+def forecast_baselines(demand: np.ndarray, horizon: int,
+                       baseline_options: Dict) -> Dict[str, np.ndarray]:
+    """(n_dfu, horizon) forecasts of every baseline method from the demand history"""
+    alpha = baseline_options.get('alpha', 0.1)
+    season_length = baseline_options.get('season_length', 52)
+    return {
+        'seasonal_naive': seasonal_naive(demand, horizon, season_length),
+        'moving_average': moving_average(demand, horizon,
+                                         baseline_options.get('window', 8)),
+        'croston': croston(demand, horizon, alpha),
+        'tsb': croston(demand, horizon, alpha, beta=baseline_options.get('beta', 0.1)),
+    }
+
+
+def _demand_classes(demand: np.ndarray) -> pd.DataFrame:
+    """
+    Average demand interval, squared coefficient of variation of the demand sizes
+    and class of each DFU
+    """
+    observed = (~np.isnan(demand)).sum(axis=1)
+    sizes = np.where(demand > 0, demand, np.nan)
+    n_demands = (~np.isnan(sizes)).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        adi = observed / n_demands
+        mean = np.nansum(sizes, axis=1) / n_demands
+        cv2 = np.nansum((sizes - mean[:, None]) ** 2, axis=1) / n_demands / mean ** 2
+    demand_class = np.select([n_demands == 0,
+                              (adi < ADI_THRESHOLD) & (cv2 < CV2_THRESHOLD),
+                              adi < ADI_THRESHOLD,
+                              cv2 < CV2_THRESHOLD],
+                             ['no_demand', 'smooth', 'erratic', 'intermittent'],
+                             'lumpy')
+    return pd.DataFrame({'adi': adi, 'cv2': cv2, 'demand_class': demand_class})
+
+
+def _validation_accuracy(demand: np.ndarray, horizon: int,
+                         baseline_options: Dict) -> pd.DataFrame:
+    """
+    Accuracy of every method on the `horizon` weeks before the forecast window,
+    forecast from the weeks before them. A method without a forecast for one of
+    the weeks with data (e.g. seasonal naive on a short series) gets NaN
+    """
+    history, actual = demand[:, :-2 * horizon], demand[:, -2 * horizon:-horizon]
+    has_actual = ~np.isnan(actual)
+
+    accuracy = {}
+    forecasts = forecast_baselines(history, horizon, baseline_options)
+    for method, forecast in forecasts.items():
+        error = np.where(has_actual, forecast - actual, 0)
+        sums = metrics_from_sums(pd.DataFrame({'n': has_actual.sum(axis=1),
+                                               'actual': np.nansum(actual, axis=1),
+                                               'abs_error': np.abs(error).sum(axis=1),
+                                               'error': error.sum(axis=1)}))
+        complete = ~np.isnan(error).any(axis=1) & (sums['n'] > 0)
+        accuracy[method] = sums['accuracy'].where(complete)
+    return pd.DataFrame(accuracy)
+
+
+def baseline_approach(df: pd.DataFrame,
+                      horizon: int,
+                      time_var: str,
+                      target_var: str,
+                      primary_key: str,
+                      y_hat: str,
+                      baseline_options: Dict) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Seasonal naive, moving average, Croston and TSB forecasts of the last `horizon`
+    weeks of every `primary_key`, computed for all the DFUs at once on a
+    (n_dfu, n_weeks) array, and the routing of each DFU
+
+    The methods are compared on the `horizon` weeks before the forecast window:
+    a DFU keeps its best baseline when it reaches `min_accuracy` there, the other
+    ones are routed to `time_series_approach`
+
+    Args:
+        df (pd.DataFrame): Model input
+        baseline_options (Dict): `season_length`, `window` (moving average weeks),
+            `alpha` / `beta` (Croston / TSB smoothing) and `min_accuracy` (required)
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: Forecasts of every method (one row per
+        `primary_key`, week and method) and, per `primary_key`, the validation
+        accuracy of every method, its demand class, best method and `route`
+    """
+
+    # At least the validation and forecast windows, even for short series (or no
+    # series at all)
+    ids, demand, rows = _panel(df, time_var, target_var, primary_key,
+                               min_weeks=2 * horizon)
+    forecasts = forecast_baselines(demand[:, :-horizon], horizon, baseline_options)
+
+    window = rows[:, -horizon:]
+    in_window = window >= 0
+    window_rows = window[in_window]
+    baseline_forecasts = pd.concat([pd.DataFrame({
+        primary_key: df[primary_key].to_numpy()[window_rows],
+        time_var: df[time_var].to_numpy()[window_rows],
+        target_var: df[target_var].to_numpy()[window_rows],
+        'method': method,
+        y_hat: forecast[in_window],
+    }) for method, forecast in forecasts.items()], ignore_index=True)
+    baseline_forecasts = baseline_forecasts.sort_values(primary_key, kind='stable',
+                                                        ignore_index=True)
+    baseline_forecasts['method'] = pd.Categorical(baseline_forecasts['method'],
+                                                  categories=METHODS)
+
+    accuracy = _validation_accuracy(demand, horizon, baseline_options)
+    best = accuracy.fillna(-1).to_numpy().argmax(axis=1)
+    routing = pd.concat([pd.DataFrame({primary_key: ids}),
+                         _demand_classes(demand[:, :-horizon]),
+                         accuracy.add_prefix('accuracy_')], axis=1)
+    routing['best_method'] = np.array(METHODS)[best]
+    routing['best_accuracy'] = accuracy.to_numpy()[np.arange(len(accuracy)), best]
+    # No default, the threshold is only set in `baseline_options`
+    min_accuracy = baseline_options['min_accuracy']
+    routing['route'] = np.where(routing['best_accuracy'] >= min_accuracy, 'baseline',
+                                'arima')
+
+    counts = routing.groupby(['demand_class', 'route']).size().unstack(fill_value=0)
+    log.info(f"Baselines for {len(ids)} {primary_key}s, "
+             f"{(routing['route'] == 'arima').sum()} routed to SARIMAX")
+    for demand_class, routes in counts.iterrows():
+        log.info(f"{demand_class}: "
+                 + ', '.join(f'{count} {route}' for route, count in routes.items()))
+
+    return baseline_forecasts, routing
+
+
+def route_model_input(df: pd.DataFrame, routing: pd.DataFrame,
+                      primary_key: str) -> pd.DataFrame:
+    """Model input of the DFUs routed to `time_series_approach`"""
+    routed = routing.loc[routing['route'] == 'arima', primary_key].astype(str)
+    is_routed = df[primary_key].astype(str).isin(routed).to_numpy()
+    return df[is_routed].reset_index(drop=True)
+
+
+def combine_forecasts(arima_results: pd.DataFrame,
+                      baseline_forecasts: pd.DataFrame,
+                      routing: pd.DataFrame,
+                      primary_key: str,
+                      time_var: str,
+                      target_var: str,
+                      y_hat: str) -> pd.DataFrame:
+    """
+    Statistical forecast of every DFU: the SARIMAX forecast of the DFUs routed to it
+    and the best baseline of the others, with the `method` each one comes from
+    """
+    columns = [primary_key, time_var, target_var, y_hat]
+    best = routing.loc[routing['route'] == 'baseline', [primary_key, 'best_method']]
+    baselines = baseline_forecasts.assign(
+        **{primary_key: baseline_forecasts[primary_key].astype(str),
+           'method': baseline_forecasts['method'].astype(str)})
+    baselines = baselines.merge(best.astype(str), left_on=[primary_key, 'method'],
+                                right_on=[primary_key, 'best_method'])
+
+    arima = arima_results.loc[arima_results[y_hat].notna(), columns]
+    arima = arima.assign(**{primary_key: arima[primary_key].astype(str),
+                            time_var: pd.to_datetime(arima[time_var], utc=True),
+                            'method': 'arima'})
+    combined = pd.concat([arima,
+                          baselines[columns + ['method']]], ignore_index=True)
+    return combined.sort_values([primary_key, time_var], ignore_index=True)
@@ -0,0 +1,121 @@
+import logging
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+SUMS = ['n', 'actual', 'abs_error', 'error']
+# Attributes of `facts_data` the metrics are rolled up by
+LEVELS = ['customer', 'location', 'category']
+
+
+def error_sums(df: pd.DataFrame, group_by: List[str], y: str = 'shipments',
+               y_pred: str = 'y_hat') -> pd.DataFrame:
+    """
+    Number of forecasts, sum of the actuals, of the absolute errors and of the
+    errors per group, in a single grouped aggregation. Rows without an actual or
+    a forecast (e.g. the history of `arima_results`) are left out
+    """
+    valid = (df[y].notna() & df[y_pred].notna()).to_numpy()
+    actual = df[y].to_numpy(dtype=float)[valid]
+    error = df[y_pred].to_numpy(dtype=float)[valid] - actual
+
+    sums = pd.DataFrame({'n': 1, 'actual': actual, 'abs_error': np.abs(error),
+                         'error': error})
+    keys = [df[column][valid].reset_index(drop=True) for column in group_by]
+    return sums.groupby(keys, observed=True).sum()
+
+
+def metrics_from_sums(sums: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds the metrics computed from the `error_sums` of each group:
+
+    - `accuracy`: 1 - sum|y - ŷ| / sum y, floored at 0. Without demand it is 1 for a
+      perfect forecast and 0 otherwise
+    - `wape`: sum|y - ŷ| / sum y and `bias`: sum(ŷ - y) / sum y, NaN without demand
+    - `mae`: mean absolute error
+    """
+    sums = sums.copy()
+    demand = sums['actual'].where(sums['actual'] != 0)
+    sums['accuracy'] = np.where(demand.notna(),
+                                np.maximum(0, 1 - sums['abs_error'] / demand),
+                                (sums['abs_error'] == 0).astype(float))
+    sums['wape'] = sums['abs_error'] / demand
+    sums['bias'] = sums['error'] / demand
+    sums['mae'] = sums['abs_error'] / sums['n']
+    return sums
+
+
+def compute_metrics(df: pd.DataFrame, group_by: List[str], y: str = 'shipments',
+                    y_pred: str = 'y_hat') -> pd.DataFrame:
+    """
+    Accuracy, WAPE, bias and MAE of the forecasts of each group (e.g. each `model_id`)
+
+    Args:
+        df (pd.DataFrame): Forecasts, one row per `group_by` and week
+        group_by (List[str]): Columns identifying a group
+        y (str): Actuals column
+        y_pred (str): Forecasts column
+
+    Returns:
+        pd.DataFrame: One row per group with its sums and metrics
+    """
+    return metrics_from_sums(error_sums(df, group_by, y, y_pred)).reset_index()
+
+
+def evaluate_forecasts(arima_results: pd.DataFrame,
+                       ml_forecasts: pd.DataFrame,
+                       statistical_forecasts: pd.DataFrame,
+                       facts_data: pd.DataFrame,
+                       primary_key: str,
+                       target_var: str,
+                       y_hat: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Metrics of the SARIMAX, LightGBM and statistical (SARIMAX or baseline, see
+    `combine_forecasts`) forecasts per `primary_key`, rolled up by
+    the customer, location and category of `facts_data` and over all the DFUs
+
+    The rollups add up the error sums of the DFUs, so the accuracy of a customer
+    is the one of its DFU-week forecasts and not the average of its DFU accuracies
+
+    Args:
+        arima_results (pd.DataFrame): SARIMAX forecasts
+        ml_forecasts (pd.DataFrame): LightGBM forecasts
+        statistical_forecasts (pd.DataFrame): SARIMAX or baseline forecast of every
+            `primary_key`
+        facts_data (pd.DataFrame): Attributes of each `model_id`
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: Metrics per model and `primary_key`, and per
+        model, level (`customer`, `location`, `category` or `total`) and value
+    """
+
+    models = [('arima', arima_results), ('lgbm', ml_forecasts),
+              ('statistical', statistical_forecasts)]
+    sums = pd.concat({model: error_sums(forecasts, [primary_key], target_var, y_hat)
+                      for model, forecasts in models},
+                     names=['model'])
+    sums = sums.reset_index()
+    sums[primary_key] = sums[primary_key].astype(str)
+
+    facts = facts_data.assign(**{primary_key: facts_data[primary_key].astype(str)})
+    facts = facts.drop_duplicates(primary_key).set_index(primary_key)[LEVELS]
+    attributes = facts.reindex(sums[primary_key]).reset_index(drop=True)
+    attributes['total'] = 'total'
+
+    rollups = []
+    for level in LEVELS + ['total']:
+        values = attributes[level].astype(str).rename('value')
+        rollup = sums[SUMS].groupby([sums['model'], values]).sum()
+        rollups.append(metrics_from_sums(rollup).reset_index().assign(level=level))
+    rollups = pd.concat(rollups, ignore_index=True)[['model', 'level', 'value'] + SUMS +
+                                                    ['accuracy', 'wape', 'bias', 'mae']]
+
+    for row in rollups[rollups['level'] == 'total'].itertuples():
+        log.info(f"{row.model}: accuracy {row.accuracy:.3f}, WAPE {row.wape:.3f}, "
+                 f"bias {row.bias:+.3f}, MAE {row.mae:.1f} over {row.n} forecasts")
+
+    metrics = metrics_from_sums(sums.set_index(['model', primary_key])).reset_index()
+    return metrics, rollups
@@ -1,41 +1,34 @@
-gitfrom typing import Dict, Tuple
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
 import pandas as pd
 import numpy as np
 import logging
 import statsmodels.api as sm
 import lightgbm as lgb
-log = logging.getLogger(__name__) 
 
+from pepsico_course.pipelines.data_science.nodes.metrics.metrics import compute_metrics
 
-def _compute_accuracy(df, y='shipments', y_pred='y_hat'):    
-    # Initialize the accuracy metric to 0
-    metric = 0
+log = logging.getLogger(__name__)
 
-    # Check if the sum of actual values is not equal to 0    
-    if df[y].sum() != 0:
-        # Calculate the accuracy using the formula:
-        # 1 - (sum of absolute differences between actual and predicted) / sum of actual values
-        metric = np.max([0, 1 - np.abs(df[y_pred] - df[y]).sum() / df[y].sum()])
-    # If the sum of actual values is 0 and the sum of absolute differences is 0, set the accuracy to 1
-    elif (df[y].sum() == 0) & (np.abs(df[y_pred] - df[y]).sum() == 0):
-        metric = 1
-    # If the sum of actual values is 0 and the sum of absolute differences is greater than 0, set the accuracy to 0
-    elif (df[y].sum() == 0) & (np.abs(df[y_pred] - df[y]).sum() > 0):
-        metric = 0
 
-    # Return the calculated accuracy metric as a pandas Series
-    return pd.Series({'accuracy': metric})
-
-
-def _ts_fit_predict(df, model_id, time_var, target_var, y_hat, horizon, order, seasonal_order, trend):
-    print(f"Processing {df[model_id].iloc[0]}")
+def _ts_fit_predict(df, model_id, time_var, target_var, y_hat, horizon, order,
+                    seasonal_order, trend, start_params=None):
+    log.debug(f"Processing {df[model_id].iloc[0]}")
     df = df.sort_values(time_var).reset_index()
     endog = df[target_var][:-horizon]
     # Construct the model
     # mod = sm.tsa.SARIMAX(endog, order=(1, 1, 1), trend='c')
     mod = sm.tsa.SARIMAX(endog, order=order, seasonal_order=seasonal_order, trend=trend)
+    # Warm-start from the parameters of the previous run when the model specification
+    # did not change
+    if start_params is not None and list(start_params.index) != mod.param_names:
+        start_params = None
     # Estimate the parameters
-    res = mod.fit(disp=0)
+    res = mod.fit(start_params=start_params, disp=0)
     #print(res.summary())
     fcast = res.get_forecast(steps=horizon).summary_frame()    
     df[y_hat] , df['y_ci_lower'], df['y_ci_upper'] = np.nan, np.nan, np.nan    
@@ -43,47 +36,255 @@ def _ts_fit_predict(df, model_id, time_var, target_var, y_hat, horizon, order, s
     # Note: since we did not specify the alpha parameter, the
     # confidence level is at the default, 95%
     #print(fcast_res.summary_frame())
-    return df
+    return df, pd.Series(res.params, index=mod.param_names)
+
+
+def _ts_fit_predict_chunk(chunk: List[Tuple[pd.DataFrame, Optional[pd.Series]]],
+                          **kwargs) -> List[Tuple[pd.DataFrame, pd.Series]]:
+    """
+    Fits the SARIMAX of a chunk of `model_id`s. Runs inside the worker processes of
+    `time_series_approach`
+    """
+    return [_ts_fit_predict(df, start_params=start_params, **kwargs)
+            for df, start_params in chunk]
+
+
+def _warm_start_params(params: pd.DataFrame, primary_key: str) -> Dict[str, pd.Series]:
+    """
+    Previous run parameters (long format: `primary_key`, `param`, `value`) as a
+    Series per `model_id`
+    """
+    if params is None or params.empty:
+        return {}
+    return {key: group.set_index('param')['value']
+            for key, group in params.groupby(primary_key, sort=False, observed=True)}
+
+
+def time_series_approach(df, horizon, order, time_var, primary_key, y_hat, target_var,
+                         seasonal_order, trend, backend_options: Dict = None,
+                         previous_params: pd.DataFrame = None
+                         ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Fits one SARIMAX per `primary_key` and forecasts the last `horizon` weeks
 
+    The fits are spread over a process pool in chunks of `chunk_size` models and
+    re-assembled in `primary_key` order, so the output does not depend on the number
+    of workers. With `warm_start` each fit starts from the parameters of the
+    previous run (`previous_params`) instead of the default starting values
 
-def time_series_approach(df, horizon, order, time_var, primary_key, y_hat, target_var, seasonal_order, trend):
+    Args:
+        df (pd.DataFrame): Model input
+        backend_options (Dict): `n_workers` (-1 for all the cores), `chunk_size` and
+            `warm_start`
+        previous_params (pd.DataFrame): Fitted parameters of the previous run
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: Forecasts and fitted parameters per
+        `primary_key`
+    """
+    backend_options = backend_options or {}
+    n_workers = backend_options.get('n_workers', 1)
+    if n_workers is None or n_workers < 0:
+        n_workers = os.cpu_count() or 1
+    chunk_size = max(backend_options.get('chunk_size', 10), 1)
+    warm_start = {}
+    if backend_options.get('warm_start'):
+        warm_start = _warm_start_params(previous_params, primary_key)
 
     df['time_var'] = pd.to_datetime(df['time_var']) # Change to timestamp
 
-    df_res_ts = df.groupby(primary_key).apply(lambda x: _ts_fit_predict(x,  primary_key, time_var, target_var, y_hat, horizon, order, seasonal_order, trend)).reset_index(drop=True)
-    df_res_ts.dropna().groupby(primary_key).apply(_compute_accuracy, y=target_var, y_pred=y_hat)
+    groups = [(group, warm_start.get(key))
+              for key, group in df.groupby(primary_key, observed=True)]
+    if not groups:
+        log.info("No SARIMAX to fit")
+        return (df.assign(**{y_hat: np.nan, 'y_ci_lower': np.nan,
+                             'y_ci_upper': np.nan}),
+                pd.DataFrame(columns=[primary_key, 'param', 'value']))
+    chunks = [groups[i:i + chunk_size] for i in range(0, len(groups), chunk_size)]
+    fit_predict = partial(_ts_fit_predict_chunk, model_id=primary_key,
+                          time_var=time_var, target_var=target_var, y_hat=y_hat,
+                          horizon=horizon, order=order,
+                          seasonal_order=seasonal_order, trend=trend)
+
+    n_workers = min(n_workers, len(chunks))
+    n_warm = sum(start is not None for _, start in groups)
+    log.info(f"Fitting {len(groups)} SARIMAX ({n_warm} warm-started) "
+             f"in {len(chunks)} chunks with {n_workers} workers")
+    if n_workers <= 1:
+        results = [result for chunk in chunks for result in fit_predict(chunk)]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            results = [result for chunk_results in executor.map(fit_predict, chunks)
+                       for result in chunk_results]
+
+    df_res_ts = pd.concat([forecast for forecast, _ in results]).reset_index(drop=True)
+
+    params = pd.concat([pd.DataFrame({primary_key: forecast[primary_key].iloc[0],
+                                      'param': fitted.index,
+                                      'value': fitted.values})
+                        for forecast, fitted in results], ignore_index=True)
+
+    return df_res_ts, params
+
+
+def ml_predict(df, fcst_start_date, primary_key, time_var, target_var, model, y_hat,
+               chunk_size=None):
+    """
+    Predicts the whole forecast window (all the `primary_key`s) with a single
+    `model.predict` call and scatters the predictions back to their rows
+
+    Args:
+        chunk_size (Optional[int]): Predict in chunks of this many rows, capping the
+            peak memory of the float32 copy of the features for very large test sets
 
-    return df_res_ts
+    Returns:
+        pd.DataFrame: `df` with the `y_hat` column (NaN outside of the forecast window)
+    """
+    is_test = df[time_var].values >= fcst_start_date
+    test_rows = np.flatnonzero(is_test)
+    features = df.columns.drop([time_var, target_var, primary_key])
+    chunk_size = chunk_size or max(len(test_rows), 1)
 
+    log.info(f"Predicting {len(test_rows)} rows of "
+             f"{df.loc[is_test, primary_key].nunique()} {primary_key}s")
+    y_pred = [model.predict(df.iloc[test_rows[start:start + chunk_size]][features]
+                            .astype(np.float32),
+                            predict_disable_shape_check=True)
+              for start in range(0, len(test_rows), chunk_size)]
 
-def ml_predict_item(df, fcst_start_date, primary_key, time_var, target_var, model, y_hat):
-    print(f"Processing {df[primary_key].iloc[0]}")
-    # test data
-    df_test = df[df[time_var].values>=fcst_start_date].drop(columns=[time_var, target_var, primary_key]).astype(float)
-    y_test = df[df[time_var].values>=fcst_start_date][target_var]
-    dataset_test = lgb.Dataset(df_test, y_test)
-    # prediction
-    y_pred = model.predict(df_test, predict_disable_shape_check=True)
     df[y_hat] = np.nan
-    df.loc[df[time_var].values>=fcst_start_date, y_hat] = y_pred
+    df.loc[is_test, y_hat] = np.concatenate(y_pred) if y_pred else []
     return df
 
 
-def _ml_fit_predict(df, time_var, primary_key, target_var, y_hat, fcst_start_date, params):    
-    # training data
-    df_train = df[df[time_var].values<fcst_start_date].drop(columns=[time_var, target_var, primary_key]).astype(float)
-    y_train = df[df[time_var].values<fcst_start_date][target_var]
-    dataset_train = lgb.Dataset(df_train, y_train)
-    # fitting the model globally
-    lgbm_model = lgb.train(params, train_set=dataset_train)
-    # make predictions locally
-    df = df.groupby(primary_key).apply(lambda x: ml_predict_item(df=df, fcst_start_date=fcst_start_date, primary_key=primary_key, time_var=time_var, target_var=target_var, model=lgbm_model, y_hat=y_hat)).reset_index(drop=True)    
-    return df
+def _forecast_start(df, horizon, time_var):
+    """
+    First week of the forecast window: the `horizon`-th last week of the calendar
+    shared by all the DFUs
+    """
+    return pd.to_datetime(np.unique(df[time_var].values)[-horizon])
+
+
+def _lgb_features(df, time_var, target_var, primary_key) -> Tuple[List[str], List[str]]:
+    """
+    Feature columns of the model input and the categorical ones among them (the
+    `_encoded` columns)
+    """
+    features = list(df.columns.drop([time_var, target_var, primary_key]))
+    return features, [column for column in features if column.endswith('_encoded')]
+
+
+def _lgb_train_set(df, time_var, target_var, primary_key, fcst_start_date,
+                   dataset_params=None) -> Dict[str, Any]:
+    """
+    Training rows (before `fcst_start_date`) as a LightGBM Dataset built from float32
+    features, the `_encoded` columns are declared as categorical features. Returns
+    the Dataset together with the hash of the feature table it was built from
+    """
+    is_train = df[time_var].values < fcst_start_date
+    features, categorical = _lgb_features(df, time_var, target_var, primary_key)
+    params = {'verbose': -1, **(dataset_params or {})}
+
+    x_train = df.loc[is_train, features].to_numpy(dtype=np.float32)
+    y_train = df.loc[is_train, target_var].to_numpy(dtype=np.float32)
+
+    digest = hashlib.sha256(np.ascontiguousarray(x_train).tobytes())
+    digest.update(y_train.tobytes())
+    description = json.dumps([features, categorical, params], sort_keys=True,
+                             default=str)
+    digest.update(description.encode())
+
+    dataset = lgb.Dataset(x_train, y_train, feature_name=features,
+                          categorical_feature=categorical, params=params)
+    return {'dataset': dataset, 'hash': digest.hexdigest(), 'params': params,
+            'feature_name': features, 'categorical_feature': categorical,
+            'fcst_start_date': str(fcst_start_date), 'num_data': int(is_train.sum())}
+
+
+def build_lgb_dataset(df, horizon, time_var, target_var, primary_key,
+                      dataset_options=None, previous=None):
+    """
+    Builds the binned LightGBM training set once, so it can be saved as a binary
+    and shared by the training runs. The saved set of the previous run (`previous`)
+    is returned as it is while the feature table hash does not change
+
+    Args:
+        dataset_options (Dict): LightGBM Dataset parameters (`max_bin`, `num_threads`,
+            ...)
+        previous (Dict): Training set saved by the previous run (empty when missing)
+
+    Returns:
+        Dict: `dataset` (lgb.Dataset) plus its `hash` and description
+    """
+    fcst_start_date = _forecast_start(df, horizon, time_var)
+    train_set = _lgb_train_set(df, time_var, target_var, primary_key, fcst_start_date,
+                               dataset_options)
+
+    if isinstance(previous, dict) and previous.get('hash') == train_set['hash']:
+        log.info(f"Feature table unchanged ({train_set['hash'][:12]}), reusing the "
+                 f"saved LightGBM dataset")
+        return previous
+
+    log.info(f"Building the LightGBM dataset: {train_set['num_data']} rows, "
+             f"{len(train_set['feature_name'])} features "
+             f"({len(train_set['categorical_feature'])} categorical)")
+    return train_set
+
+
+def _ml_fit_predict(df, time_var, primary_key, target_var, y_hat, fcst_start_date,
+                    params, chunk_size=None, train_set=None):
+    # training data, binned once by `build_lgb_dataset` (or here when it is not given)
+    if train_set is None:
+        train_set = _lgb_train_set(df, time_var, target_var, primary_key,
+                                   fcst_start_date)['dataset']
+    # fitting the model globally, for the rounds chosen by the `tuning` pipeline when
+    # there are some
+    params = dict(params)
+    num_boost_round = params.pop('num_iterations', 100)
+    lgbm_model = lgb.train(params, train_set=train_set, num_boost_round=num_boost_round)
+    # make predictions for all the items at once
+    df = ml_predict(df=df, fcst_start_date=fcst_start_date, primary_key=primary_key,
+                    time_var=time_var, target_var=target_var, model=lgbm_model,
+                    y_hat=y_hat, chunk_size=chunk_size)
+    return df, lgbm_model
+
 
+def ml_approach(df, horizon, time_var, target_var, primary_key, y_hat, lgbm_params,
+                predict_options=None, train_dataset=None,
+                tuned_params=None) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, Any]]:
+    """
+    Trains the global LightGBM model and forecasts the last `horizon` weeks of every
+    `primary_key`.
+    The parameters found by the `tuning` pipeline (`tuned_params`, empty before the
+    first tuning run) take precedence over `lgbm_params`
 
-def ml_approach(df, horizon, time_var, target_var, primary_key, y_hat, lgbm_params):
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame, Dict]: Forecasts (forecast window only),
+        accuracy per `primary_key` and the trained model (`booster` plus the features
+        it expects and the start of the forecast window), saved in the catalog to
+        score without retraining
+    """
 
-    fcst_start_date = pd.to_datetime(df[df[primary_key]=='6860_07#MERCADONA#VITORIA'][time_var].values[-horizon])
-    df_res_ml = _ml_fit_predict(df=df, time_var=time_var, primary_key=primary_key, target_var=target_var, y_hat=y_hat,fcst_start_date=fcst_start_date, params=lgbm_params)
-    df_res_ml = df_res_ml.dropna().groupby(primary_key).apply(_compute_accuracy, y=target_var, y_pred=y_hat).reset_index()
-    return df_res_ml
+    predict_options = predict_options or {}
+    if isinstance(tuned_params, dict) and tuned_params:
+        log.info(f"Training LightGBM with the tuned parameters {tuned_params}")
+        lgbm_params = {**lgbm_params, **tuned_params}
+    fcst_start_date = _forecast_start(df, horizon, time_var)
+    features, categorical = _lgb_features(df, time_var, target_var, primary_key)
+    train_set = train_dataset['dataset'] if train_dataset else None
+    df_res_ml, booster = _ml_fit_predict(df=df, time_var=time_var,
+                                         primary_key=primary_key,
+                                         target_var=target_var, y_hat=y_hat,
+                                         fcst_start_date=fcst_start_date,
+                                         params=lgbm_params,
+                                         chunk_size=predict_options.get('chunk_size'),
+                                         train_set=train_set)
+    forecasts = df_res_ml.loc[df_res_ml[y_hat].notna(),
+                              [primary_key, time_var, target_var, y_hat]]
+    forecasts = forecasts.reset_index(drop=True)
+    accuracy = compute_metrics(df_res_ml.dropna(), [primary_key], y=target_var,
+                               y_pred=y_hat)[[primary_key, 'accuracy']]
+    model = {'booster': booster, 'feature_name': features,
+             'categorical_feature': categorical,
+             'fcst_start_date': str(fcst_start_date), 'params': lgbm_params}
+    return forecasts, accuracy, model
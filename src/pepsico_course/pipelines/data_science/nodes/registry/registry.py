@@ -0,0 +1,50 @@
+import json
+import logging
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+
+def register_arima_model(arima_params: pd.DataFrame,
+                         primary_key: str,
+                         order: List[int],
+                         seasonal_order: List[int],
+                         trend: str) -> pd.DataFrame:
+    """
+    SARIMAX model of every `primary_key`: its fitted parameters (long format, as
+    `arima_params`) together with the specification they were fitted with, so the
+    model can be rebuilt and scored without refitting even after the
+    `arima_model_options` change
+
+    Args:
+        arima_params (pd.DataFrame): `primary_key`, `param` and `value` of the fits
+
+    Returns:
+        pd.DataFrame: `arima_params` plus the `order`, `seasonal_order` (JSON lists)
+        and `trend`
+    """
+    model = arima_params[[primary_key, 'param', 'value']].reset_index(drop=True)
+    model['order'] = json.dumps(list(order))
+    model['seasonal_order'] = json.dumps(list(seasonal_order))
+    model['trend'] = trend
+    log.info(f"Registering {model[primary_key].nunique()} SARIMAX models")
+    return model
+
+
+def load_arima_models(arima_model: pd.DataFrame,
+                      primary_key: str) -> Dict[str, Tuple[pd.Series, Dict]]:
+    """
+    Parameters (Series indexed by name) and SARIMAX keyword arguments of every
+    registered `primary_key`
+    """
+    models = {}
+    for key, group in arima_model.groupby(primary_key, sort=False, observed=True):
+        spec = group.iloc[0]
+        models[str(key)] = (group.set_index('param')['value'],
+                            {'order': tuple(json.loads(spec['order'])),
+                             'seasonal_order': tuple(
+                                 json.loads(spec['seasonal_order'])),
+                             'trend': spec['trend']})
+    return models
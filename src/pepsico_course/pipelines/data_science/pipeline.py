@@ -1,7 +1,12 @@
 from kedro.pipeline import Pipeline, node
 from kedro.pipeline.modular_pipeline import pipeline
 
-from .nodes.modeling.modeling import time_series_approach, ml_approach
+from .nodes.modeling.modeling import (time_series_approach, build_lgb_dataset,
+                                      ml_approach)
+from .nodes.metrics.metrics import evaluate_forecasts
+from .nodes.baselines.baselines import (baseline_approach, route_model_input,
+                                        combine_forecasts)
+from .nodes.registry.registry import register_arima_model
 
 
 def create_pipeline(**kwargs) -> Pipeline:
@@ -9,31 +14,97 @@ def create_pipeline(**kwargs) -> Pipeline:
 
     modeling_pipeline = pipeline(
         [
+            # Cheap baselines for every DFU, only the ones they do not forecast well get
+            # a SARIMAX
+            node(
+                func=baseline_approach,
+                inputs=["model_input", "params:general_options.horizon",
+                        "params:general_options.time_var",
+                        "params:general_options.target_var",
+                        "params:general_options.primary_key",
+                        "params:general_options.y_hat", "params:baseline_options"],
+                outputs=["baseline_forecasts", "baseline_routing"],
+                name="baseline_node",
+            ),
+            node(
+                func=route_model_input,
+                inputs=["model_input", "baseline_routing",
+                        "params:general_options.primary_key"],
+                outputs="model_input_arima",
+                name="route_model_input_node",
+            ),
             node(
                 func=time_series_approach,
                 # inputs=["model_input", "params:arima_model_options"],
-                inputs=["model_input", "params:general_options.horizon",
+                inputs=["model_input_arima", "params:general_options.horizon",
                         "params:arima_model_options.order" , "params:general_options.time_var",
                         "params:general_options.primary_key", "params:general_options.y_hat",
                         "params:general_options.target_var", "params:arima_model_options.seasonal_order",
-                        "params:arima_model_options.trend"],
-                outputs="arima_results",
+                        "params:arima_model_options.trend",
+                        "params:arima_backend_options", "arima_params_previous"],
+                outputs=["arima_results", "arima_params"],
                 name="arima_node",
             ),
+            # Fitted SARIMAX with their specification, scored by the `scoring` pipeline
+            # without refitting
+            node(
+                func=register_arima_model,
+                inputs=["arima_params", "params:general_options.primary_key",
+                        "params:arima_model_options.order",
+                        "params:arima_model_options.seasonal_order",
+                        "params:arima_model_options.trend"],
+                outputs="arima_model",
+                name="register_arima_model_node",
+            ),
+            node(
+                func=combine_forecasts,
+                inputs=["arima_results", "baseline_forecasts", "baseline_routing",
+                        "params:general_options.primary_key",
+                        "params:general_options.time_var",
+                        "params:general_options.target_var",
+                        "params:general_options.y_hat"],
+                outputs="statistical_forecasts",
+                name="combine_forecasts_node",
+            ),
+            node(
+                func=build_lgb_dataset,
+                inputs=["model_input", "params:general_options.horizon",
+                        "params:general_options.time_var",
+                        "params:general_options.target_var",
+                        "params:general_options.primary_key",
+                        "params:lgb_dataset_options", "lgb_train_dataset_previous"],
+                outputs="lgb_train_dataset",
+                name="build_lgb_dataset_node",
+            ),
             node(
                 func=ml_approach,
                 inputs=["model_input", "params:general_options.horizon","params:general_options.time_var",
                         "params:general_options.target_var","params:general_options.primary_key",
-                        "params:general_options.y_hat", "params:lgb_model_options"],
-                outputs="ml_results",
+                        "params:general_options.y_hat", "params:lgb_model_options",
+                        "params:lgb_predict_options", "lgb_train_dataset",
+                        "lgb_tuned_params_previous"],
+                outputs=["ml_forecasts", "ml_results", "lgb_model"],
                 name="ml_node",
             ),
+            node(
+                func=evaluate_forecasts,
+                inputs=["arima_results", "ml_forecasts", "statistical_forecasts",
+                        "facts_data", "params:general_options.primary_key",
+                        "params:general_options.target_var",
+                        "params:general_options.y_hat"],
+                outputs=["forecast_metrics", "forecast_metrics_rollup"],
+                name="evaluate_forecasts_node",
+            ),
         ]
     )
 
     return pipeline(
         pipe=modeling_pipeline,
         namespace="data_science",
-        inputs=["model_input"],
-        outputs=["arima_results", "ml_results"],
+        inputs=["model_input", "facts_data", "arima_params_previous",
+                "lgb_train_dataset_previous", "lgb_tuned_params_previous"],
+        outputs=["baseline_forecasts", "baseline_routing", "arima_results",
+                 "arima_params", "arima_model", "statistical_forecasts",
+                 "lgb_train_dataset", "ml_forecasts", "ml_results", "lgb_model",
+                 "forecast_metrics", "forecast_metrics_rollup"],
     )
\ No newline at end of file
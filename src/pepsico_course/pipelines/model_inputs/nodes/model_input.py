@@ -1,20 +1,94 @@
+import logging
+from typing import Dict, List
+
 import pandas as pd
 
-def create_model_input(shipments_featured: pd.DataFrame, 
-                       promotions_featured: pd.DataFrame, 
+log = logging.getLogger(__name__)
+
+KEYS = ['model_id', 'time_var']
+FACTS = ['model_id', 'customer', 'location', 'category']
+TARGET = 'shipments'
+ATTRIBUTES = ['prod_code', 'customer', 'location', 'category']
+
+
+def _shipments_schema(df: pd.DataFrame) -> Dict[str, str]:
+    """
+    Encoded categories and year dummies as int8, the remaining numeric features as
+    float32
+    """
+    schema = {}
+    for column in df.columns.drop(KEYS + [TARGET]):
+        if column.endswith('_encoded') or column.startswith('year_'):
+            schema[column] = 'int8'
+        elif pd.api.types.is_numeric_dtype(df[column]):
+            schema[column] = 'float32'
+    return schema
+
+
+def _indicators_schema(df: pd.DataFrame, keys: List[str]) -> Dict[str, str]:
+    """Every promotion / holiday column is an indicator (or a small count): int8"""
+    return {column: 'int8' for column in df.columns.drop(keys)}
+
+
+def _log_memory_report(df: pd.DataFrame, name: str) -> None:
+    """Logs the memory used by each column of a DataFrame"""
+    usage = df.memory_usage(deep=True, index=False)
+    report = ', '.join(f'{column}: {size / 1024:.0f}KB ({df[column].dtype})'
+                       for column, size in usage.items())
+    log.info(f'{name}: {len(df)} rows, {usage.sum() / 1024 ** 2:.2f}MB [{report}]')
+
+
+def create_model_input(shipments_featured: pd.DataFrame,
+                       promotions_featured: pd.DataFrame,
                        holidays_featured: pd.DataFrame) -> pd.DataFrame:
+    """
+    Joins the shipments with the promotions (by `model_id` and `time_var`) and the
+    holidays (by `time_var`). Every input is cast to its final dtype before joining
+    and the joins run on sorted indexes, so no wide float64 intermediate is built.
+    The holidays have a row per week of the calendar, so their join needs no filling
+
+    Args:
+        shipments_featured (pd.DataFrame): Shipments features, one row per DFU and week
+        promotions_featured (pd.DataFrame): Promotions indicators per DFU and week
+        holidays_featured (pd.DataFrame): Holidays indicators of every week
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: The model input and the facts (attributes
+        of each `model_id`)
+    """
+
+    facts_data = (shipments_featured[FACTS].drop_duplicates('model_id')
+                  .reset_index(drop=True))
+
+    # Same `model_id` categories on both sides, so the join compares integer codes
+    model_ids = [pd.Index(df['model_id'].unique())
+                 for df in (shipments_featured, promotions_featured)]
+    model_id = pd.CategoricalDtype(model_ids[0].union(model_ids[1]).dropna())
+
+    shipments = shipments_featured.drop(columns=ATTRIBUTES)
+    shipments = shipments.astype({'model_id': model_id, **_shipments_schema(shipments)})
+    columns = list(shipments.columns)
+    shipments = shipments.set_index(KEYS).sort_index()
+
+    promotions = promotions_featured.drop(columns=ATTRIBUTES)
+    promotions = promotions.astype({'model_id': model_id,
+                                    **_indicators_schema(promotions, KEYS)})
+    promotions = promotions.set_index(KEYS).sort_index()
+
+    holidays = holidays_featured.astype(_indicators_schema(holidays_featured,
+                                                           ['time_var']))
+    holidays = holidays.set_index('time_var').sort_index()
+
+    mrd = shipments.join(promotions, how='left')
+    # Weeks without promotions
+    mrd[promotions.columns] = mrd[promotions.columns].fillna(0).astype('int8')
+    # The holidays cover every week of the calendar, weeks without holidays included
+    mrd = mrd.join(holidays, on='time_var', how='left')
 
-    facts_data = shipments_featured[['model_id', 'customer', 'location', 'category']]
-    
-    shipments_featured = shipments_featured.drop(['prod_code', 'customer', 'location', 'category'], axis=1)
-    promotions_featured = promotions_featured.drop(['prod_code', 'customer', 'location','category'], axis=1)
+    joined = list(promotions.columns) + list(holidays.columns)
 
-    mrd = shipments_featured.merge(promotions_featured, on=['model_id', 'time_var'], how="left")
-    mrd = mrd.merge(holidays_featured, on="time_var", how="left")
+    mrd = mrd.reset_index()[columns + joined]
 
-    mrd = mrd.fillna(0)
-    mrd['year_2021'] = mrd['year_2021'].astype('int8')
-    mrd['year_2022'] = mrd['year_2023'].astype('int8')
-    mrd['year_2023'] = mrd['year_2023'].astype('int8')
+    _log_memory_report(mrd, 'model_input')
 
     return mrd, facts_data
@@ -0,0 +1 @@
+from .pipeline import create_pipeline  # NOQA
\ No newline at end of file
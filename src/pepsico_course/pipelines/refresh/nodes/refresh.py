@@ -0,0 +1,217 @@
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pepsico_course.pipelines.data_processing.nodes.clean.utils import (
+    create_model_id,
+    normalize_columns,
+)
+
+log = logging.getLogger(__name__)
+
+DFU_KEYS = ['prod_code', 'customer', 'location']
+STATUSES = ['new', 'changed', 'appended', 'unchanged', 'removed']
+# DFUs whose rows have to go through the pipeline again (`removed` ones are only
+# dropped)
+REFRESHED = ['new', 'changed', 'appended']
+
+
+def _dfu_ids(df: pd.DataFrame) -> pd.Series:
+    """`model_id` of every row, built exactly as the cleaning nodes do"""
+    if 'model_id' in df.columns:
+        return df['model_id']
+
+    keys = df[DFU_KEYS].copy()
+    keys = normalize_columns(keys, 'customer')
+    keys = normalize_columns(keys, 'location')
+    return create_model_id(keys)['model_id']
+
+
+def _fingerprints(df: pd.DataFrame, model_id: pd.Series,
+                  rows: np.ndarray = None) -> pd.Series:
+    """
+    Order independent fingerprint of the rows of each DFU: the (wrapping) sum of the
+    hashes of its rows. `rows` restricts the fingerprint to a subset of the rows
+    """
+    hashes = pd.util.hash_pandas_object(df, index=False)
+    if rows is not None:
+        hashes, model_id = hashes[rows], model_id[rows]
+    return hashes.groupby(model_id.to_numpy(), sort=True).sum()
+
+
+def _settings_hash(settings: Dict[str, Any]) -> str:
+    encoded = json.dumps(settings, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def detect_changes(shipments: pd.DataFrame,
+                   promotions: pd.DataFrame,
+                   previous_state: pd.DataFrame,
+                   refresh_options: Dict,
+                   processing_params: Dict,
+                   arima_model_options: Dict) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Compares the raw shipments and promotions with the state stored by the last
+    successful refresh. Every DFU gets one status:
+
+    - `new` / `removed`: the DFU was not in the previous run / is not in the raw data
+      anymore
+    - `appended`: only rows after the previous watermark (last week of the shipments)
+      changed
+    - `changed`: rows up to the watermark changed (restatements), or the settings did
+    - `unchanged`: same rows as in the previous run, its outputs are kept as they are
+
+    Args:
+        shipments (pd.DataFrame): Raw shipments
+        promotions (pd.DataFrame): Raw promotions
+        previous_state (pd.DataFrame): State of the last successful refresh (empty on
+            the first one)
+        refresh_options (Dict): `force` refreshes every DFU
+        processing_params (Dict): Cleaning parameters, a change refreshes every DFU
+        arima_model_options (Dict): SARIMAX parameters, a change refreshes every DFU
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: Status of each `model_id` and the new state
+    """
+
+    shipments_ids, promotions_ids = _dfu_ids(shipments), _dfu_ids(promotions)
+    shipments_weeks = pd.to_datetime(shipments['time_var'], utc=True)
+    watermark = shipments_weeks.max()
+
+    hashes = {'shipments_hash': _fingerprints(shipments, shipments_ids),
+              'promotions_hash': _fingerprints(promotions, promotions_ids)}
+    model_ids = hashes['shipments_hash'].index.union(hashes['promotions_hash'].index)
+    state = pd.DataFrame({name: values.reindex(model_ids, fill_value=0)
+                          for name, values in hashes.items()})
+    state = state.rename_axis('model_id').reset_index()
+    state['watermark'] = watermark
+    state['settings_hash'] = _settings_hash({'processing': processing_params,
+                                             'arima': arima_model_options})
+
+    status = pd.Series('new', index=state['model_id'], name='status')
+    if previous_state.empty:
+        log.info('No previous refresh state, every DFU is new')
+    else:
+        previous = previous_state.set_index('model_id')
+        previous_watermark = previous['watermark'].iloc[0]
+        seen = status.index[status.index.isin(previous.index)]
+
+        if refresh_options.get('force'):
+            log.info('Forced refresh of every DFU')
+            status[seen] = 'changed'
+        elif previous['settings_hash'].iloc[0] != state['settings_hash'].iloc[0]:
+            log.info('Parameters changed since the previous refresh, every DFU is '
+                     'refreshed')
+            status[seen] = 'changed'
+        else:
+            # Fingerprints of the rows the previous run already saw
+            promotions_weeks = pd.to_datetime(promotions['time_var'], utc=True)
+            history = pd.DataFrame({
+                'shipments_hash': _fingerprints(
+                    shipments, shipments_ids,
+                    (shipments_weeks <= previous_watermark).to_numpy()),
+                'promotions_hash': _fingerprints(
+                    promotions, promotions_ids,
+                    (promotions_weeks <= previous_watermark).to_numpy()),
+            })
+
+            columns = ['shipments_hash', 'promotions_hash']
+            previous_hashes = previous.loc[seen, columns]
+            current_hashes = state.set_index('model_id').loc[seen, columns]
+            unchanged = (current_hashes == previous_hashes).all(axis=1)
+            history_unchanged = (history.reindex(seen, fill_value=0)
+                                 == previous_hashes).all(axis=1)
+            status[seen] = np.select([unchanged, history_unchanged],
+                                     ['unchanged', 'appended'], 'changed')
+
+        removed = previous.index[~previous.index.isin(status.index)]
+        status = pd.concat([status, pd.Series('removed', index=removed, name='status')])
+
+    changes = status.rename_axis('model_id').reset_index()
+    counts = changes['status'].value_counts().reindex(STATUSES, fill_value=0)
+    log.info(f'DFUs up to {watermark.date()}: '
+             + ', '.join(f'{count} {name}' for name, count in counts.items()))
+
+    return changes, state
+
+
+def select_dfus(df: pd.DataFrame, changes: pd.DataFrame) -> pd.DataFrame:
+    """Rows of the DFUs which have to be refreshed"""
+    refreshed = changes.loc[changes['status'].isin(REFRESHED), 'model_id']
+    return df[_dfu_ids(df).isin(refreshed).to_numpy()].reset_index(drop=True)
+
+
+def merge_dfus(previous: pd.DataFrame, delta: pd.DataFrame,
+               changes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Replaces the rows of the refreshed (and removed) DFUs of the previous output by
+    the rows computed in this run, the rows of the unchanged DFUs are kept as they are
+
+    Args:
+        previous (pd.DataFrame): Output of the previous run (empty on the first one)
+        delta (pd.DataFrame): Output of this run, computed for the refreshed DFUs only
+        changes (pd.DataFrame): Status of each `model_id`
+
+    Returns:
+        pd.DataFrame: The merged output
+    """
+
+    if previous.empty:
+        return delta
+
+    outdated = changes.loc[changes['status'] != 'unchanged', 'model_id']
+    previous_ids = previous['model_id'].astype(str)
+    is_kept = ~previous_ids.isin(outdated).to_numpy()
+    kept = previous[is_kept]
+    if not len(kept):
+        return delta
+
+    # The rows of a refreshed DFU take the place of its previous ones (new DFUs go
+    # last), so the row order - and the order of appearance of the promo types -
+    # is the one of a full run
+    first_row = (pd.Series(np.arange(len(previous)), index=previous_ids)
+                 .groupby(level=0).min())
+    delta_rows = delta['model_id'].astype(str).map(first_row).fillna(len(previous))
+    position = np.concatenate([np.flatnonzero(is_kept), delta_rows.to_numpy()])
+    merged = pd.concat([kept, delta], ignore_index=True) if len(delta) else kept
+    order = np.argsort(position[:len(merged)], kind='stable')
+    merged = merged.iloc[order].reset_index(drop=True)
+
+    # Timestamps are loaded back from Parquet in microseconds, float32 from CSV as
+    # float64
+    for column in merged.select_dtypes(['datetime', 'datetimetz']).columns:
+        merged[column] = merged[column].dt.as_unit('ns')
+    if len(delta):
+        floats = delta.select_dtypes('floating').columns.intersection(merged.columns)
+        merged = merged.astype(delta[floats].dtypes.to_dict())
+    if isinstance(delta['model_id'].dtype, pd.CategoricalDtype):
+        categories = pd.Index(merged['model_id'].astype(str).unique()).sort_values()
+        merged['model_id'] = pd.Categorical(merged['model_id'], categories=categories)
+
+    log.info(f'Kept {len(kept)} rows, replaced {len(previous) - len(kept)} by '
+             f'{len(delta)} new ones')
+    return merged
+
+
+def merge_results(previous: pd.DataFrame, delta: pd.DataFrame,
+                  changes: pd.DataFrame) -> pd.DataFrame:
+    """
+    `merge_dfus` for the model outputs, sorted by `model_id` as a full run writes
+    them
+    """
+    merged = merge_dfus(previous, delta, changes)
+    order = np.argsort(merged['model_id'].astype(str).to_numpy(), kind='stable')
+    return merged.iloc[order].reset_index(drop=True)
+
+
+def commit_state(state: pd.DataFrame, *outputs: pd.DataFrame) -> pd.DataFrame:
+    """
+    Passes the new state through once every output of the refresh has been
+    computed, so a failed run is detected again by the next one
+    """
+    log.info(f'Refresh state saved with watermark {state["watermark"].iloc[0].date()}')
+    return state
@@ -0,0 +1,155 @@
+from kedro.pipeline import Pipeline, node
+from kedro.pipeline.modular_pipeline import pipeline
+
+from pepsico_course.pipelines import data_processing, data_science, model_inputs
+
+from .nodes.refresh import (
+    commit_state,
+    detect_changes,
+    merge_dfus,
+    merge_results,
+    select_dfus,
+)
+
+# Cleaned per DFU, merged with the previous run (`merge_dfus`)
+PROCESSED = ["shipments", "promotions"]
+# Modeled per DFU, merged with the previous run (`merge_results`)
+RESULTS = ["baseline_forecasts", "baseline_routing", "arima_results", "arima_params"]
+
+
+def _changes_pipeline(processing: Pipeline) -> Pipeline:
+    """Ingestion of `data_processing` and the status of every DFU"""
+    return processing.only_nodes_with_tags("ingestion") + pipeline(
+        [
+            node(
+                func=detect_changes,
+                inputs=["shipments_raw", "promotions_raw", "refresh_state_previous",
+                        "params:refresh_options",
+                        "params:data_processing.processing_params",
+                        "params:data_science.arima_model_options"],
+                outputs=["changes", "refresh_state_pending"],
+                name="detect_changes_node",
+            ),
+        ]
+    )
+
+
+def _processing_pipeline(processing: Pipeline) -> Pipeline:
+    """
+    Cleaning of `data_processing` on the rows of the refreshed DFUs, merged with the
+    cleaned rows of the previous run. The holidays are not per DFU, they are cleaned
+    again
+    """
+    namespaced = {name: f"data_processing.{name}_processed"
+                  for name in PROCESSED + ["holidays"]}
+    branches = [pipeline(processing.only_nodes_with_outputs(namespaced["holidays"]),
+                         outputs={namespaced["holidays"]: "holidays_processed"})]
+    for name in PROCESSED:
+        branches.append(pipeline(
+            [
+                node(
+                    func=select_dfus,
+                    inputs=[f"{name}_raw", "changes"],
+                    outputs=f"{name}_delta",
+                    name=f"select_{name}_node",
+                ),
+                node(
+                    func=merge_dfus,
+                    inputs=[f"{name}_processed_previous", f"{name}_processed_delta",
+                            "changes"],
+                    outputs=f"{name}_processed",
+                    name=f"merge_{name}_node",
+                ),
+            ]
+        ))
+        branches.append(pipeline(processing.only_nodes_with_outputs(namespaced[name]),
+                                 inputs={f"{name}_raw": f"{name}_delta"},
+                                 outputs={namespaced[name]: f"{name}_processed_delta"}))
+    return sum(branches, Pipeline([]))
+
+
+def _feature_pipeline(processing: Pipeline) -> Pipeline:
+    """
+    Calendar and features of `data_processing` and the model input of `model_inputs`,
+    rebuilt from the merged data as the encodings depend on all the DFUs
+    """
+    processed = {f"data_processing.{name}_processed": f"{name}_processed"
+                 for name in PROCESSED + ["holidays"]}
+    features = pipeline(processing.from_inputs(*processed), inputs=processed)
+    return features + model_inputs.create_pipeline()
+
+
+def _modeling_pipeline(modeling: Pipeline) -> Pipeline:
+    """
+    Baselines and SARIMAX of `data_science` on the refreshed DFUs only, merged with the
+    results of the previous run. The combination, the global LightGBM model and the
+    evaluation run on the merged results, as in `data_science`
+    """
+    per_dfu = modeling.to_outputs(*RESULTS)
+    delta = pipeline(per_dfu,
+                     inputs={"model_input": "model_input_delta"},
+                     outputs={name: f"{name}_delta" for name in RESULTS})
+    merges = pipeline(
+        [
+            node(
+                func=select_dfus,
+                inputs=["model_input", "changes"],
+                outputs="model_input_delta",
+                name="select_model_input_node",
+            ),
+        ] + [
+            node(
+                func=merge_results,
+                inputs=[f"{name}_previous", f"{name}_delta", "changes"],
+                outputs=name,
+                name=f"merge_{name}_node",
+            )
+            for name in RESULTS
+        ] + [
+            node(
+                func=commit_state,
+                inputs=["refresh_state_pending", "arima_results", "arima_params",
+                        "statistical_forecasts", "ml_results"],
+                outputs="refresh_state",
+                name="commit_state_node",
+            ),
+        ]
+    )
+    return delta + merges + (modeling - per_dfu)
+
+
+def create_pipeline(**kwargs) -> Pipeline:
+    """
+    Incremental version of data_processing + model_inputs + data_science: only the
+    DFUs whose raw data changed since the last refresh are cleaned and get their
+    SARIMAX refitted, their rows replace the previous ones in the outputs. The
+    global steps (encodings, calendar, model input and the LightGBM model) run on
+    the merged data. The nodes are the ones of those pipelines, with their inputs
+    and outputs mapped to the `_delta` / `_previous` data sets. Not part of
+    `__default__`, run with ``kedro run --pipeline refresh``
+    """
+    processing = data_processing.create_pipeline()
+    modeling = data_science.create_pipeline()
+    refresh_pipeline = (_changes_pipeline(processing) + _processing_pipeline(processing)
+                        + _feature_pipeline(processing) + _modeling_pipeline(modeling))
+
+    # The parameters of the reused pipelines are shared with the full runs
+    shared = [name for name in refresh_pipeline.inputs()
+              if name.startswith("params:") and name != "params:refresh_options"]
+    return pipeline(
+        pipe=refresh_pipeline,
+        namespace="refresh",
+        inputs=["shipments", "promotions", "holidays", "refresh_state_previous",
+                "shipments_processed_previous", "promotions_processed_previous",
+                "lgb_train_dataset_previous", "lgb_tuned_params_previous"]
+        + [f"{name}_previous" for name in RESULTS],
+        outputs=["shipments_raw", "promotions_raw", "holidays_raw",
+                 "shipments_processed", "promotions_processed", "holidays_processed",
+                 "calendar", "shipments_featured", "promotions_featured",
+                 "holidays_featured", "model_input", "facts_data",
+                 "baseline_forecasts", "baseline_routing", "arima_results",
+                 "arima_params", "arima_model", "statistical_forecasts",
+                 "lgb_train_dataset", "ml_forecasts", "ml_results", "lgb_model",
+                 "forecast_metrics", "forecast_metrics_rollup", "refresh_state"],
+        parameters={name: name for name in shared},
+    )
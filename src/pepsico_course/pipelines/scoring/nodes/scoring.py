@@ -0,0 +1,134 @@
+import logging
+from typing import Any, Dict
+
+import pandas as pd
+import statsmodels.api as sm
+
+from pepsico_course.pipelines.data_science.nodes.baselines.baselines import (
+    baseline_approach,
+)
+from pepsico_course.pipelines.data_science.nodes.modeling.modeling import (
+    _forecast_start,
+    ml_predict,
+)
+from pepsico_course.pipelines.data_science.nodes.registry.registry import (
+    load_arima_models,
+)
+
+log = logging.getLogger(__name__)
+
+
+def score_arima(df: pd.DataFrame,
+                arima_model: pd.DataFrame,
+                horizon: int,
+                time_var: str,
+                target_var: str,
+                primary_key: str,
+                y_hat: str) -> pd.DataFrame:
+    """
+    Forecasts the last `horizon` weeks of every `primary_key` with a registered
+    SARIMAX, without refitting it: the model is rebuilt on the weeks before the
+    forecast window and only run through the Kalman filter with the saved
+    parameters, which takes milliseconds instead of the likelihood optimisation
+
+    Args:
+        df (pd.DataFrame): Model input, with the new weeks
+        arima_model (pd.DataFrame): Registered SARIMAX models (see
+            `register_arima_model`)
+
+    Returns:
+        pd.DataFrame: Forecast window of the scored `primary_key`s with `y_hat` and its
+        95% interval
+    """
+    models = load_arima_models(arima_model, primary_key)
+    columns = [primary_key, time_var, target_var, y_hat, 'y_ci_lower', 'y_ci_upper']
+
+    forecasts, missing = [], 0
+    for key, group in df.groupby(primary_key, observed=True, sort=True):
+        if str(key) not in models or len(group) <= horizon:
+            missing += 1
+            continue
+        params, spec = models[str(key)]
+        group = group.sort_values(time_var).reset_index(drop=True)
+        endog = group[target_var][:-horizon]
+        mod = sm.tsa.SARIMAX(endog, **spec)
+        res = mod.filter(params.reindex(mod.param_names).to_numpy())
+        fcast = res.get_forecast(steps=horizon).summary_frame()
+
+        window = group.iloc[-horizon:][[primary_key, time_var, target_var]].copy()
+        window[y_hat] = fcast['mean'].to_numpy()
+        window['y_ci_lower'] = fcast['mean_ci_lower'].to_numpy()
+        window['y_ci_upper'] = fcast['mean_ci_upper'].to_numpy()
+        forecasts.append(window)
+
+    log.info(f"Scored {len(forecasts)} SARIMAX, {missing} {primary_key}s without a "
+             f"registered model")
+    if not forecasts:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(forecasts, ignore_index=True)[columns]
+
+
+def score_baselines(df: pd.DataFrame,
+                    horizon: int,
+                    time_var: str,
+                    target_var: str,
+                    primary_key: str,
+                    y_hat: str,
+                    baseline_options: Dict) -> pd.DataFrame:
+    """
+    Baseline forecasts of the last `horizon` weeks of every `primary_key`. They have
+    no fitted state, so they are simply recomputed on the new weeks; the routing
+    stays the one of the training run
+
+    Returns:
+        pd.DataFrame: Forecasts of every method (one row per `primary_key`, week and
+        method)
+    """
+    baseline_forecasts, _ = baseline_approach(df, horizon, time_var, target_var,
+                                              primary_key, y_hat, baseline_options)
+    return baseline_forecasts
+
+
+def score_lgbm(df: pd.DataFrame,
+               lgb_model: Dict[str, Any],
+               horizon: int,
+               time_var: str,
+               target_var: str,
+               primary_key: str,
+               y_hat: str,
+               predict_options: Dict = None) -> pd.DataFrame:
+    """
+    Forecasts the last `horizon` weeks of every `primary_key` with the registered
+    LightGBM booster, in a single batched `predict` over the forecast window (see
+    `ml_predict`). The features are taken in the order the booster was trained on;
+    the ones missing from `df` (e.g. a promotion type that is not planned any more)
+    are 0
+
+    Args:
+        df (pd.DataFrame): Model input, with the new weeks
+        lgb_model (Dict): Registered model, as returned by `ml_approach`
+
+    Returns:
+        pd.DataFrame: Forecast window with `y_hat`
+    """
+    predict_options = predict_options or {}
+    features = lgb_model['feature_name']
+    fcst_start_date = _forecast_start(df, horizon, time_var)
+    if fcst_start_date < pd.to_datetime(lgb_model['fcst_start_date']):
+        log.warning(f"The forecast window starts on {fcst_start_date:%Y-%m-%d}, before "
+                    f"the end of the training data of the model "
+                    f"({lgb_model['fcst_start_date']}): some forecasts are in-sample")
+
+    missing = [feature for feature in features if feature not in df.columns]
+    if missing:
+        log.warning(f"{len(missing)} features of the model are not in the model input, "
+                    f"set to 0: {missing}")
+    columns = [primary_key, time_var, target_var]
+    x = df.reindex(columns=columns + features, fill_value=0)
+
+    scored = ml_predict(df=x, fcst_start_date=fcst_start_date, primary_key=primary_key,
+                        time_var=time_var, target_var=target_var,
+                        model=lgb_model['booster'], y_hat=y_hat,
+                        chunk_size=predict_options.get('chunk_size'))
+    scored = scored.loc[scored[y_hat].notna(), columns + [y_hat]]
+    return scored.reset_index(drop=True)
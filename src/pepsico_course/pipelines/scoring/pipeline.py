@@ -0,0 +1,79 @@
+from kedro.pipeline import Pipeline, node
+from kedro.pipeline.modular_pipeline import pipeline
+
+from pepsico_course.pipelines.data_science.nodes.baselines.baselines import (
+    combine_forecasts,
+)
+
+from .nodes.scoring import score_arima, score_baselines, score_lgbm
+
+# Same options as the models of `data_science`
+PARAMETERS = {
+    f"params:{name}": f"params:data_science.{name}"
+    for name in ["general_options.horizon", "general_options.time_var",
+                 "general_options.target_var", "general_options.primary_key",
+                 "general_options.y_hat", "baseline_options", "lgb_predict_options"]
+}
+
+
+def create_pipeline(**kwargs) -> Pipeline:
+    """
+    Forecasts the last `horizon` weeks of the model input with the models registered
+    by the last `data_science` run (`arima_model`, `lgb_model` and
+    `baseline_routing`), without retraining them, for the reforecasts between two
+    trainings. Not part of `__default__`, run with ``kedro run --pipeline scoring``
+    once the model input has the new weeks
+    """
+
+    scoring_pipeline = pipeline(
+        [
+            node(
+                func=score_baselines,
+                inputs=["model_input", "params:general_options.horizon",
+                        "params:general_options.time_var",
+                        "params:general_options.target_var",
+                        "params:general_options.primary_key",
+                        "params:general_options.y_hat", "params:baseline_options"],
+                outputs="baseline_scores",
+                name="score_baselines_node",
+            ),
+            node(
+                func=score_arima,
+                inputs=["model_input", "arima_model", "params:general_options.horizon",
+                        "params:general_options.time_var",
+                        "params:general_options.target_var",
+                        "params:general_options.primary_key",
+                        "params:general_options.y_hat"],
+                outputs="arima_scores",
+                name="score_arima_node",
+            ),
+            node(
+                func=combine_forecasts,
+                inputs=["arima_scores", "baseline_scores", "baseline_routing",
+                        "params:general_options.primary_key",
+                        "params:general_options.time_var",
+                        "params:general_options.target_var",
+                        "params:general_options.y_hat"],
+                outputs="statistical_scores",
+                name="combine_scores_node",
+            ),
+            node(
+                func=score_lgbm,
+                inputs=["model_input", "lgb_model", "params:general_options.horizon",
+                        "params:general_options.time_var",
+                        "params:general_options.target_var",
+                        "params:general_options.primary_key",
+                        "params:general_options.y_hat", "params:lgb_predict_options"],
+                outputs="ml_scores",
+                name="score_lgbm_node",
+            ),
+        ]
+    )
+
+    return pipeline(
+        pipe=scoring_pipeline,
+        namespace="scoring",
+        inputs=["model_input", "arima_model", "lgb_model", "baseline_routing"],
+        outputs=["statistical_scores", "ml_scores"],
+        parameters=PARAMETERS,
+    )
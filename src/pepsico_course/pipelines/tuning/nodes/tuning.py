@@ -0,0 +1,232 @@
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+from pepsico_course.pipelines.data_science.nodes.modeling.modeling import (
+    _forecast_start,
+    _lgb_features,
+)
+
+log = logging.getLogger(__name__)
+
+# Options of the training run itself, not searched and not copied to the trials
+RUN_OPTIONS = ['task', 'metric', 'num_threads', 'verbose', 'num_iterations',
+               'num_boost_round', 'n_estimators']
+
+# Booster creation touches the Python side of the shared datasets, the boosting
+# rounds do not
+_create_lock = threading.Lock()
+
+
+def sample_params(search_space: Dict[str, Dict], n_samples: int,
+                  seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Random configurations of the `search_space`, each parameter given as
+    ``{type: int | float, low, high, log}`` (`log` samples uniformly on the log scale)
+    """
+    rng = np.random.default_rng(seed)
+    samples = []
+    for _ in range(n_samples):
+        params = {}
+        for name, space in search_space.items():
+            low, high = float(space['low']), float(space['high'])
+            if space.get('log'):
+                value = math.exp(rng.uniform(math.log(low), math.log(high)))
+            else:
+                value = rng.uniform(low, high)
+            if space.get('type', 'float') == 'int':
+                params[name] = int(round(value))
+            else:
+                params[name] = float(f'{value:.4g}')
+        samples.append(params)
+    return samples
+
+
+class _Trial:
+    """
+    A LightGBM configuration trained round by round on the shared datasets,
+    remembering its best validation score
+    """
+
+    def __init__(self, trial_id: int, params: Dict[str, Any], train_set: lgb.Dataset,
+                 valid_set: lgb.Dataset, early_stopping_rounds: int):
+        self.trial_id = trial_id
+        self.params = params
+        with _create_lock:
+            self.booster = lgb.Booster(params=params, train_set=train_set)
+            self.booster.add_valid(valid_set, 'valid')
+        self.early_stopping_rounds = early_stopping_rounds
+        self.best_score, self.best_iteration = math.inf, 0
+        self.early_stopped = False
+        self.status = 'running'
+        self.seconds = 0.0
+
+    def train(self, rounds: int) -> '_Trial':
+        """
+        Boosts up to `rounds` rounds in total, or until the validation score stops
+        improving
+        """
+        start = time.perf_counter()
+        while not self.early_stopped and self.booster.current_iteration() < rounds:
+            self.booster.update()
+            _, _, score, higher_better = self.booster.eval_valid()[0]
+            score = -score if higher_better else score
+            iteration = self.booster.current_iteration()
+            if score < self.best_score:
+                self.best_score, self.best_iteration = score, iteration
+            elif iteration - self.best_iteration >= self.early_stopping_rounds:
+                self.early_stopped = True
+        self.seconds += time.perf_counter() - start
+        return self
+
+
+def _validation_split(df: pd.DataFrame, horizon: int, time_var: str, target_var: str,
+                      primary_key: str, validation_weeks: int,
+                      dataset_params: Dict) -> Tuple[lgb.Dataset, lgb.Dataset]:
+    """
+    Training rows before the forecast window split in time: the last
+    `validation_weeks` weeks validate, the previous ones train. Both sets are binned
+    once, the validation one on the bins of the training one
+    """
+    fcst_start_date = _forecast_start(df, horizon, time_var)
+    weeks = np.unique(df[time_var].values)
+    weeks = weeks[weeks < fcst_start_date]
+    if len(weeks) <= validation_weeks:
+        raise ValueError(f'{len(weeks)} weeks before the forecast window, not enough '
+                         f'for {validation_weeks} validation weeks')
+    valid_start = weeks[-validation_weeks]
+
+    features, categorical = _lgb_features(df, time_var, target_var, primary_key)
+    times = df[time_var].values
+    is_train = times < valid_start
+    is_valid = (times >= valid_start) & (times < fcst_start_date)
+
+    train_set = lgb.Dataset(df.loc[is_train, features].to_numpy(dtype=np.float32),
+                            df.loc[is_train, target_var].to_numpy(dtype=np.float32),
+                            feature_name=features, categorical_feature=categorical,
+                            params=dataset_params)
+    valid_set = lgb.Dataset(df.loc[is_valid, features].to_numpy(dtype=np.float32),
+                            df.loc[is_valid, target_var].to_numpy(dtype=np.float32),
+                            feature_name=features, categorical_feature=categorical,
+                            reference=train_set, params=dataset_params)
+    log.info(f"Tuning on {is_train.sum()} training rows, validating on the "
+             f"{validation_weeks} weeks from {pd.to_datetime(valid_start):%Y-%m-%d} "
+             f"({is_valid.sum()} rows)")
+    return train_set.construct(), valid_set.construct()
+
+
+def tune_lgbm(df: pd.DataFrame,
+              horizon: int,
+              time_var: str,
+              target_var: str,
+              primary_key: str,
+              lgbm_params: Dict,
+              dataset_options: Dict,
+              tuning_options: Dict) -> Tuple[Dict[str, Any], pd.DataFrame]:
+    """
+    Searches the LightGBM parameters of `ml_approach` on a time-based validation
+    split of the weeks before the forecast window, with successive halving
+
+    `n_trials` random configurations of the `search_space`, plus `lgbm_params` as
+    they are, all start on the same binned datasets (built once, shared by the
+    trials). At every rung the surviving trials are boosted up to the rung's
+    rounds (`min_rounds`, then `reduction_factor` times more each rung, up to
+    `max_rounds`) in parallel, each one stopping early when its validation score
+    does not improve in `early_stopping_rounds`; only the best
+    1 / `reduction_factor` of them go on to the next rung
+
+    The trials run on threads: the boosting rounds release the GIL, and every trial
+    gets `num_threads` = cores / `n_workers`, so the cores are not oversubscribed
+
+    Args:
+        df (pd.DataFrame): Model input
+        lgbm_params (Dict): Current `lgb_model_options`, the starting point of the
+            search
+        dataset_options (Dict): LightGBM Dataset parameters (`max_bin`, ...), not
+            searched
+        tuning_options (Dict): `n_trials`, `n_workers` (-1 for all the cores),
+            `validation_weeks`, `metric`, `min_rounds`, `max_rounds`,
+            `reduction_factor`, `early_stopping_rounds`, `seed` and `search_space`
+
+    Returns:
+        Tuple[Dict, pd.DataFrame]: The searched parameters of the best configuration
+        (none when `lgbm_params` win) and its number of rounds (`num_iterations`),
+        applied on top of `lgb_model_options` by `ml_approach`, and one row per trial
+        with its parameters, rounds, best validation score and status
+    """
+    n_cores = os.cpu_count() or 1
+    n_workers = tuning_options.get('n_workers', -1)
+    if n_workers is None or n_workers < 0:
+        n_workers = n_cores
+    n_workers = max(n_workers, 1)
+    eta = max(tuning_options.get('reduction_factor', 3), 2)
+    metric = tuning_options.get('metric', 'l2')
+    seed = tuning_options.get('seed', 0)
+
+    dataset_params = {'verbose': -1, **(dataset_options or {}),
+                      'feature_pre_filter': False}
+    train_set, valid_set = _validation_split(
+        df, horizon, time_var, target_var, primary_key,
+        tuning_options.get('validation_weeks', horizon), dataset_params)
+
+    base = {key: value for key, value in lgbm_params.items() if key not in RUN_OPTIONS}
+    run = {'metric': metric, 'verbose': -1, 'seed': seed,
+           'num_threads': max(n_cores // n_workers, 1)}
+    configurations = [{}] + sample_params(tuning_options.get('search_space', {}),
+                                          tuning_options.get('n_trials', 20), seed)
+    trials = [_Trial(trial_id, {**base, **params, **run}, train_set, valid_set,
+                     tuning_options.get('early_stopping_rounds', 20))
+              for trial_id, params in enumerate(configurations)]
+
+    rounds, rung = tuning_options.get('min_rounds', 25), 0
+    max_rounds = tuning_options.get('max_rounds', 1000)
+    survivors = trials
+    log.info(f"Tuning {len(trials)} LightGBM configurations on {metric}, "
+             f"{n_workers} at once")
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        while True:
+            list(pool.map(lambda trial: trial.train(rounds), survivors))
+            survivors = sorted(survivors,
+                               key=lambda trial: (trial.best_score, trial.trial_id))
+            log.info(f"Rung {rung} ({rounds} rounds): best {metric} "
+                     f"{survivors[0].best_score:.4f} (trial {survivors[0].trial_id}) "
+                     f"among {len(survivors)} trials")
+            if (rounds >= max_rounds or len(survivors) == 1
+                    or all(trial.early_stopped for trial in survivors)):
+                break
+            kept = max(len(survivors) // eta, 1)
+            for trial in survivors[kept:]:
+                trial.status = f'pruned at rung {rung}'
+            survivors, rung = survivors[:kept], rung + 1
+            rounds = min(rounds * eta, max_rounds)
+
+    best = survivors[0]
+    for trial in survivors:
+        trial.status = 'early stopped' if trial.early_stopped else 'completed'
+    best.status = 'best'
+
+    # Only what was searched, the other options keep following lgb_model_options
+    tuned = {**configurations[best.trial_id], 'num_iterations': best.best_iteration}
+    log.info(f"Best LightGBM configuration (trial {best.trial_id}, {metric} "
+             f"{best.best_score:.4f} against {trials[0].best_score:.4f} for the "
+             f"current options): {configurations[best.trial_id]}, "
+             f"{best.best_iteration} rounds")
+
+    report = pd.DataFrame([{'trial': trial.trial_id, **configurations[trial.trial_id],
+                            'rounds': trial.booster.current_iteration(),
+                            'best_iteration': trial.best_iteration,
+                            f'valid_{metric}': trial.best_score, 'status': trial.status,
+                            'seconds': trial.seconds} for trial in trials])
+    searched = [name for name in report.columns
+                if any(name in params for params in configurations)]
+    first = ['trial'] + searched
+    report = report[first + [name for name in report.columns if name not in first]]
+    return tuned, report
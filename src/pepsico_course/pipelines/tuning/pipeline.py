@@ -0,0 +1,45 @@
+from kedro.pipeline import Pipeline, node
+from kedro.pipeline.modular_pipeline import pipeline
+
+from .nodes.tuning import tune_lgbm
+
+# Same options as the LightGBM model of `data_science`
+PARAMETERS = {
+    f"params:{name}": f"params:data_science.{name}"
+    for name in ["general_options.horizon", "general_options.time_var",
+                 "general_options.target_var", "general_options.primary_key",
+                 "lgb_model_options", "lgb_dataset_options"]
+}
+
+
+def create_pipeline(**kwargs) -> Pipeline:
+    """
+    Searches `lgb_model_options` on the weeks before the forecast window and saves
+    the best configuration as a new version of `lgb_tuned_params`, which
+    `ml_approach` uses from the next run on. Not part of `__default__`, run with
+    ``kedro run --pipeline tuning``
+    """
+
+    tuning_pipeline = pipeline(
+        [
+            node(
+                func=tune_lgbm,
+                inputs=["model_input", "params:general_options.horizon",
+                        "params:general_options.time_var",
+                        "params:general_options.target_var",
+                        "params:general_options.primary_key",
+                        "params:lgb_model_options", "params:lgb_dataset_options",
+                        "params:lgb_tuning_options"],
+                outputs=["lgb_tuned_params", "lgb_tuning_trials"],
+                name="tune_lgbm_node",
+            ),
+        ]
+    )
+
+    return pipeline(
+        pipe=tuning_pipeline,
+        namespace="tuning",
+        inputs=["model_input"],
+        outputs=["lgb_tuned_params", "lgb_tuning_trials"],
+        parameters=PARAMETERS,
+    )
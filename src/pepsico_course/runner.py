@@ -0,0 +1,206 @@
+"""
+Project runners, selected with
+``kedro run --runner pepsico_course.runner.MemoryAwareRunner``
+"""
+import logging
+import os
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import chain
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+import pandas as pd
+from kedro.io import DataCatalog, MemoryDataset
+from kedro.pipeline import Pipeline
+from kedro.pipeline.node import Node
+from kedro.runner.runner import AbstractRunner, run_node
+from pluggy import PluginManager
+
+log = logging.getLogger(__name__)
+
+
+def _available_memory_mb() -> Optional[float]:
+    """Memory available for new allocations (Linux only)"""
+    try:
+        for line in Path("/proc/meminfo").read_text().splitlines():
+            if line.startswith("MemAvailable:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def load_node_estimates(report_dir: str, n_reports: int = 5) -> pd.DataFrame:
+    """
+    Memory (MB) and wall seconds of every node, from the node tables written by
+    `ProfilingHooks` in its last `n_reports` runs. The largest value of each node
+    is kept, so a run on a smaller partition does not lower its estimate
+
+    Returns:
+        pd.DataFrame: `memory_mb` and `wall_seconds` indexed by node name
+    """
+    reports = sorted(Path(report_dir).glob("*_nodes.parquet")) if report_dir else []
+    reports = reports[-n_reports:]
+    columns = ["memory_mb", "wall_seconds"]
+    if not reports:
+        return pd.DataFrame(columns=columns, index=pd.Index([], name="node"),
+                            dtype=float)
+
+    nodes = pd.concat([pd.read_parquet(report) for report in reports],
+                      ignore_index=True)
+    # Reports written before the memory added by each node was recorded only have
+    # the peak RSS
+    memory = nodes.get("memory_added_mb", pd.Series(float("nan"), index=nodes.index))
+    nodes["memory_mb"] = memory.fillna(nodes["peak_rss_mb"])
+    return nodes.groupby("node")[columns].max()
+
+
+class MemoryAwareRunner(AbstractRunner):
+    """
+    Runs the independent nodes of a pipeline concurrently on a pool of threads
+    (e.g. the shipments, promotions and holidays branches of `data_processing`, or
+    the SARIMAX and LightGBM nodes of `data_science`) without exceeding a memory
+    budget
+
+    A node starts only when the estimates of the running nodes plus its own fit in
+    ``memory_budget_mb``; when nothing is running it starts anyway, so a node larger
+    than the budget runs alone. The estimates come from the profiling reports of the
+    previous runs (``profiling.report_dir``, see `ProfilingHooks`), nodes without a
+    report count as ``default_node_mb``. Among the nodes that are ready, the ones
+    heading the longest chain of remaining work (estimated wall time) start first
+
+    Every in-memory intermediate is released as soon as its last consumer finished
+
+    The options left to None are read from the ``runner`` parameters. The nodes
+    share the process, so pandas / numpy / LightGBM code releasing the GIL runs in
+    parallel while pure Python code does not. They also share its peak RSS: a node
+    another one started next to does not record the memory it added, its estimate
+    falls back to the peak RSS of the process while it ran, which also counts the
+    memory of the process before the run and of the nodes next to it
+    """
+
+    def __init__(self, max_workers: int = None, memory_budget_mb: float = None,
+                 default_node_mb: float = None, is_async: bool = False):
+        if is_async:
+            log.warning("MemoryAwareRunner does not load and save asynchronously, "
+                        "setting is_async to False")
+        super().__init__(is_async=False)
+        if max_workers is not None and max_workers <= 0:
+            raise ValueError("max_workers should be positive")
+        self._options = {"max_workers": max_workers,
+                         "memory_budget_mb": memory_budget_mb,
+                         "default_node_mb": default_node_mb}
+
+    def create_default_data_set(self, ds_name: str) -> MemoryDataset:  # type: ignore
+        return MemoryDataset()
+
+    def _resolve_options(self, catalog: DataCatalog) -> Dict[str, Any]:
+        parameters = {}
+        if "parameters" in catalog.list():
+            parameters = catalog.load("parameters")
+        options = {**(parameters.get("runner") or {}),
+                   **{key: value for key, value in self._options.items()
+                      if value is not None}}
+        options["report_dir"] = (parameters.get("profiling") or {}).get("report_dir")
+
+        options["max_workers"] = options.get("max_workers") or os.cpu_count() or 1
+        if not options.get("memory_budget_mb"):
+            available = _available_memory_mb()
+            budget = available * options.get("budget_share", 0.8) if available else None
+            options["memory_budget_mb"] = budget or float("inf")
+        options["default_node_mb"] = options.get("default_node_mb") or 256
+        return options
+
+    @staticmethod
+    def _priorities(pipeline: Pipeline, seconds: Dict[str, float]) -> Dict[Node, float]:
+        """
+        Estimated wall time of each node plus the longest chain of nodes depending
+        on it
+        """
+        children: Dict[Node, Set[Node]] = {node: set() for node in pipeline.nodes}
+        for node, parents in pipeline.node_dependencies.items():
+            for parent in parents:
+                children[parent].add(node)
+
+        priorities: Dict[Node, float] = {}
+        # toposorted, every child comes before its parents
+        for node in reversed(pipeline.nodes):
+            after = max((priorities[child] for child in children[node]), default=0)
+            priorities[node] = seconds[node.name] + after
+        return priorities
+
+    def _run(self, pipeline: Pipeline, catalog: DataCatalog,
+             hook_manager: PluginManager, session_id: str = None) -> None:
+        options = self._resolve_options(catalog)
+        budget, workers = options["memory_budget_mb"], options["max_workers"]
+        estimates = load_node_estimates(options["report_dir"])
+        estimates = estimates.reindex([node.name for node in pipeline.nodes])
+        log.info(f"Running up to {workers} nodes at once within {budget:,.0f}MB, "
+                 f"{estimates['memory_mb'].notna().sum()}/{len(estimates)} nodes "
+                 f"with a memory estimate")
+        memory = estimates["memory_mb"].fillna(options["default_node_mb"]).to_dict()
+        seconds = estimates["wall_seconds"].fillna(1.0).to_dict()
+        priorities = self._priorities(pipeline, seconds)
+
+        nodes = pipeline.nodes
+        load_counts = Counter(chain.from_iterable(node.inputs for node in nodes))
+        node_dependencies = pipeline.node_dependencies
+        todo_nodes = set(node_dependencies)
+        done_nodes: Set[Node] = set()
+        running: Dict[Any, Node] = {}
+        reserved = 0.0
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while todo_nodes or running:
+                ready = sorted((node for node in todo_nodes
+                                if node_dependencies[node] <= done_nodes),
+                               key=lambda node: (-priorities[node], node.name))
+                for node in ready:
+                    if len(running) >= workers:
+                        break
+                    if running and reserved + memory[node.name] > budget:
+                        continue
+                    if memory[node.name] > budget:
+                        log.warning(f"{node.name} needs about "
+                                    f"{memory[node.name]:,.0f}MB, over the budget, "
+                                    f"running it alone")
+                    todo_nodes.remove(node)
+                    reserved += memory[node.name]
+                    future = pool.submit(run_node, node, catalog, hook_manager,
+                                         self._is_async, session_id)
+                    running[future] = node
+
+                if not running:
+                    debug_data = {"todo_nodes": todo_nodes, "done_nodes": done_nodes,
+                                  "ready_nodes": ready}
+                    debug_data_str = "\n".join(f"{key} = {value}"
+                                               for key, value in debug_data.items())
+                    raise RuntimeError(f"Unable to schedule new tasks although some "
+                                       f"nodes have not been run:\n{debug_data_str}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    reserved -= memory[node.name]
+                    try:
+                        future.result()
+                    except Exception:
+                        self._suggest_resume_scenario(pipeline, done_nodes, catalog)
+                        raise
+                    done_nodes.add(node)
+                    self._logger.info("Completed node: %s", node.name)
+                    self._logger.info("Completed %d out of %d tasks", len(done_nodes),
+                                      len(nodes))
+                    self._release(pipeline, catalog, node, load_counts)
+
+    @staticmethod
+    def _release(pipeline: Pipeline, catalog: DataCatalog, node: Node,
+                 load_counts: Counter) -> None:
+        """Releases the data sets of `node` as soon as their last consumer finished"""
+        for dataset in node.inputs:
+            load_counts[dataset] -= 1
+            if load_counts[dataset] < 1 and dataset not in pipeline.inputs():
+                catalog.release(dataset)
+        for dataset in node.outputs:
+            if load_counts[dataset] < 1 and dataset not in pipeline.outputs():
+                catalog.release(dataset)
@@ -6,6 +6,9 @@ https://kedro.readthedocs.io/en/stable/kedro_project_setup/settings.html."""
 # For example, after creating a hooks.py and defining a ProjectHooks class there, do
 # from pepsico_course.hooks import ProjectHooks
 # HOOKS = (ProjectHooks(),)
+from pepsico_course.hooks import PartitionFilterHooks, ProfilingHooks  # noqa: import-outside-toplevel
+
+HOOKS = (PartitionFilterHooks(), ProfilingHooks())
 
 # Installed plugins for which to disable hook auto-registration.
 # DISABLE_HOOKS_FOR_PLUGINS = ("kedro-viz",)
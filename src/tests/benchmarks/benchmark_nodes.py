@@ -0,0 +1,236 @@
+"""
+Time and memory of the pipeline nodes on synthetic data at growing scales, so the
+regressions and the scaling cliffs show up before they reach production::
+
+    PYTHONPATH=src python -m tests.benchmarks.benchmark_nodes --scales 1 10 100 \\
+        --output data/08_reporting/benchmarks.csv
+
+A scale of 1 is the size of `data/01_raw` (36 DFUs, 156 weeks), the DFUs are
+multiplied by the scale. The parameters are the ones of `conf/base`, except the
+winsorize cache, disabled so every run decomposes all the DFUs
+"""
+import argparse
+import copy
+import gc
+import logging
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+from kedro.config import OmegaConfigLoader
+
+from pepsico_course.hooks import _cpu_seconds, _n_rows, _peak_rss_mb, _reset_peak_rss
+from pepsico_course.pipelines.data_processing.nodes.clean.holidays import clean_holidays
+from pepsico_course.pipelines.data_processing.nodes.clean.promotions import (
+    clean_promotions,
+)
+from pepsico_course.pipelines.data_processing.nodes.clean.shipments import (
+    clean_shipments,
+)
+from pepsico_course.pipelines.data_processing.nodes.feature.calendar import (
+    build_calendar,
+)
+from pepsico_course.pipelines.data_processing.nodes.feature.holidays import (
+    feature_holidays,
+)
+from pepsico_course.pipelines.data_processing.nodes.feature.promotions import (
+    feature_promotions,
+)
+from pepsico_course.pipelines.data_processing.nodes.feature.shipments import (
+    feature_shipments,
+)
+from pepsico_course.pipelines.data_science.nodes.modeling.modeling import (
+    build_lgb_dataset,
+    ml_approach,
+    time_series_approach,
+)
+from pepsico_course.pipelines.model_inputs.nodes.model_input import create_model_input
+
+from .synthetic import N_DFUS, N_WEEKS, generate_data
+
+log = logging.getLogger(__name__)
+
+# Nodes timed by default, the other steps run only to build their inputs
+NODES = ['clean_shipments', 'feature_shipments', 'feature_promotions',
+         'create_model_input', 'time_series_approach', 'ml_approach']
+
+
+def _steps(parameters: Dict) -> List[tuple]:
+    """
+    `(name, function, inputs, outputs)` of the pipeline nodes, in an order where no
+    input is modified before it is read
+    """
+    processing = parameters['data_processing']['processing_params']
+    science = parameters['data_science']
+    general = science['general_options']
+    arima = science['arima_model_options']
+    model_input = [general['horizon'], general['time_var']]
+    columns = [general['target_var'], general['primary_key']]
+
+    return [
+        ('clean_shipments', lambda df: clean_shipments(df, processing),
+         ['shipments'], ['shipments_processed']),
+        ('clean_promotions', lambda df: clean_promotions(df, processing),
+         ['promotions'], ['promotions_processed']),
+        ('clean_holidays', lambda df: clean_holidays(df, processing),
+         ['holidays'], ['holidays_processed']),
+        ('build_calendar', build_calendar,
+         ['shipments_processed', 'promotions_processed', 'holidays_processed'],
+         ['calendar']),
+        ('feature_shipments', feature_shipments,
+         ['shipments_processed', 'calendar'], ['shipments_featured']),
+        ('feature_promotions', lambda df: feature_promotions(df, processing),
+         ['promotions_processed'], ['promotions_featured']),
+        ('feature_holidays', feature_holidays,
+         ['holidays_processed', 'calendar'], ['holidays_featured']),
+        ('create_model_input', create_model_input,
+         ['shipments_featured', 'promotions_featured', 'holidays_featured'],
+         ['model_input', 'facts_data']),
+        # Every DFU gets a SARIMAX (no baseline routing), the worst case of `arima_node`
+        ('time_series_approach',
+         lambda df: time_series_approach(df, general['horizon'], arima['order'],
+                                         general['time_var'], general['primary_key'],
+                                         general['y_hat'], general['target_var'],
+                                         arima['seasonal_order'], arima['trend'],
+                                         science['arima_backend_options']),
+         ['model_input'], ['arima_results', 'arima_params']),
+        ('build_lgb_dataset',
+         lambda df: build_lgb_dataset(df, *model_input, *columns,
+                                      science['lgb_dataset_options']),
+         ['model_input'], ['lgb_train_dataset']),
+        ('ml_approach',
+         lambda df, train_dataset: ml_approach(df, *model_input, *columns,
+                                               general['y_hat'],
+                                               science['lgb_model_options'],
+                                               science['lgb_predict_options'],
+                                               train_dataset),
+         ['model_input', 'lgb_train_dataset'],
+         ['ml_forecasts', 'ml_results', 'lgb_model']),
+    ]
+
+
+def _measure(func: Callable, *args) -> tuple:
+    """
+    Output of `func` with its wall and CPU seconds and the memory it added at its
+    peak (MB, Linux only)
+    """
+    gc.collect()
+    # Right after the reset the peak is the current RSS
+    _reset_peak_rss()
+    rss = _peak_rss_mb()
+
+    start, cpu = time.perf_counter(), _cpu_seconds()
+    outputs = func(*args)
+    wall, cpu = time.perf_counter() - start, _cpu_seconds() - cpu
+
+    peak = _peak_rss_mb()
+    added = peak - rss if peak is not None and rss is not None else None
+    return outputs, wall, cpu, added
+
+
+def benchmark_scale(data: Dict[str, pd.DataFrame], parameters: Dict,
+                    nodes: Sequence[str] = NODES) -> pd.DataFrame:
+    """
+    Runs the steps needed by `nodes` on the raw `data`, one after the other, and
+    measures each of them
+
+    Returns:
+        pd.DataFrame: One row per step with its seconds, CPU seconds, peak memory
+        added (MB), rows of the first input and of the first output
+    """
+    steps = _steps(parameters)
+    names = [name for name, *_ in steps]
+    unknown = set(nodes) - set(names)
+    if unknown:
+        raise ValueError(f'Unknown nodes {sorted(unknown)}, expected some of {names}')
+
+    # Only the steps the requested nodes depend on
+    needed, required = set(), set()
+    for name, _, inputs, outputs in reversed(steps):
+        if name in nodes or required & set(outputs):
+            needed.add(name)
+            required |= set(inputs)
+
+    data, records = dict(data), []
+    for name, func, inputs, outputs in steps:
+        if name not in needed:
+            continue
+        results, wall, cpu, peak_mb = _measure(func,
+                                               *[data[input_] for input_ in inputs])
+        results = results if len(outputs) > 1 else [results]
+        data.update(zip(outputs, results))
+        records.append({'node': name, 'timed': name in nodes, 'seconds': wall,
+                        'cpu_seconds': cpu, 'peak_memory_mb': peak_mb,
+                        'input_rows': _n_rows(data[inputs[0]]),
+                        'output_rows': _n_rows(results[0])})
+        log.info(f'{name}: {wall:.2f}s, {peak_mb or 0:.0f}MB')
+    return pd.DataFrame(records)
+
+
+def run_benchmarks(scales: Sequence[float] = (1, 10, 100),
+                   parameters: Dict = None,
+                   nodes: Sequence[str] = NODES,
+                   n_weeks: int = N_WEEKS,
+                   promo_density: float = 0.1,
+                   seed: int = 0) -> pd.DataFrame:
+    """
+    Benchmarks `nodes` on synthetic data of `N_DFUS * scale` DFUs for every scale
+
+    The `exponent` of a node is the slope of its time against the scale (log-log)
+    since the previous scale: about 1 when it grows linearly with the DFUs, well
+    above 1 for a scaling cliff
+
+    Returns:
+        pd.DataFrame: One row per scale and timed node
+    """
+    parameters = parameters or OmegaConfigLoader(str(Path.cwd() / 'conf'))['parameters']
+    parameters = copy.deepcopy(parameters)
+    parameters['data_processing']['processing_params']['shipments']['cache_dir'] = None
+
+    results = []
+    for scale in sorted(scales):
+        n_dfus = max(int(round(N_DFUS * scale)), 1)
+        log.info(f'Scale {scale}x: {n_dfus} DFUs, {n_weeks} weeks')
+        data = generate_data(n_dfus, n_weeks, promo_density, seed=seed)
+        result = benchmark_scale(data, parameters, nodes)
+        results.append(result[result.pop('timed')].assign(scale=scale, n_dfus=n_dfus))
+        del data
+        gc.collect()
+
+    results = pd.concat(results, ignore_index=True)
+    results['seconds_per_dfu'] = results['seconds'] / results['n_dfus']
+    previous = results.groupby('node', sort=False)[['seconds', 'scale']].shift()
+    results['exponent'] = (np.log(results['seconds'] / previous['seconds'])
+                           / np.log(results['scale'] / previous['scale']))
+    return results
+
+
+def main(argv: Sequence[str] = None) -> pd.DataFrame:
+    parser = argparse.ArgumentParser(
+        description='Benchmarks the pipeline nodes on synthetic data')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10, 100],
+                        help=f'multiples of the {N_DFUS} DFUs of data/01_raw')
+    parser.add_argument('--nodes', nargs='+', default=NODES, help='nodes to time')
+    parser.add_argument('--weeks', type=int, default=N_WEEKS)
+    parser.add_argument('--promo-density', type=float, default=0.1,
+                        help='share of the DFU-weeks with a promotion')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='CSV the results are written to')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.scales, nodes=args.nodes, n_weeks=args.weeks,
+                             promo_density=args.promo_density, seed=args.seed)
+    with pd.option_context('display.width', 200, 'display.max_columns', None,
+                           'display.precision', 3):
+        print(results.set_index(['node', 'scale']).reindex(args.nodes, level=0))
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        results.to_csv(args.output, index=False)
+    return results
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+    main()
@@ -0,0 +1,124 @@
+"""
+Synthetic shipments, promotions and holidays shaped like the raw CSVs of
+`data/01_raw` once loaded by the catalog (same columns, dtypes and messy values),
+so the pipeline can be run at any number of DFUs and weeks
+"""
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+# Size of `data/01_raw`: the 1x scale of the benchmarks
+N_DFUS = 36
+N_WEEKS = 156
+
+CUSTOMERS = ['ALDI', 'LIDL', 'EROSKI', 'BM', 'MERCADONA']
+LOCATIONS = ['bilbao', 'sansebastian', 'Vitoria']
+CATEGORIES = ['snack', 'juice', 'beverage']
+# Raw spellings of the promotions, mapped by
+# `processing_params.promotions.value_mappings`
+PROMO_TYPES = ['10% desc', '10% descuento', 'menos 50%', '20%', 'tres por dos', '3x2',
+               'goodie']
+NO_PROMO = ['-', None]
+HOLIDAYS = {"New Year's Day": (1, 1), 'Epiphany': (1, 6), 'Labour Day': (5, 1),
+            'San Juan': (6, 24), 'Santiago Apóstol': (7, 25),
+            'Assumption Day': (8, 15), 'Día de la Hispanidad': (10, 12),
+            "All Saints' Day": (11, 1), 'Constitution Day': (12, 6),
+            'Christmas Day': (12, 25)}
+
+
+def _dfus(n_dfus: int, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Distinct (`prod_code`, `customer`, `location`) with the upper / lower case
+    variants of the raw names
+    """
+    dfu = np.arange(n_dfus)
+    product = dfu // (len(CUSTOMERS) * len(LOCATIONS))
+    customer = np.array(CUSTOMERS)[dfu % len(CUSTOMERS)]
+    lower = rng.random(n_dfus) < 0.3
+    return pd.DataFrame({
+        'prod_code': [f'{1000 + p // 10}_{p % 10:02d}' for p in product],
+        'customer': np.where(lower, np.char.lower(customer.astype(str)), customer),
+        'location': np.array(LOCATIONS)[dfu // len(CUSTOMERS) % len(LOCATIONS)],
+        'category': np.array(CATEGORIES)[product % len(CATEGORIES)],
+    })
+
+
+def generate_data(n_dfus: int = N_DFUS,
+                  n_weeks: int = N_WEEKS,
+                  promo_density: float = 0.1,
+                  missing_rate: float = 0.01,
+                  intermittent_share: float = 0.1,
+                  start: str = '2020-10-19',
+                  seed: int = 0) -> Dict[str, pd.DataFrame]:
+    """
+    Raw `shipments`, `promotions` and `holidays` of `n_dfus` DFUs over `n_weeks` weeks
+
+    The demand of each DFU is a level with a yearly seasonality, a trend, noise and
+    an uplift on the promoted weeks. A share of the DFUs is intermittent (mostly
+    zeros), some start later than the others and `missing_rate` of the weeks are
+    missing, so the gap filling, the zeros filter and the baselines have work to do
+
+    Args:
+        n_dfus (int): Number of DFUs
+        n_weeks (int): Weeks of history of the longest DFUs
+        promo_density (float): Share of the DFU-weeks with a promotion
+        missing_rate (float): Share of the DFU-weeks missing from the shipments
+        intermittent_share (float): Share of the DFUs with intermittent demand
+        start (str): First week
+        seed (int): Seed of the random generator
+
+    Returns:
+        Dict[str, pd.DataFrame]: `shipments`, `promotions` and `holidays`
+    """
+    rng = np.random.default_rng(seed)
+    dfus = _dfus(n_dfus, rng)
+    weeks = pd.date_range(start, periods=n_weeks, freq='W-MON', tz='UTC')
+
+    # A fifth of the DFUs start up to half the history later
+    first_week = np.where(rng.random(n_dfus) < 0.2,
+                          rng.integers(0, n_weeks // 2 + 1, n_dfus), 0)
+    n_rows = n_weeks - first_week
+    dfu = np.repeat(np.arange(n_dfus), n_rows)
+    starts = np.repeat(np.cumsum(n_rows) - n_rows, n_rows)
+    week = np.arange(n_rows.sum()) - starts + first_week[dfu]
+
+    level = rng.lognormal(12.5, 0.8, n_dfus)
+    amplitude, phase = rng.uniform(0, 0.4, n_dfus), rng.uniform(0, 2 * np.pi, n_dfus)
+    trend = rng.normal(0, 0.002, n_dfus)
+    promoted = rng.random(len(dfu)) < promo_density
+    promo_type = rng.integers(0, len(PROMO_TYPES), len(dfu))
+
+    demand = (level[dfu]
+              * (1 + amplitude[dfu] * np.sin(2 * np.pi * week / 52 + phase[dfu]))
+              * (1 + trend[dfu] * week)
+              * np.where(promoted, 1.2 + 0.1 * promo_type, 1)
+              * rng.lognormal(0, 0.15, len(dfu)))
+    intermittent = rng.random(n_dfus) < intermittent_share
+    demand = np.where(intermittent[dfu] & (rng.random(len(dfu)) < 0.6), 0, demand)
+
+    rows = dfus.iloc[dfu].reset_index(drop=True).assign(time_var=weeks[week])
+    kept = rng.random(len(rows)) >= missing_rate
+    shipments = rows[kept].assign(shipments=np.maximum(demand[kept], 0).round())
+
+    no_promo = np.array(NO_PROMO, dtype=object)[rng.integers(0, len(NO_PROMO),
+                                                             len(rows))]
+    promotions = rows.assign(promo_type=np.where(promoted,
+                                                 np.array(PROMO_TYPES)[promo_type],
+                                                 no_promo))
+
+    # Every holiday of the years of the calendar and the next one, with duplicated
+    # rows as in the raw file
+    years = np.arange(weeks[0].year, weeks[-1].year + 2)
+    holidays = pd.DataFrame([(pd.Timestamp(year, month, day, tz='UTC'), name)
+                             for year in years
+                             for name, (month, day) in HOLIDAYS.items()],
+                            columns=['DT', 'HOL_NM'])
+    holidays = pd.concat([holidays] * 2, ignore_index=True)
+
+    categories = {column: 'category' for column in ['customer', 'location', 'category']}
+    return {
+        'shipments': shipments.astype(categories).reset_index(drop=True),
+        'promotions': promotions.astype(categories).reset_index(drop=True),
+        'holidays': holidays,
+    }
@@ -0,0 +1,65 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from kedro.config import OmegaConfigLoader
+
+from .benchmark_nodes import benchmark_scale, run_benchmarks
+from .synthetic import generate_data
+
+DFU = ['prod_code', 'customer', 'location']
+
+
+@pytest.fixture
+def parameters():
+    return OmegaConfigLoader(str(Path.cwd() / 'conf'))['parameters']
+
+
+def test_generate_data_looks_like_the_raw_files():
+    raw = pd.read_csv('data/01_raw/shipments.csv', nrows=5,
+                      dtype={'prod_code': str, 'customer': 'category',
+                             'location': 'category', 'category': 'category',
+                             'shipments': 'float64'},
+                      parse_dates=['time_var'])
+    data = generate_data(n_dfus=50, n_weeks=60, promo_density=0.3, seed=1)
+    shipments, promotions = data['shipments'], data['promotions']
+
+    assert shipments.dtypes.astype(str).tolist() == raw.dtypes.astype(str).tolist()
+    assert len(shipments[DFU].apply(lambda x: x.str.upper()).drop_duplicates()) == 50
+    assert shipments.groupby(DFU, observed=True).size().max() <= 60
+    assert (shipments['shipments'] >= 0).all()
+    no_promo = promotions['promo_type'].isin(['-', None]).mean()
+    assert no_promo == pytest.approx(0.7, abs=0.05)
+    assert list(data['holidays'].columns) == ['DT', 'HOL_NM']
+    assert generate_data(n_dfus=50, n_weeks=60, seed=1)['shipments'].equals(
+        generate_data(n_dfus=50, n_weeks=60, seed=1)['shipments'])
+
+
+def test_benchmark_scale_runs_only_the_needed_steps(parameters):
+    parameters['data_processing']['processing_params']['shipments']['cache_dir'] = None
+    data = generate_data(n_dfus=10, n_weeks=110)
+
+    timed = ['feature_promotions', 'ml_approach']
+    result = benchmark_scale(data, parameters, nodes=timed)
+
+    assert result['node'].tolist() == ['clean_shipments', 'clean_promotions',
+                                       'clean_holidays', 'build_calendar',
+                                       'feature_shipments', 'feature_promotions',
+                                       'feature_holidays', 'create_model_input',
+                                       'build_lgb_dataset', 'ml_approach']
+    assert result.loc[result['timed'], 'node'].tolist() == timed
+    assert (result['seconds'] > 0).all()
+    with pytest.raises(ValueError, match='Unknown nodes'):
+        benchmark_scale(data, parameters, nodes=['arima_node'])
+
+
+def test_run_benchmarks_reports_the_scaling(parameters):
+    results = run_benchmarks([0.25, 0.5], parameters, nodes=['feature_shipments'],
+                             n_weeks=110)
+
+    assert results[['node', 'scale', 'n_dfus']].values.tolist() == [
+        ['feature_shipments', 0.25, 9], ['feature_shipments', 0.5, 18]]
+    assert results['exponent'].isna().tolist() == [True, False]
+    # The parameters of the caller keep their winsorize cache
+    processing = parameters['data_processing']['processing_params']
+    assert processing['shipments']['cache_dir'] is not None
@@ -0,0 +1,41 @@
+import io
+
+import pandas as pd
+
+from pepsico_course.extras.datasets import ChunkedParquetDataset
+from pepsico_course.pipelines.data_processing.nodes.ingest import ingest_csv
+
+CSV = """prod_code,customer,location,category,time_var,promo_type
+1424_01,lidl,bilbao,snack,2023-01-02T00:00:00.000+0000,null
+1424_01,lidl,bilbao,snack,2023-01-09T00:00:00.000+0000,null
+6860_07,ALDI,vitoria,juice,2023-01-02T00:00:00.000+0000,3x2
+2093_01,Mercadona,Bilbao,snack,2023-01-09T00:00:00.000+0000,-
+2093_01,Mercadona,Bilbao,snack,2023-01-16T00:00:00.000+0000,tres por dos
+"""
+LOAD_ARGS = {'dtype': {'prod_code': str, 'customer': 'category', 'location': 'category',
+                       'category': 'category', 'promo_type': str},
+             'parse_dates': ['time_var']}
+
+
+def test_streamed_chunks_are_read_back_as_the_whole_csv(tmp_path):
+    dataset = ChunkedParquetDataset(str(tmp_path / 'promotions'))
+    for chunk in ingest_csv(pd.read_csv(io.StringIO(CSV), chunksize=2, **LOAD_ARGS)):
+        dataset.save(chunk)
+
+    expected = pd.read_csv(io.StringIO(CSV), **LOAD_ARGS)
+    for column in ['customer', 'location', 'category']:
+        categories = expected[column].cat.categories.sort_values()
+        expected[column] = expected[column].cat.reorder_categories(categories)
+    # Missing strings come back from Parquet as None
+    promo_type = expected['promo_type']
+    expected['promo_type'] = promo_type.where(promo_type.notna(), None)
+
+    assert len(list((tmp_path / 'promotions').glob('part-*.parquet'))) == 3
+    pd.testing.assert_frame_equal(dataset.load(), expected)
+    assert str(dataset.load()['time_var'].dtype) == 'datetime64[ns, UTC]'
+
+    # A new run replaces the previous chunks
+    rerun = ChunkedParquetDataset(str(tmp_path / 'promotions'))
+    rerun.save(expected.iloc[:1])
+    pd.testing.assert_frame_equal(rerun.load(), expected.iloc[:1],
+                                  check_categorical=False)
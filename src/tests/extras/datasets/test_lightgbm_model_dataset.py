@@ -0,0 +1,36 @@
+import lightgbm as lgb
+import numpy as np
+from kedro.io.core import Version
+
+from pepsico_course.extras.datasets import LightGBMModelDataset
+
+FIRST, LATEST = '2026-01-01T00.00.00.000Z', '2026-01-02T00.00.00.000Z'
+
+
+def _booster(num_boost_round):
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(200, 2))
+    train_set = lgb.Dataset(x, x[:, 0] * 2, feature_name=['a', 'b'])
+    return lgb.train({'verbose': -1, 'min_data_in_leaf': 5}, train_set,
+                     num_boost_round=num_boost_round)
+
+
+def test_versions_are_saved_and_the_latest_is_loaded(tmp_path):
+    filepath = str(tmp_path / 'lgb_model.txt')
+    x = np.random.default_rng(1).normal(size=(10, 2))
+
+    assert not LightGBMModelDataset(filepath, version=Version(None, None)).exists()
+    for version, rounds in [(FIRST, 2), (LATEST, 10)]:
+        LightGBMModelDataset(filepath, version=Version(None, version)).save(
+            {'booster': _booster(rounds), 'feature_name': ['a', 'b'],
+             'fcst_start_date': version})
+
+    latest = LightGBMModelDataset(filepath, version=Version(None, None))
+    assert latest.exists()
+    model = latest.load()
+    assert model['fcst_start_date'] == LATEST
+    assert model['booster'].feature_name() == ['a', 'b']
+    np.testing.assert_allclose(model['booster'].predict(x), _booster(10).predict(x))
+
+    first = LightGBMModelDataset(filepath, version=Version(FIRST, None)).load()
+    assert first['booster'].num_trees() == 2
@@ -0,0 +1,89 @@
+import pandas as pd
+import pytest
+
+from pepsico_course.extras.datasets import PartitionedParquetDataset
+
+SORT_BY = {'sort_by': ['model_id', 'time_var']}
+JUICE = ['6860_07#LIDL#BILBAO', '9876_02#LIDL#BILBAO']
+
+
+@pytest.fixture
+def data():
+    model_ids = [f'{prod}#LIDL#BILBAO'
+                 for prod in ['1424_01', '2093_01', '6860_07', '9876_02']]
+    weeks = pd.date_range('2023-01-02', periods=3, freq='W-MON', tz='UTC')
+    return pd.DataFrame({
+        'model_id': pd.Categorical([model_id for model_id in model_ids
+                                    for _ in range(3)]),
+        'time_var': list(weeks) * 4,
+        'category': ['snack'] * 6 + ['juice'] * 6,
+        'shipments': [float(value) for value in range(12)],
+    })
+
+
+def _dataset(tmp_path, **kwargs):
+    return PartitionedParquetDataset(str(tmp_path / 'shipments'),
+                                     partition_cols=['category'], bucket_by='model_id',
+                                     n_buckets=4, load_args={**SORT_BY, **kwargs})
+
+
+def _unpartitioned(tmp_path, **kwargs):
+    return PartitionedParquetDataset(str(tmp_path / 'model_input'),
+                                     bucket_by='model_id', n_buckets=4,
+                                     load_args=SORT_BY, **kwargs)
+
+
+def test_round_trip(tmp_path, data):
+    dataset = _dataset(tmp_path)
+    dataset.save(data)
+
+    pd.testing.assert_frame_equal(dataset.load(), data)
+    projected = _dataset(tmp_path, columns=['model_id', 'shipments'], sort_by=None)
+    assert projected.load().columns.tolist() == ['model_id', 'shipments']
+
+
+def test_filters_restrict_loads_and_saves(tmp_path, data):
+    dataset = _dataset(tmp_path)
+    dataset.save(data)
+
+    dataset.set_filters({'model_id': ['2093_01#LIDL#BILBAO'], 'category': None})
+    subset = dataset.load()
+    assert subset['model_id'].unique().tolist() == ['2093_01#LIDL#BILBAO']
+
+    dataset.save(subset.assign(shipments=-1.))
+    dataset.set_filters({})
+    is_other = data['model_id'] != '2093_01#LIDL#BILBAO'
+    expected = data.assign(shipments=data['shipments'].where(is_other, -1.))
+    pd.testing.assert_frame_equal(dataset.load(), expected)
+
+
+def test_filters_on_missing_columns_replace_the_subset_dfus(tmp_path, data):
+    dataset = _unpartitioned(tmp_path)
+    data = data.drop(columns='category')
+    dataset.save(data)
+
+    # A category run: the data set has no category column, its output has the DFUs
+    # of the category
+    dataset.set_filters({'category': ['juice']})
+    dataset.save(data[data['model_id'].isin(JUICE)].iloc[1:])
+    dataset.set_filters({})
+
+    pd.testing.assert_frame_equal(dataset.load(),
+                                  data.drop(index=6).reset_index(drop=True))
+
+
+def test_filters_on_missing_columns_go_through_the_keys_data_set(tmp_path, data):
+    facts = _dataset(tmp_path)
+    facts.save(data[['model_id', 'category']].drop_duplicates(ignore_index=True))
+    dataset = _unpartitioned(tmp_path, keys_from='shipments')
+    data = data.drop(columns='category')
+    dataset.save(data)
+
+    filters = {'category': ['juice'], 'model_id': None}
+    facts.set_filters(filters)
+    dataset.set_filters(filters, facts)
+    assert dataset.load()['model_id'].unique().tolist() == JUICE
+
+    # Without the keys data set the category filter cannot be applied
+    dataset.set_filters(filters)
+    assert len(dataset.load()) == len(data)
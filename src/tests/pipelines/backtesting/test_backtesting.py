@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pepsico_course.pipelines.backtesting.nodes.backtesting import backtest, make_folds
+
+
+@pytest.fixture
+def model_input():
+    """Weekly demand of a few `model_id`s, the last one starting later than the rest"""
+    rng = np.random.default_rng(5)
+    dates = pd.date_range('2021-01-04', periods=60, freq='W-MON', tz='UTC')
+    frames = [pd.DataFrame({
+        'time_var': dates,
+        'shipments': (500 + 50 * np.sin(np.arange(len(dates)) / 8)
+                      + rng.normal(0, 10, len(dates))),
+        'model_id': f'{1000 + dfu}_01#ALDI#BILBAO',
+        'model_id_encoded': dfu,
+        'week': dates.isocalendar().week.to_numpy(),
+    }) for dfu in range(3)]
+    frames[-1] = frames[-1].iloc[25:]
+    return pd.concat(frames, ignore_index=True)
+
+
+def _backtest(model_input, **options):
+    options = {'n_origins': 3, 'step': 4, 'min_train_size': 10, 'chunk_size': 2,
+               **options}
+    return backtest(model_input, horizon=8, time_var='time_var', target_var='shipments',
+                    primary_key='model_id', y_hat='y_hat', order=[1, 0, 0],
+                    seasonal_order=[0, 0, 0, 0], trend='c',
+                    lgbm_params={'verbose': -1, 'min_data_in_leaf': 5, 'num_leaves': 4},
+                    lgb_dataset_options={'min_data_in_bin': 1},
+                    backtest_options=options)
+
+
+def test_make_folds(model_input):
+    folds = make_folds(model_input, horizon=8, time_var='time_var', n_origins=3, step=4)
+    weeks = model_input['time_var'].drop_duplicates().sort_values().tolist()
+
+    assert [origin for origin, _ in folds] == [weeks[44], weeks[48], weeks[52]]
+    assert folds[0][1] == weeks[52]
+    assert folds[-1][1] > weeks[-1]
+
+
+def test_backtest(model_input):
+    forecasts, timings = _backtest(model_input)
+
+    # 3 DFUs x 3 origins x 8 weeks per model, the short DFU has enough history for
+    # every origin
+    sizes = forecasts.groupby('model', observed=True).size().to_dict()
+    assert sizes == {'arima': 72, 'lgbm': 72}
+    assert forecasts['y_hat'].notna().all()
+    assert forecasts['step'].between(1, 8).all()
+    assert timings[['model', 'origin']].value_counts().eq(1).all() and len(timings) == 6
+    assert timings.loc[timings['model'] == 'arima', 'n_series'].eq(3).all()
+
+
+def test_backtest_does_not_depend_on_workers(model_input):
+    serial, _ = _backtest(model_input, n_workers=1, lgb_warm_start=False)
+    parallel, _ = _backtest(model_input, n_workers=2, lgb_warm_start=False)
+
+    pd.testing.assert_frame_equal(serial, parallel)
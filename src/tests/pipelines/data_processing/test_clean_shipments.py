@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pepsico_course.pipelines.data_processing.nodes.clean import shipments
+from pepsico_course.pipelines.data_processing.nodes.clean.shipments import (
+    _continuous_panel,
+    _make_continuous,
+    _outlier_removal,
+    _remove_continuous_zeros,
+    _winsorize_all,
+)
+
+
+@pytest.fixture
+def gapped_shipments():
+    """Weekly demand of a few DFUs with random gaps (including equidistant ones)"""
+    rng = np.random.default_rng(42)
+    dates = pd.date_range('2021-01-04', periods=60, freq='W-MON', tz='UTC')
+    frames = []
+    for dfu in range(12):
+        kept = np.sort(rng.choice(len(dates), size=25, replace=False))
+        frames.append(pd.DataFrame({
+            'prod_code': f'{1000 + dfu % 4}_01',
+            'customer': ['ALDI', 'LIDL', 'EROSKI'][dfu % 3],
+            'location': f'loc_{dfu}',
+            'category': 'snack',
+            'time_var': dates[kept].strftime('%Y-%m-%dT%H:%M:%S.000+0000'),
+            'shipments': rng.integers(0, 500, size=len(kept)),
+        }))
+    return pd.concat(frames).sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('fill_method', [None, 'nearest', 'ffill', 'bfill'])
+def test_vectorized_engine_matches_legacy(gapped_shipments, fill_method):
+    legacy = _make_continuous(gapped_shipments.copy(), fill_method, engine='legacy')
+    vectorized = _make_continuous(gapped_shipments.copy(), fill_method,
+                                  engine='vectorized')
+
+    pd.testing.assert_frame_equal(legacy, vectorized)
+
+
+def test_unknown_engine_raises(gapped_shipments):
+    with pytest.raises(ValueError):
+        _make_continuous(gapped_shipments, 'nearest', engine='spark')
+
+
+@pytest.fixture
+def continuous_shipments():
+    """Two years of noisy weekly demand with a few spikes for a handful of DFUs"""
+    rng = np.random.default_rng(7)
+    dates = pd.date_range('2021-01-04', periods=110, freq='W-MON', tz='UTC')
+    frames = []
+    for dfu in range(6):
+        demand = (100 + 20 * np.sin(np.arange(len(dates)) / 52 * 2 * np.pi)
+                  + rng.normal(0, 5, len(dates)))
+        demand[rng.choice(len(dates), size=3, replace=False)] *= 4
+        frames.append(pd.DataFrame({
+            'prod_code': f'{1000 + dfu}_01',
+            'customer': 'ALDI',
+            'location': 'BILBAO',
+            'category': 'snack',
+            'time_var': dates,
+            'shipments': demand.round(),
+        }))
+    return pd.concat(frames).sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+def test_parallel_outlier_removal_matches_serial(continuous_shipments):
+    serial = _outlier_removal(continuous_shipments.copy(), 0.05, n_workers=1)
+    parallel = _outlier_removal(continuous_shipments.copy(), 0.05, n_workers=2,
+                                min_dfus_per_worker=1)
+
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_cached_outlier_removal_only_recomputes_changed_dfus(continuous_shipments,
+                                                             tmp_path, monkeypatch):
+    first = _outlier_removal(continuous_shipments.copy(), 0.05, cache_dir=str(tmp_path))
+    pd.testing.assert_frame_equal(_outlier_removal(continuous_shipments.copy(), 0.05),
+                                  first)
+
+    # A restatement of the demand of one DFU
+    restated = continuous_shipments.copy()
+    is_restated = (restated['prod_code'] == '1002_01').to_numpy()
+    restated.loc[is_restated, 'shipments'] *= 3
+    recomputed = []
+
+    def _recording(series, *args):
+        recomputed.extend(series)
+        return _winsorize_all(series, *args)
+
+    monkeypatch.setattr(shipments, '_winsorize_all', _recording)
+    second = _outlier_removal(restated.copy(), 0.05, cache_dir=str(tmp_path))
+
+    assert ([sorted(x.index) for x in recomputed]
+            == [sorted(restated.index[is_restated])])
+    pd.testing.assert_frame_equal(_outlier_removal(restated.copy(), 0.05), second)
+    pd.testing.assert_frame_equal(second[~is_restated], first[~is_restated])
+    assert not np.allclose(second.loc[is_restated, 'shipments'],
+                           first.loc[is_restated, 'shipments'])
+    n_dfus = continuous_shipments['prod_code'].nunique()
+    assert len(list(tmp_path.glob('*.npy'))) == n_dfus + 1
+
+
+@pytest.mark.parametrize('fill_method', [None, 'nearest', 'ffill', 'bfill'])
+@pytest.mark.parametrize('empty', [False, True])
+def test_panel_engine_matches_vectorized(gapped_shipments, fill_method, empty):
+    # A refresh on unchanged raw data cleans no shipments at all
+    if empty:
+        gapped_shipments = gapped_shipments.iloc[:0]
+    vectorized = _make_continuous(gapped_shipments.copy(), fill_method,
+                                  engine='vectorized')
+    vectorized = _remove_continuous_zeros(vectorized, n_zeros=3).reset_index(drop=True)
+    panel = _continuous_panel(gapped_shipments.copy(), fill_method, n_zeros=3)
+
+    pd.testing.assert_frame_equal(vectorized, panel)
@@ -0,0 +1,61 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from pepsico_course.pipelines.data_processing.nodes.clean.utils import (
+    create_model_id,
+    map_values,
+    normalize_columns,
+)
+
+
+def test_normalize_columns_merges_spellings():
+    df = pd.DataFrame({'customer': ['Aldi', 'lidl', 'ALDI', 'eroski', 'Lidl']})
+
+    result = normalize_columns(df, 'customer')
+
+    assert result['customer'].dtype == 'category'
+    assert list(result['customer'].cat.categories) == ['ALDI', 'EROSKI', 'LIDL']
+    assert list(result['customer']) == ['ALDI', 'LIDL', 'ALDI', 'EROSKI', 'LIDL']
+
+
+def test_create_model_id_matches_string_concatenation():
+    df = pd.DataFrame({
+        'prod_code': ['8684_05', '1424_01', '8684_05', '1424_01', None],
+        'customer': ['ALDI', 'LIDL', 'ALDI', 'ALDI', 'LIDL'],
+        'location': ['BILBAO', 'VITORIA', 'VITORIA', 'BILBAO', 'BILBAO'],
+    })
+    expected = df['prod_code'] + '#' + df['customer'] + '#' + df['location']
+
+    result = create_model_id(normalize_columns(df, 'customer'))
+
+    assert result['model_id'].dtype == 'category'
+    assert result['model_id'].cat.categories.is_unique
+    model_id = result['model_id'].astype(object).replace({np.nan: None})
+    pd.testing.assert_series_equal(model_id, expected.replace({np.nan: None}),
+                                   check_names=False)
+
+
+def test_map_values_applies_values_then_replacements():
+    df = pd.DataFrame({'promo_type': ['-', np.nan, '3x2', 'tres por dos', 'goodie',
+                                      'Dia de la Madre']})
+
+    result = map_values(df, 'promo_type',
+                        values={'-': None, '3x2': 'p3x2', 'tres por dos': 'p3x2'},
+                        replacements=[[' de ', ''], [' ', '']])
+
+    assert list(result['promo_type']) == [None, None, 'p3x2', 'p3x2', 'goodie',
+                                          'DialaMadre']
+
+
+def test_map_values_on_a_slice_leaves_it_untouched():
+    df = pd.DataFrame({'promo_type': ['-', '3x2', '-'], 'week': [1, 2, 3]})
+    rows = df[df['week'] > 1]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', pd.errors.SettingWithCopyWarning)
+        result = map_values(rows, 'promo_type', values={'-': None})
+
+    assert list(result['promo_type']) == ['3x2', None]
+    assert list(rows['promo_type']) == ['3x2', '-']
@@ -0,0 +1,46 @@
+import pandas as pd
+
+from pepsico_course.pipelines.data_processing.nodes.feature.holidays import (
+    feature_holidays,
+)
+
+
+def _calendar(start, periods):
+    return pd.DataFrame({'time_var': pd.date_range(start, periods=periods,
+                                                   freq='W-MON', tz='UTC')})
+
+
+def test_feature_holidays_covers_the_calendar():
+    calendar = _calendar('2022-12-19', 4)
+    holidays_processed = pd.DataFrame({
+        'DT': pd.to_datetime(['2022-12-25', '2023-01-01', '2023-01-06'], utc=True),
+        'HOL_NM': ['ChristmasDay', 'NewYearsDay', 'Epiphany'],
+    })
+
+    holidays_featured = feature_holidays(holidays_processed, calendar)
+
+    assert list(holidays_featured.columns) == ['time_var', 'ChristmasDay', 'Epiphany',
+                                               'NewYearsDay', 'number_of_holidays',
+                                               'is_holiday']
+    assert holidays_featured['time_var'].equals(calendar['time_var'])
+    assert (holidays_featured.drop(columns='time_var').dtypes == 'int8').all()
+    # Sunday holidays belong to the week starting on the monday before
+    assert holidays_featured['ChristmasDay'].tolist() == [1, 0, 0, 0]
+    assert holidays_featured['NewYearsDay'].tolist() == [0, 1, 0, 0]
+    assert holidays_featured['Epiphany'].tolist() == [0, 0, 1, 0]
+    assert holidays_featured['number_of_holidays'].tolist() == [1, 1, 1, 0]
+    assert holidays_featured['is_holiday'].tolist() == [1, 1, 1, 0]
+
+
+def test_feature_holidays_counts_the_holidays_of_a_week():
+    calendar = _calendar('2023-10-09', 2)
+    holidays_processed = pd.DataFrame({
+        'DT': pd.to_datetime(['2023-10-12', '2023-10-13'], utc=True),
+        'HOL_NM': ['FiestaNacionalEspana', 'LocalHoliday'],
+    })
+
+    holidays_featured = feature_holidays(holidays_processed, calendar)
+
+    assert holidays_featured['number_of_holidays'].tolist() == [2, 0]
+    flags = holidays_featured[['FiestaNacionalEspana', 'LocalHoliday']]
+    assert flags.values.tolist() == [[1, 1], [0, 0]]
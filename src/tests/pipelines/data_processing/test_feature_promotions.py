@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+from pepsico_course.pipelines.data_processing.nodes.feature.promotions import (
+    _generate_dicotomic_features,
+    feature_promotions,
+)
+
+
+@pytest.fixture
+def promotions_processed():
+    """A few weeks of promotions of a national and a local customer"""
+    promo_types = ['-', 'd10', 'bogo', '-', None, 'd20',
+                   '-', 'd10', '-', '-', 'bogo', '-']
+    weeks = pd.date_range('2023-01-02', periods=6, freq='W-MON', tz='UTC')
+    return pd.DataFrame({
+        'model_id': ['1424_01#BM#BILBAO'] * 6 + ['1424_01#ALDI#BILBAO'] * 6,
+        'time_var': list(weeks) * 2,
+        'customer': ['BM'] * 6 + ['ALDI'] * 6,
+        'promo_type': promo_types,
+    })
+
+
+def _per_value_features(promotions_processed):
+    """The encoding the factorized one replaced: one `apply` per distinct value"""
+    df = promotions_processed.copy()
+    for value in df['promo_type'].dropna().unique():
+        df[str(value)] = df['promo_type'].apply(lambda x: 1 if x == value else 0)
+    df['is_national'] = df['customer'].apply(
+        lambda x: 1 if x in ['BM', 'EROSKI', 'MERCADONA'] else 0)
+    df['is_basque'] = df['customer'].apply(lambda x: 1 if x in ['BM', 'EROSKI'] else 0)
+    aggregated = df['promo_type'].apply(
+        lambda x: 'discount' if x is not None and x[0] == 'd' else x)
+    for value in aggregated.dropna().unique():
+        df[str(value)] = aggregated.apply(lambda x: 1 if x == value else 0)
+    return df.drop(columns='promo_type').dropna().reset_index(drop=True)
+
+
+def test_dicotomic_features():
+    values = pd.Series(['b', None, 'a', 'b'], index=[3, 4, 5, 6])
+
+    indicators = _generate_dicotomic_features(values)
+
+    # Non null values in order of appearance
+    assert indicators.columns.tolist() == ['b', 'a']
+    assert indicators.index.tolist() == [3, 4, 5, 6]
+    assert (indicators.dtypes == 'int8').all()
+    assert indicators.values.tolist() == [[1, 0], [0, 0], [0, 1], [1, 0]]
+
+
+def test_feature_promotions_matches_the_per_value_encoding(promotions_processed):
+    featured = feature_promotions(promotions_processed,
+                                  {'promotions': {'sparse_threshold': None}})
+
+    expected = _per_value_features(promotions_processed)
+    assert featured.columns.tolist() == ['model_id', 'time_var', 'customer',
+                                         '-', 'd10', 'bogo', 'd20',
+                                         'is_national', 'is_basque', 'discount']
+    pd.testing.assert_frame_equal(featured, expected, check_dtype=False)
+    indicators = featured.drop(columns=['model_id', 'time_var', 'customer'])
+    assert (indicators.dtypes == 'int8').all()
+
+
+def test_rare_promo_types_are_sparse(promotions_processed):
+    dense = feature_promotions(promotions_processed,
+                               {'promotions': {'sparse_threshold': None}})
+
+    featured = feature_promotions(promotions_processed,
+                                  {'promotions': {'sparse_threshold': 0.2}})
+
+    # d20 is in 1 row out of 12, bogo and d10 in 2, the other indicators in more
+    sparse = [column for column in featured.columns
+              if isinstance(featured[column].dtype, pd.SparseDtype)]
+    assert sparse == ['d10', 'bogo', 'd20']
+    assert featured['d20'].sparse.density == pytest.approx(1 / 12)
+    densified = featured.astype({column: 'int8' for column in sparse})
+    pd.testing.assert_frame_equal(densified, dense)
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pepsico_course.pipelines.data_processing.nodes.feature.calendar import (
+    build_calendar,
+)
+from pepsico_course.pipelines.data_processing.nodes.feature.shipments import (
+    _encode_time_variables,
+)
+
+
+def _encode_time_variables_rowwise(shipments_processed: pd.DataFrame) -> pd.DataFrame:
+    """Reference implementation: per DFU year dummies and row-wise cyclical encodings"""
+    def _year_dummies(x):
+        return pd.concat([x, pd.get_dummies(x['time_var'].dt.year, drop_first=True,
+                                            prefix="year")], axis=1)
+
+    def _month(x):
+        return x['time_var'].month / 12 * 2 * np.pi
+
+    def _week(x):
+        return x['time_var'].isocalendar().week / 52 * 2 * np.pi
+
+    shipments_processed = (shipments_processed
+                           .sort_values(by='time_var')
+                           .groupby(['prod_code', 'customer', 'location'])
+                           .apply(_year_dummies)
+                           .reset_index(drop=True)
+                           )
+    shipments_processed['sin_month'] = shipments_processed.apply(
+        lambda x: np.sin(_month(x)), axis=1)
+    shipments_processed['cos_month'] = shipments_processed.apply(
+        lambda x: np.cos(_month(x)), axis=1)
+    shipments_processed['sin_week'] = shipments_processed.apply(
+        lambda x: np.sin(_week(x)), axis=1)
+    shipments_processed['cos_week'] = shipments_processed.apply(
+        lambda x: np.cos(_week(x)), axis=1)
+    return shipments_processed
+
+
+@pytest.fixture
+def shipments_processed():
+    """
+    DFUs starting on the same week (so the per DFU year dummies match the global
+    ones)
+    """
+    frames = []
+    for dfu in range(5):
+        dates = pd.date_range('2020-10-19', periods=120 - 10 * dfu, freq='W-MON',
+                              tz='UTC')
+        frames.append(pd.DataFrame({
+            'prod_code': f'{1000 + dfu}_01',
+            'customer': ['ALDI', 'LIDL'][dfu % 2],
+            'location': 'BILBAO',
+            'category': 'snack',
+            'time_var': dates,
+            'shipments': np.arange(len(dates), dtype=float),
+        }))
+    return pd.concat(frames).sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+def test_encode_time_variables_matches_rowwise(shipments_processed):
+    expected = _encode_time_variables_rowwise(shipments_processed.copy())
+    # Years a DFU does not reach came out as NaN, filled with 0 later in
+    # `create_model_input`
+    year_columns = expected.filter(like='year_').columns
+    expected[year_columns] = expected[year_columns].fillna(0).astype('int8')
+    calendar = build_calendar(shipments_processed,
+                              shipments_processed[['time_var']],
+                              pd.DataFrame({'DT': pd.to_datetime(['2019-12-25'],
+                                                                 utc=True)}))
+    result = _encode_time_variables(shipments_processed.copy(), calendar)
+
+    assert list(result.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, atol=1e-6)
+    cyclical = ['sin_month', 'cos_month', 'sin_week', 'cos_week']
+    assert (result[cyclical].dtypes == 'float32').all()
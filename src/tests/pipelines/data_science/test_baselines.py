@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pepsico_course.pipelines.data_science.nodes.baselines.baselines import (
+    baseline_approach,
+    combine_forecasts,
+    croston,
+    moving_average,
+    route_model_input,
+    seasonal_naive,
+)
+
+
+@pytest.fixture
+def model_input():
+    """Two years of a seasonal DFU, a noisy one and a shorter intermittent one"""
+    rng = np.random.default_rng(7)
+    dates = pd.date_range('2021-01-04', periods=104, freq='W-MON', tz='UTC')
+    weeks = np.arange(len(dates))
+    intermittent = np.where(rng.random(len(dates)) < 0.3, 5.0, 0.0)
+    return pd.concat([
+        pd.DataFrame({'time_var': dates, 'model_id': 'seasonal',
+                      'shipments': 100 + 20 * np.sin(weeks * 2 * np.pi / 52)}),
+        pd.DataFrame({'time_var': dates, 'model_id': 'noisy',
+                      'shipments': rng.gamma(0.5, 100, len(dates))}),
+        pd.DataFrame({'time_var': dates[60:], 'model_id': 'intermittent',
+                      'shipments': intermittent[60:]}),
+    ], ignore_index=True).sample(frac=1, random_state=0)
+
+
+def test_baseline_methods():
+    demand = np.array([[np.nan, np.nan, 1, 2, 3, 4],
+                       [0, 4, 0, 0, 2, 0]], dtype=float)
+
+    np.testing.assert_array_equal(seasonal_naive(demand, 3, season_length=2),
+                                  [[3, 4, 3], [2, 0, 2]])
+    np.testing.assert_allclose(moving_average(demand, 1, window=5), [[2.5], [6 / 5]])
+    # Sizes 4 -> 4 + 0.5 * (2 - 4) = 3, intervals 2 -> 2 + 0.5 * (3 - 2) = 2.5
+    np.testing.assert_allclose(croston(demand[1:], 2, alpha=0.5), [[3 / 2.5, 3 / 2.5]])
+    # Probability 0, 0.5, 0.25, 0.125, 0.5625, 0.28125
+    np.testing.assert_allclose(croston(demand[1:], 1, alpha=0.5, beta=0.5),
+                               [[3 * 0.28125]])
+    # Never any demand
+    np.testing.assert_array_equal(croston(np.zeros((1, 4)), 1), [[0]])
+
+
+def test_baseline_approach(model_input):
+    options = {'season_length': 52, 'window': 4, 'min_accuracy': 0.9}
+    forecasts, routing = baseline_approach(model_input, horizon=8, time_var='time_var',
+                                           target_var='shipments',
+                                           primary_key='model_id', y_hat='y_hat',
+                                           baseline_options=options)
+    routing = routing.set_index('model_id')
+
+    # The last 8 weeks of every DFU, for each method
+    assert len(forecasts) == 3 * 8 * 4
+    window_start = model_input['time_var'].max() - pd.Timedelta(weeks=7)
+    assert forecasts.groupby('model_id')['time_var'].min().eq(window_start).all()
+    assert routing.loc['seasonal', 'best_method'] == 'seasonal_naive'
+    assert routing.loc['seasonal', 'route'] == 'baseline'
+    assert routing.loc['noisy', 'route'] == 'arima'
+    # Not a full season of history before the validation weeks
+    assert np.isnan(routing.loc['intermittent', 'accuracy_seasonal_naive'])
+    assert routing.loc['intermittent', 'demand_class'] in ['intermittent', 'lumpy']
+
+    routed = route_model_input(model_input, routing.reset_index(), 'model_id')
+    assert set(routed['model_id']) == set(routing.index[routing['route'] == 'arima'])
+    assert 'noisy' in set(routed['model_id'])
+
+    in_window = routed['time_var'] >= forecasts['time_var'].min()
+    arima_results = routed.assign(y_hat=np.where(in_window, 1.0, np.nan))
+    combined = combine_forecasts(arima_results, forecasts, routing.reset_index(),
+                                 primary_key='model_id', time_var='time_var',
+                                 target_var='shipments', y_hat='y_hat')
+    methods = combined.groupby('model_id')['method'].agg(['first', 'size'])
+    assert methods['size'].eq(8).all()
+    assert methods.loc['noisy', 'first'] == 'arima'
+    assert methods.loc['seasonal', 'first'] == 'seasonal_naive'
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pepsico_course.pipelines.data_science.nodes.metrics.metrics import (
+    compute_metrics,
+    evaluate_forecasts,
+)
+
+MODEL_IDS = ['a#X#BILBAO', 'b#X#BILBAO', 'c#Y#VITORIA', 'd#Y#VITORIA']
+
+
+@pytest.fixture
+def forecasts():
+    """
+    Four weeks of forecasts: a regular DFU, two without demand and one forecast far
+    above the demand
+    """
+    weeks = pd.date_range('2023-01-02', periods=4, freq='W-MON', tz='UTC')
+    return pd.DataFrame({
+        'model_id': pd.Categorical(np.repeat(['b#X#BILBAO', 'a#X#BILBAO', 'c#Y#VITORIA',
+                                              'd#Y#VITORIA'], 4)),
+        'time_var': np.tile(weeks, 4),
+        'shipments': [10, 20, 30, 40] + [0] * 8 + [1, 1, 1, 1],
+        'y_hat': [12, 18, 30, 45] + [0] * 4 + [0, 2, 0, 0] + [3, 3, 3, 3],
+    })
+
+
+def test_compute_metrics(forecasts):
+    metrics = compute_metrics(forecasts, ['model_id']).set_index('model_id')
+
+    # Same order as the categories
+    assert metrics.index.tolist() == MODEL_IDS
+    assert metrics.loc['b#X#BILBAO', 'accuracy'] == pytest.approx(1 - 9 / 100)
+    assert metrics.loc['b#X#BILBAO', 'bias'] == pytest.approx(5 / 100)
+    assert metrics.loc['b#X#BILBAO', 'mae'] == pytest.approx(9 / 4)
+    # Without demand: perfect forecast / any error
+    assert metrics.loc['a#X#BILBAO', 'accuracy'] == 1
+    assert metrics.loc['c#Y#VITORIA', 'accuracy'] == 0
+    assert np.isnan(metrics.loc['c#Y#VITORIA', 'wape'])
+    # Floored at 0
+    assert metrics.loc['d#Y#VITORIA', 'accuracy'] == 0
+    assert metrics.loc['d#Y#VITORIA', 'wape'] == pytest.approx(2)
+
+
+def test_compute_metrics_skips_missing_forecasts(forecasts):
+    history = forecasts.assign(time_var=forecasts['time_var'] - pd.Timedelta(weeks=4),
+                               y_hat=np.nan)
+    with_history = compute_metrics(pd.concat([history, forecasts], ignore_index=True),
+                                   ['model_id'])
+
+    pd.testing.assert_frame_equal(with_history,
+                                  compute_metrics(forecasts, ['model_id']))
+    assert with_history['n'].eq(4).all()
+
+
+def test_evaluate_forecasts(forecasts):
+    facts = pd.DataFrame({'model_id': MODEL_IDS, 'customer': ['X', 'X', 'Y', 'Y'],
+                          'location': ['BILBAO', 'BILBAO', 'VITORIA', 'VITORIA'],
+                          'category': 'snack'})
+    perfect = forecasts.assign(y_hat=forecasts['shipments'])
+    dfu_metrics, rollup = evaluate_forecasts(forecasts, perfect, perfect.iloc[:8],
+                                             facts, primary_key='model_id',
+                                             target_var='shipments', y_hat='y_hat')
+
+    assert len(dfu_metrics) == 4 + 4 + 2
+    rollup = rollup.set_index(['model', 'level', 'value'])
+    # Errors are summed over the DFUs of a customer, not averaged over their accuracies
+    accuracy = rollup['accuracy']
+    assert accuracy[('arima', 'customer', 'X')] == pytest.approx(1 - 9 / 100)
+    assert accuracy[('arima', 'customer', 'Y')] == 0
+    assert accuracy[('arima', 'total', 'total')] == pytest.approx(1 - (9 + 2 + 8) / 104)
+    assert rollup.loc[('lgbm', 'category', 'snack'), 'accuracy'] == 1
+    assert rollup.loc[('arima', 'category', 'snack'), 'n'] == 16
@@ -0,0 +1,99 @@
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pytest
+
+from pepsico_course.extras.datasets import LightGBMBinaryDataset
+from pepsico_course.pipelines.data_science.nodes.modeling.modeling import (
+    build_lgb_dataset,
+    ml_approach,
+    ml_predict,
+    time_series_approach,
+)
+
+
+@pytest.fixture
+def model_input():
+    """Three years of weekly demand for a few `model_id`s"""
+    rng = np.random.default_rng(3)
+    dates = pd.date_range('2021-01-04', periods=80, freq='W-MON', tz='UTC')
+    return pd.concat([pd.DataFrame({
+        'time_var': dates,
+        'model_id': f'{1000 + dfu}_01#ALDI#BILBAO',
+        'shipments': (500 + 50 * np.sin(np.arange(len(dates)) / 8)
+                      + rng.normal(0, 10, len(dates))),
+    }) for dfu in range(4)], ignore_index=True)
+
+
+def _fit(model_input, previous_params=None, **backend_options):
+    return time_series_approach(model_input.copy(), horizon=10, order=[1, 0, 0],
+                                time_var='time_var', primary_key='model_id',
+                                y_hat='y_hat', target_var='shipments',
+                                seasonal_order=[0, 0, 0, 0], trend='c',
+                                backend_options=backend_options,
+                                previous_params=previous_params)
+
+
+def test_time_series_approach_does_not_depend_on_workers(model_input):
+    serial, serial_params = _fit(model_input, n_workers=1)
+    parallel, parallel_params = _fit(model_input, n_workers=2, chunk_size=1)
+
+    pd.testing.assert_frame_equal(serial, parallel)
+    pd.testing.assert_frame_equal(serial_params, parallel_params)
+    assert serial_params['model_id'].nunique() == 4
+
+
+def test_time_series_approach_warm_start(model_input):
+    _, params = _fit(model_input)
+    warm, warm_params = _fit(model_input, warm_start=True, previous_params=params)
+
+    assert warm['y_hat'].notna().sum() == 4 * 10
+    np.testing.assert_allclose(warm_params['value'], params['value'], rtol=1e-3)
+
+
+def test_ml_predict_is_batched(model_input):
+    model_input['lag_feature'] = (model_input.groupby('model_id')['shipments']
+                                  .shift(1).fillna(0))
+    fcst_start_date = np.unique(model_input['time_var'].values)[-10]
+    train = model_input[model_input['time_var'].values < fcst_start_date]
+    model = lgb.train({'verbose': -1, 'min_data_in_leaf': 5},
+                      lgb.Dataset(train[['lag_feature']], train['shipments']),
+                      num_boost_round=5)
+
+    kwargs = dict(fcst_start_date=fcst_start_date, primary_key='model_id',
+                  time_var='time_var', target_var='shipments', model=model,
+                  y_hat='y_hat')
+    batched = ml_predict(model_input.copy(), **kwargs)
+    chunked = ml_predict(model_input.copy(), chunk_size=7, **kwargs)
+
+    assert len(batched) == len(model_input)
+    assert batched['y_hat'].notna().sum() == 4 * 10
+    pd.testing.assert_frame_equal(batched, chunked)
+
+
+def test_build_lgb_dataset_is_reused(model_input, tmp_path):
+    shipments = model_input.groupby('model_id')['shipments']
+    model_input['lag_feature'] = shipments.shift(1).fillna(0)
+    model_input['model_id_encoded'] = (model_input['model_id'].astype('category')
+                                       .cat.codes)
+    kwargs = dict(horizon=10, time_var='time_var', target_var='shipments',
+                  primary_key='model_id', dataset_options={'min_data_in_bin': 1})
+
+    train_set = build_lgb_dataset(model_input, **kwargs)
+    assert train_set['num_data'] == 4 * 70
+    assert train_set['categorical_feature'] == ['model_id_encoded']
+
+    catalog_dataset = LightGBMBinaryDataset(str(tmp_path / 'lgb_train.bin'))
+    catalog_dataset.save(train_set)
+    previous = catalog_dataset.load()
+    assert build_lgb_dataset(model_input, previous=previous, **kwargs) is previous
+    model_input.loc[0, 'lag_feature'] = 1
+    rebuilt = build_lgb_dataset(model_input, previous=previous, **kwargs)
+    assert rebuilt['hash'] != previous['hash']
+
+    params = {'verbose': -1, 'min_data_in_leaf': 5}
+    forecasts, from_binary, _ = ml_approach(
+        model_input.copy(), y_hat='y_hat', lgbm_params=params, train_dataset=previous,
+        **{k: v for k, v in kwargs.items() if k != 'dataset_options'})
+    assert from_binary['model_id'].nunique() == 4
+    assert len(forecasts) == 4 * 10
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from pepsico_course.pipelines.model_inputs.nodes.model_input import create_model_input
+
+
+def test_create_model_input_joins_with_lean_dtypes():
+    weeks = pd.date_range('2022-12-19', periods=4, freq='W-MON', tz='UTC')
+    attributes = {'prod_code': '1424_01', 'customer': 'LIDL', 'location': 'BILBAO',
+                  'category': 'snack'}
+    shipments = pd.DataFrame({
+        **attributes,
+        'time_var': weeks.append(weeks),
+        'shipments': [10., 20., 30., 40., 1., 2., 3., 4.],
+        'model_id': ['1424_01#LIDL#BILBAO'] * 4 + ['1424_01#LIDL#VITORIA'] * 4,
+        'customer_encoded': 0,
+        'year_2022': [1, 1, 0, 0] * 2,
+        'year_2023': [0, 0, 1, 1] * 2,
+        'sin_week': 0.5,
+    })
+    promotions = pd.DataFrame({
+        **attributes,
+        'time_var': weeks[[1]],
+        'model_id': ['1424_01#LIDL#BILBAO'],
+        'p3x2': [1],
+    })
+    # Every week of the calendar, as `feature_holidays` builds them
+    holidays = pd.DataFrame({'time_var': weeks, 'ChristmasDay': [1, 0, 0, 0],
+                             'NewYearsDay': [0, 0, 1, 0]})
+
+    mrd, facts_data = create_model_input(shipments, promotions, holidays)
+
+    assert list(mrd.columns) == ['time_var', 'shipments', 'model_id',
+                                 'customer_encoded', 'year_2022', 'year_2023',
+                                 'sin_week', 'p3x2', 'ChristmasDay', 'NewYearsDay']
+    assert mrd['model_id'].dtype == 'category'
+    indicators = ['customer_encoded', 'year_2022', 'year_2023', 'p3x2', 'ChristmasDay']
+    assert (mrd[indicators].dtypes == 'int8').all()
+    assert mrd['sin_week'].dtype == 'float32'
+    assert mrd['p3x2'].tolist() == [0, 1, 0, 0] + [0, 0, 0, 0]
+    assert mrd['NewYearsDay'].tolist() == [0, 0, 1, 0] * 2
+    assert mrd['year_2022'].tolist() == shipments['year_2022'].tolist()
+    assert len(facts_data) == 2
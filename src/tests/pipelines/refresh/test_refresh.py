@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pepsico_course.pipelines.data_processing.nodes.clean.shipments import (
+    clean_shipments,
+)
+from pepsico_course.pipelines.data_science.nodes.baselines.baselines import (
+    baseline_approach,
+)
+from pepsico_course.pipelines.refresh.nodes.refresh import (
+    detect_changes,
+    merge_dfus,
+    merge_results,
+    select_dfus,
+)
+
+SETTINGS = [{'shipments': {'n_zeros': 12}}, {'order': [1, 1, 1]}]
+CLEANING = {'shipments': {'fill_method': 'nearest', 'fill_engine': 'panel',
+                          'n_zeros': 12, 'percentile': 0.05}}
+BASELINES = dict(horizon=4, time_var='time_var', target_var='shipments',
+                 primary_key='model_id', y_hat='y_hat',
+                 baseline_options={'season_length': 4, 'window': 4,
+                                   'min_accuracy': 0.7})
+
+
+def _raw(dfus, weeks, value=10):
+    return pd.DataFrame([{'prod_code': prod_code, 'customer': customer,
+                          'location': location, 'category': 'snack',
+                          'time_var': f'{week}T00:00:00.000+0000', 'shipments': value}
+                         for prod_code, customer, location in dfus for week in weeks])
+
+
+@pytest.fixture
+def raw():
+    dfus = [('1424_01', 'lidl', 'bilbao'), ('2093_01', 'Mercadona', 'Bilbao'),
+            ('6860_07', 'ALDI', 'vitoria'), ('9876_02', 'BM', 'bilbao')]
+    shipments = _raw(dfus, ['2023-01-02', '2023-01-09'])
+    promotions = shipments.drop(columns='shipments').assign(promo_type='-')
+    return shipments, promotions
+
+
+def test_detect_changes(raw):
+    shipments, promotions = raw
+    changes, state = detect_changes(shipments, promotions, pd.DataFrame(), {},
+                                    *SETTINGS)
+    assert (changes['status'] == 'new').all()
+    assert state['model_id'].tolist() == ['1424_01#LIDL#BILBAO',
+                                          '2093_01#MERCADONA#BILBAO',
+                                          '6860_07#ALDI#VITORIA', '9876_02#BM#BILBAO']
+
+    # A restated week, a new week, a new DFU and a DFU which is gone
+    is_restated = ((shipments['prod_code'] == '2093_01')
+                   & (shipments['time_var'] < '2023-01-03'))
+    shipments.loc[is_restated, 'shipments'] = 99
+    shipments = pd.concat([shipments[shipments['prod_code'] != '9876_02'],
+                           _raw([('6860_07', 'ALDI', 'vitoria')], ['2023-01-16']),
+                           _raw([('5845_07', 'ALDI', 'bilbao')], ['2023-01-16'])])
+    promotions = promotions[promotions['prod_code'] != '9876_02']
+    changes, new_state = detect_changes(shipments, promotions, state, {}, *SETTINGS)
+
+    assert changes.set_index('model_id')['status'].to_dict() == {
+        '1424_01#LIDL#BILBAO': 'unchanged',
+        '2093_01#MERCADONA#BILBAO': 'changed',
+        '5845_07#ALDI#BILBAO': 'new',
+        '6860_07#ALDI#VITORIA': 'appended',
+        '9876_02#BM#BILBAO': 'removed',
+    }
+    assert new_state['watermark'].iloc[0] == pd.Timestamp('2023-01-16', tz='UTC')
+
+    # Rows in a different order are the same data, new parameters refresh everything
+    changes, _ = detect_changes(shipments.iloc[::-1], promotions, new_state, {},
+                                *SETTINGS)
+    assert (changes['status'] == 'unchanged').all()
+    changes, _ = detect_changes(shipments, promotions, new_state, {}, SETTINGS[0],
+                                {'order': [2, 1, 1]})
+    assert (changes['status'] == 'changed').all()
+
+
+def test_merge_dfus_keeps_the_row_order():
+    previous = pd.DataFrame({'model_id': ['b', 'b', 'a', 'c'],
+                             'value': [1., 2., 3., 4.]})
+    delta = pd.DataFrame({'model_id': pd.Categorical(['d', 'b', 'b', 'b']),
+                          'value': [9., 5., 6., 7.]})
+    changes = pd.DataFrame({'model_id': ['a', 'b', 'c', 'd'],
+                            'status': ['removed', 'appended', 'unchanged', 'new']})
+
+    merged = merge_dfus(previous, delta, changes)
+
+    assert merged['model_id'].tolist() == ['b', 'b', 'b', 'c', 'd']
+    assert merged['value'].tolist() == [5., 6., 7., 4., 9.]
+    assert merged['model_id'].cat.categories.tolist() == ['b', 'c', 'd']
+
+
+def test_unchanged_dfus_keep_the_previous_outputs(raw):
+    weeks = pd.date_range('2023-01-02', periods=20, freq='W-MON').strftime('%Y-%m-%d')
+    dfus = [('1424_01', 'lidl', 'bilbao'), ('2093_01', 'Mercadona', 'Bilbao')]
+    shipments = _raw(dfus, weeks)
+    shipments['shipments'] = np.arange(len(shipments)) % 7 + 10.
+    changes, _ = detect_changes(shipments, raw[1], pd.DataFrame(), {}, *SETTINGS)
+
+    # First refresh: every DFU is new, the delta is the whole output
+    processed = clean_shipments(select_dfus(shipments, changes), CLEANING)
+    forecasts, routing = baseline_approach(select_dfus(processed, changes), **BASELINES)
+    assert len(processed) and len(forecasts)
+
+    # Second refresh on the same data: nothing to compute, the previous outputs are kept
+    changes = changes.assign(status='unchanged')
+    delta = select_dfus(shipments, changes)
+    assert delta.empty
+    processed_delta = clean_shipments(delta, CLEANING)
+    forecasts_delta, routing_delta = baseline_approach(select_dfus(processed, changes),
+                                                       **BASELINES)
+
+    pd.testing.assert_frame_equal(merge_dfus(processed, processed_delta, changes),
+                                  processed)
+    pd.testing.assert_frame_equal(merge_results(forecasts, forecasts_delta, changes),
+                                  forecasts)
+    pd.testing.assert_frame_equal(merge_results(routing, routing_delta, changes),
+                                  routing)
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pepsico_course.pipelines.data_science.nodes.modeling.modeling import (
+    ml_approach,
+    time_series_approach,
+)
+from pepsico_course.pipelines.data_science.nodes.registry.registry import (
+    register_arima_model,
+)
+from pepsico_course.pipelines.scoring.nodes.scoring import score_arima, score_lgbm
+
+KWARGS = dict(horizon=8, time_var='time_var', target_var='shipments',
+              primary_key='model_id', y_hat='y_hat')
+
+
+@pytest.fixture
+def model_input():
+    """Weekly demand of a few `model_id`s, with a lag and an encoded feature"""
+    rng = np.random.default_rng(11)
+    dates = pd.date_range('2021-01-04', periods=60, freq='W-MON', tz='UTC')
+    season = 50 * np.sin(np.arange(len(dates)) / 8)
+    df = pd.concat([pd.DataFrame({
+        'time_var': dates,
+        'model_id': f'{1000 + dfu}_01#ALDI#BILBAO',
+        'shipments': 500 + season + rng.normal(0, 10, len(dates)),
+        'model_id_encoded': dfu,
+    }) for dfu in range(3)], ignore_index=True)
+    df['lag_feature'] = df.groupby('model_id')['shipments'].shift(1).fillna(0)
+    return df
+
+
+def test_score_arima_reproduces_the_fitted_forecasts(model_input):
+    spec = dict(order=[1, 0, 0], seasonal_order=[0, 0, 0, 0], trend='c')
+    options = {key: value for key, value in KWARGS.items() if key != 'y_hat'}
+    arima_results, arima_params = time_series_approach(model_input.copy(),
+                                                       y_hat='y_hat', **spec,
+                                                       **options)
+    # The specification comes from the registry, not from the current options
+    arima_model = register_arima_model(arima_params.iloc[3:], 'model_id', **spec)
+
+    scores = score_arima(model_input, arima_model, **KWARGS)
+
+    registered = arima_results['model_id'] != '1000_01#ALDI#BILBAO'
+    fitted = arima_results.loc[arima_results['y_hat'].notna() & registered]
+    assert scores['model_id'].unique().tolist() == ['1001_01#ALDI#BILBAO',
+                                                    '1002_01#ALDI#BILBAO']
+    np.testing.assert_allclose(scores['y_hat'], fitted['y_hat'])
+    np.testing.assert_allclose(scores['y_ci_upper'], fitted['y_ci_upper'])
+
+
+def test_score_lgbm_reproduces_ml_approach(model_input):
+    forecasts, _, lgb_model = ml_approach(model_input.copy(),
+                                          lgbm_params={'verbose': -1,
+                                                       'min_data_in_leaf': 5},
+                                          **KWARGS)
+    assert lgb_model['feature_name'] == ['model_id_encoded', 'lag_feature']
+
+    # Columns in another order and an extra one the model was not trained on
+    columns = ['lag_feature', 'shipments', 'model_id', 'time_var', 'model_id_encoded']
+    shuffled = model_input[columns].assign(new=1.)
+    scores = score_lgbm(shuffled, lgb_model, **KWARGS)
+
+    pd.testing.assert_frame_equal(scores, forecasts)
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pepsico_course.pipelines.data_science.nodes.modeling.modeling import ml_approach
+from pepsico_course.pipelines.tuning.nodes.tuning import sample_params, tune_lgbm
+
+KWARGS = dict(horizon=8, time_var='time_var', target_var='shipments',
+              primary_key='model_id')
+SEARCH_SPACE = {'num_leaves': {'type': 'int', 'low': 4, 'high': 32, 'log': True},
+                'learning_rate': {'type': 'float', 'low': 0.05, 'high': 0.3}}
+
+
+@pytest.fixture
+def model_input():
+    """Weekly demand of a few `model_id`s driven by a promotion feature"""
+    rng = np.random.default_rng(7)
+    dates = pd.date_range('2021-01-04', periods=70, freq='W-MON', tz='UTC')
+    frames = []
+    for dfu in range(4):
+        promo = rng.integers(0, 2, len(dates))
+        frames.append(pd.DataFrame({
+            'time_var': dates,
+            'model_id': f'{1000 + dfu}_01#ALDI#BILBAO',
+            'shipments': 100 * (dfu + 1) + 80 * promo + rng.normal(0, 5, len(dates)),
+            'model_id_encoded': dfu,
+            'promo': promo,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _tune(model_input, **options):
+    tuning_options = {'n_trials': 8, 'validation_weeks': 8, 'metric': 'l1',
+                      'min_rounds': 5, 'max_rounds': 45, 'reduction_factor': 3,
+                      'early_stopping_rounds': 10, 'seed': 1,
+                      'search_space': SEARCH_SPACE, **options}
+    lgbm_params = {'verbose': -1, 'num_leaves': 10, 'metric': ['l2', 'l1']}
+    return tune_lgbm(model_input, lgbm_params=lgbm_params,
+                     dataset_options={'min_data_in_bin': 1},
+                     tuning_options=tuning_options, **KWARGS)
+
+
+def test_sample_params():
+    samples = sample_params(SEARCH_SPACE, 20, seed=3)
+
+    assert samples == sample_params(SEARCH_SPACE, 20, seed=3)
+    assert all(isinstance(sample['num_leaves'], int)
+               and 4 <= sample['num_leaves'] <= 32 for sample in samples)
+    assert all(isinstance(sample['learning_rate'], float)
+               and 0.05 <= sample['learning_rate'] <= 0.3 for sample in samples)
+
+
+def test_successive_halving(model_input):
+    tuned, trials = _tune(model_input, n_workers=1)
+
+    assert len(trials) == 9 and trials['trial'].tolist() == list(range(9))
+    assert (trials['status'] == 'best').sum() == 1
+    # 9 trials, 3 after the first rung (5 rounds), 1 after the second one (15 rounds)
+    assert (trials['status'] == 'pruned at rung 0').sum() == 6
+    assert (trials['status'] == 'pruned at rung 1').sum() == 2
+    assert trials.loc[trials['status'] == 'pruned at rung 0', 'rounds'].max() == 5
+    best = trials.loc[trials['status'] == 'best'].iloc[0]
+    assert best['valid_l1'] == trials['valid_l1'].min()
+    assert tuned['num_iterations'] == best['best_iteration']
+    # Only the searched parameters are kept, not a copy of lgb_model_options
+    assert set(tuned) <= set(SEARCH_SPACE) | {'num_iterations'}
+
+
+def test_parallel_trials_match_the_sequential_ones(model_input):
+    _, sequential = _tune(model_input, n_workers=1)
+    tuned, parallel = _tune(model_input, n_workers=3)
+
+    pd.testing.assert_frame_equal(sequential.drop(columns='seconds'),
+                                  parallel.drop(columns='seconds'))
+
+    _, _, lgb_model = ml_approach(model_input.copy(), y_hat='y_hat',
+                                  lgbm_params={'verbose': -1}, tuned_params=tuned,
+                                  **KWARGS)
+    assert lgb_model['booster'].num_trees() == tuned['num_iterations']
+
+
+def test_lgb_model_options_still_apply_with_tuned_params(model_input):
+    tuned, _ = _tune(model_input, n_workers=1)
+
+    # A change of lgb_model_options after the tuning run
+    options = {'verbose': -1, 'num_leaves': 10, 'min_data_in_leaf': 7, 'lambda_l2': 0.5}
+    _, _, lgb_model = ml_approach(model_input.copy(), y_hat='y_hat',
+                                  lgbm_params=options, tuned_params=tuned, **KWARGS)
+
+    params = lgb_model['params']
+    assert params == {**options, **tuned}
+    assert params['min_data_in_leaf'] == 7 and params['lambda_l2'] == 0.5
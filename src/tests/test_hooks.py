@@ -0,0 +1,148 @@
+import json
+
+import pandas as pd
+import pytest
+from kedro.io import DataCatalog, MemoryDataset
+from kedro.pipeline import node, pipeline
+from kedro.runner import SequentialRunner
+from kedro.framework.hooks import _create_hook_manager
+
+from pepsico_course.extras.datasets import (
+    LightGBMModelDataset,
+    PartitionedParquetDataset,
+)
+from pepsico_course.hooks import PartitionFilterHooks, ProfilingHooks
+
+
+def _double(df):
+    return df.assign(value=df['value'] * 2)
+
+
+def _chunks(df):
+    for start in range(0, len(df), 2):
+        yield df.iloc[start:start + 2]
+
+
+@pytest.fixture
+def run(tmp_path):
+    def _run(**options):
+        hooks = ProfilingHooks()
+        hook_manager = _create_hook_manager()
+        hook_manager.register(hooks)
+        options = {'enabled': True, 'report_dir': str(tmp_path), **options}
+        hooks.after_catalog_created(feed_dict={'parameters': {'profiling': options}})
+
+        catalog = DataCatalog({'raw': MemoryDataset(pd.DataFrame({'value': range(5)})),
+                               'test.chunked': MemoryDataset(copy_mode='assign')})
+        nodes = pipeline([node(_chunks, 'raw', 'chunked', name='chunk_node'),
+                          node(_double, 'raw', 'doubled', name='double_node')],
+                         namespace='test', inputs='raw')
+        run_params = {'session_id': 'test', 'pipeline_name': None}
+        hook_manager.hook.before_pipeline_run(run_params=run_params, pipeline=nodes,
+                                              catalog=catalog)
+        run_result = SequentialRunner().run(nodes, catalog, hook_manager,
+                                            session_id='test')
+        hook_manager.hook.after_pipeline_run(run_params=run_params,
+                                             run_result=run_result, pipeline=nodes,
+                                             catalog=catalog)
+        return hooks
+
+    return _run
+
+
+def test_profiling_report(run, tmp_path):
+    run()
+
+    report = json.loads(next(tmp_path.glob('*.json')).read_text())
+    nodes = {record['node']: record for record in report['nodes']}
+    assert set(nodes) == {'test.chunk_node', 'test.double_node'}
+    assert nodes['test.double_node']['input_rows'] == 5
+    assert nodes['test.double_node']['output_rows'] == 5
+    # All the chunks of the generator node
+    assert nodes['test.chunk_node']['output_rows'] == 5
+    assert all(record['wall_seconds'] >= record['load_seconds'] + record['save_seconds']
+               for record in report['nodes'])
+
+    datasets = {record['dataset']: record for record in report['datasets']}
+    assert datasets['raw']['loads'] == 2
+    assert datasets['test.chunked']['saves'] == 3
+
+    table = pd.read_parquet(next(tmp_path.glob('*_nodes.parquet')))
+    assert len(table) == 2 and table['pipeline'].eq('__default__').all()
+
+
+def test_overlapping_nodes_only_record_the_peak_rss(tmp_path):
+    hooks = ProfilingHooks()
+    options = {'enabled': True, 'report_dir': str(tmp_path)}
+    hooks.after_catalog_created(feed_dict={'parameters': {'profiling': options}})
+    hooks.before_pipeline_run(run_params={})
+    first, second, third = [node(_double, 'raw', name, name=name)
+                            for name in ['first', 'second', 'third']]
+
+    # The second node resets the peak RSS while the first one runs (MemoryAwareRunner)
+    hooks.before_node_run(first)
+    hooks.before_node_run(second)
+    hooks.after_node_run(first)
+    hooks.after_node_run(second)
+    # Started once the first one is done, the peak it measures is its own
+    hooks.before_node_run(third)
+    hooks.after_node_run(third)
+
+    records = hooks._nodes
+    assert records['first']['memory_added_mb'] is None
+    assert records['first']['peak_rss_mb'] > 0
+    assert records['second']['memory_added_mb'] is not None
+    assert records['third']['memory_added_mb'] is not None
+
+
+def test_profile_node(run, tmp_path):
+    run(profile_nodes=['double_node'])
+
+    profiles = [path.name.split('_', 1)[1] for path in tmp_path.glob('*.prof')]
+    assert profiles == ['test.double_node.prof']
+
+
+def test_profiling_disabled(run, tmp_path):
+    run(enabled=False)
+
+    assert not list(tmp_path.iterdir())
+
+
+def _train(model_input):
+    return {}
+
+
+def _forecast(model_input, lgb_model):
+    return model_input
+
+
+@pytest.mark.parametrize('filters, names, refused', [
+    ({'category': ['snack']}, ['input_node'], False),
+    # The trained model is only loaded, the forecasts stay in memory
+    ({'category': ['snack']}, ['input_node', 'forecast_node'], False),
+    ({'category': ['snack']}, ['input_node', 'train_node', 'forecast_node'], True),
+    ({'category': None}, ['input_node', 'train_node', 'forecast_node'], False),
+])
+def test_partition_filters_refuse_unmergeable_outputs(tmp_path, filters, names,
+                                                      refused):
+    catalog = DataCatalog({
+        'shipments': MemoryDataset(),
+        'model_input': PartitionedParquetDataset(str(tmp_path / 'model_input'),
+                                                 bucket_by='model_id'),
+        'lgb_model': LightGBMModelDataset(str(tmp_path / 'lgb_model.txt')),
+    })
+    nodes = pipeline([
+        node(_double, 'shipments', 'model_input', name='input_node'),
+        node(_train, 'model_input', 'lgb_model', name='train_node'),
+        node(_forecast, ['model_input', 'lgb_model'], 'forecasts',
+             name='forecast_node'),
+    ]).only_nodes(*names)
+    hooks = PartitionFilterHooks()
+    parameters = {'partition_filters': filters}
+    hooks.after_catalog_created(catalog=catalog, feed_dict={'parameters': parameters})
+
+    if refused:
+        with pytest.raises(ValueError, match=r"overwrite \['lgb_model'\]"):
+            hooks.before_pipeline_run(pipeline=nodes, catalog=catalog)
+    else:
+        hooks.before_pipeline_run(pipeline=nodes, catalog=catalog)
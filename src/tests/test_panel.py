@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pepsico_course.panel import Panel
+
+
+@pytest.fixture
+def shipments():
+    """Three DFUs with gaps, starting and ending on different weeks, shuffled"""
+    weeks = pd.date_range('2023-01-02', periods=8, freq='W-MON', tz='UTC')
+    frames = [
+        pd.DataFrame({'prod_code': '1000_01', 'customer': 'ALDI',
+                      'time_var': weeks[[0, 1, 4, 5]], 'shipments': [1., 0., 4., 5.]}),
+        pd.DataFrame({'prod_code': '1000_01', 'customer': 'LIDL',
+                      'time_var': weeks[[2, 7]], 'shipments': [10., 20.]}),
+        pd.DataFrame({'prod_code': '1001_01', 'customer': 'ALDI',
+                      'time_var': weeks[[3, 4, 5, 6]],
+                      'shipments': [0., 0., np.nan, 3.]}),
+    ]
+    return pd.concat(frames).sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+KEYS = ['prod_code', 'customer']
+
+
+def test_round_trip(shipments):
+    panel = Panel.from_long(shipments, KEYS)
+
+    assert panel.shape == (3, 8)
+    assert panel.values.dtype == np.float32
+    assert panel.keys.values.tolist() == [['1000_01', 'ALDI'], ['1000_01', 'LIDL'],
+                                          ['1001_01', 'ALDI']]
+    assert panel.mask.sum() == len(shipments)
+    expected = shipments.sort_values(KEYS + ['time_var']).reset_index(drop=True)
+    pd.testing.assert_frame_equal(panel.to_long(), expected, check_freq=False)
+
+
+@pytest.mark.parametrize('method', [None, 'ffill', 'bfill', 'nearest'])
+def test_fill_gaps_matches_reindex(shipments, method):
+    filled = Panel.from_long(shipments, KEYS).fill_gaps(method).to_long()
+
+    def _reindex(df):
+        df = df.set_index('time_var').sort_index()
+        weeks = pd.date_range(df.index.min(), df.index.max(), freq='W-MON')
+        return df['shipments'].reindex(weeks, method=method)
+
+    expected = shipments.groupby(KEYS).apply(_reindex).reset_index()
+    expected = expected.rename(columns={'level_2': 'time_var'})
+    assert filled[KEYS].values.tolist() == expected[KEYS].values.tolist()
+    np.testing.assert_array_equal(filled['shipments'], expected['shipments'])
+
+
+def test_count_and_select(shipments):
+    panel = Panel.from_long(shipments, KEYS).fill_gaps('ffill')
+
+    zeros = panel.count(0)
+    assert zeros.tolist() == [3, 0, 2]
+
+    selected = panel.select(zeros < 3)
+    assert selected.keys['customer'].tolist() == ['LIDL', 'ALDI']
+    assert selected.to_long()['prod_code'].unique().tolist() == ['1000_01', '1001_01']
+
+
+@pytest.mark.parametrize('value', [2. ** 24 + 1, 0.1])
+def test_values_float32_would_round_stay_float64(shipments, value):
+    shipments.loc[0, 'shipments'] = value
+
+    panel = Panel.from_long(shipments, KEYS)
+
+    assert panel.values.dtype == np.float64
+    assert panel.fill_gaps('ffill').values.dtype == np.float64
+    assert value in panel.to_long()['shipments'].tolist()
+
+
+def test_from_long_checks_the_calendar(shipments):
+    with pytest.raises(ValueError, match='mondays'):
+        tuesdays = shipments['time_var'] + pd.Timedelta(days=1)
+        Panel.from_long(shipments.assign(time_var=tuesdays), KEYS)
+    with pytest.raises(ValueError, match='more than one row'):
+        Panel.from_long(pd.concat([shipments, shipments.head(1)]), KEYS)
+
+
+def test_empty_panel(shipments):
+    panel = Panel.from_long(shipments.iloc[:0], KEYS)
+
+    assert panel.shape == (0, 0)
+    assert panel.span().shape == (0, 0)
+    filled = panel.fill_gaps('nearest')
+    assert filled.count(0).tolist() == []
+    assert filled.to_long().empty
+    assert list(filled.to_long().columns) == KEYS + ['time_var', 'shipments']
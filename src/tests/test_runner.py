@@ -0,0 +1,127 @@
+import time
+
+import pandas as pd
+import pytest
+from kedro.io import DataCatalog, MemoryDataset
+from kedro.pipeline import Pipeline, node, pipeline
+from kedro.framework.hooks import _create_hook_manager
+
+from pepsico_course.runner import MemoryAwareRunner, load_node_estimates
+
+
+class TrackedDataset(MemoryDataset):
+    """Memory data set remembering when it was released"""
+    released = []
+
+    def _release(self) -> None:
+        TrackedDataset.released.append(self._data)
+        super()._release()
+
+
+def _interval(name):
+    def _run(value):
+        start = time.perf_counter()
+        time.sleep(0.2)
+        _run.intervals.append((name, start, time.perf_counter()))
+        return value + 1
+    _run.intervals = []
+    return _run
+
+
+@pytest.fixture
+def branches():
+    """Two independent heavy branches and a light node joining them"""
+    intervals = []
+    functions = {name: _interval(name) for name in ['heavy_a', 'heavy_b', 'light']}
+    for function in functions.values():
+        function.intervals = intervals
+    nodes = pipeline([
+        node(functions['heavy_a'], 'raw', 'a', name='heavy_a'),
+        node(functions['heavy_b'], 'raw', 'b', name='heavy_b'),
+        node(functions['light'], 'a', 'c', name='light'),
+        node(lambda a, b, c: a + b + c, ['a', 'b', 'c'], 'total', name='total'),
+    ])
+    return nodes, intervals
+
+
+def _catalog(tmp_path, runner=None):
+    pd.DataFrame({'node': ['heavy_a', 'heavy_b', 'light'],
+                  'peak_rss_mb': [900., 900., 600.],
+                  'memory_added_mb': [700., 700., 10.], 'wall_seconds': [5., 1., 1.]}
+                 ).to_parquet(tmp_path / '20260101T000000___default___nodes.parquet')
+    parameters = {'runner': runner or {}, 'profiling': {'report_dir': str(tmp_path)}}
+    return DataCatalog({'raw': MemoryDataset(0),
+                        'parameters': MemoryDataset(parameters),
+                        'a': TrackedDataset(), 'c': TrackedDataset()})
+
+
+def _overlap(intervals, first, second):
+    spans = {name: (start, end) for name, start, end in intervals}
+    return spans[first][0] < spans[second][1] and spans[second][0] < spans[first][1]
+
+
+def test_load_node_estimates(tmp_path):
+    _catalog(tmp_path)
+    pd.DataFrame({'node': ['heavy_a'], 'peak_rss_mb': [2000.], 'wall_seconds': [1.]}
+                 ).to_parquet(tmp_path / '20250101T000000___default___nodes.parquet')
+
+    estimates = load_node_estimates(str(tmp_path))
+
+    # Largest value of the reports, the peak RSS when the memory added is missing
+    assert estimates.loc['heavy_a'].tolist() == [2000., 5.]
+    assert estimates.loc['light'].tolist() == [10., 1.]
+    assert load_node_estimates(str(tmp_path / 'missing')).empty
+
+
+def test_runs_independent_nodes_concurrently(branches, tmp_path):
+    nodes, intervals = branches
+
+    runner = MemoryAwareRunner(max_workers=3, memory_budget_mb=2000)
+    outputs = runner.run(nodes, _catalog(tmp_path), _create_hook_manager())
+
+    assert outputs == {'total': 4}
+    assert _overlap(intervals, 'heavy_a', 'heavy_b')
+
+
+def test_heavy_nodes_stay_within_the_budget(branches, tmp_path):
+    nodes, intervals = branches
+
+    catalog = _catalog(tmp_path, {'memory_budget_mb': 1000})
+    runner = MemoryAwareRunner(max_workers=3)
+    outputs = runner.run(nodes, catalog, _create_hook_manager())
+
+    assert outputs == {'total': 4}
+    assert not _overlap(intervals, 'heavy_a', 'heavy_b')
+    # heavy_a heads the longest chain, so it starts first and the light node can run
+    # next to heavy_b
+    first, *_ = min(intervals, key=lambda interval: interval[1])
+    assert first == 'heavy_a'
+    assert _overlap(intervals, 'heavy_b', 'light')
+
+
+def test_releases_intermediates_after_their_last_consumer(branches, tmp_path):
+    nodes, _ = branches
+    TrackedDataset.released.clear()
+
+    runner = MemoryAwareRunner(max_workers=1)
+    runner.run(nodes, _catalog(tmp_path), _create_hook_manager())
+
+    assert sorted(TrackedDataset.released) == [1, 2]
+
+
+def test_unschedulable_nodes_raise(branches, tmp_path, monkeypatch):
+    nodes, _ = branches
+    # Every node waiting on itself, none of them is ever ready
+    monkeypatch.setattr(Pipeline, 'node_dependencies',
+                        property(lambda self: {node: {node} for node in self.nodes}))
+    monkeypatch.setattr(MemoryAwareRunner, '_priorities',
+                        staticmethod(lambda pipeline, seconds: {}))
+
+    with pytest.raises(RuntimeError, match='Unable to schedule new tasks'):
+        MemoryAwareRunner(max_workers=2).run(nodes, _catalog(tmp_path),
+                                             _create_hook_manager())
+
+
+def test_max_workers_should_be_positive():
+    with pytest.raises(ValueError, match='positive'):
+        MemoryAwareRunner(max_workers=0)